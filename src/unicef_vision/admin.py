@@ -7,6 +7,7 @@ class VisionLoggerAdmin(admin.ModelAdmin):
 
     list_filter = (
         "handler_name",
+        "business_area_code",
         "successful",
         "date_processed",
     )
@@ -16,13 +17,24 @@ class VisionLoggerAdmin(admin.ModelAdmin):
         "total_processed",
         "successful",
         "date_processed",
+        "fetch_time",
+        "save_time",
     )
     readonly_fields = (
         "details",
         "handler_name",
         "total_records",
         "total_processed",
+        "total_failed",
         "successful",
         "exception_message",
+        "date_started",
         "date_processed",
+        "fetch_time",
+        "decode_time",
+        "convert_time",
+        "filter_time",
+        "save_time",
+        "bytes_downloaded",
+        "peak_memory",
     )
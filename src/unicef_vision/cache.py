@@ -0,0 +1,101 @@
+import hashlib
+import logging
+import time
+
+from django.core.cache import caches
+
+from unicef_vision.settings import CACHE_ALIAS, RESPONSE_CACHE_TTLS, TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+_missing = object()
+
+
+def _digest(value):
+    return hashlib.sha1(value.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Opt-in cache of the Insight responses, stored in the INSIGHT_CACHE_ALIAS cache
+
+    ttls maps the endpoints to the time to live of their responses in seconds, "*" applies to the endpoints not
+    listed; the responses of the other endpoints are not cached. While a response is fetched, the other callers asking
+    for the same one wait for it instead of sending the same request (up to lock_timeout seconds).
+    """
+
+    prefix = "unicef_vision:response"
+    poll_interval = 0.05
+
+    def __init__(self, ttls=None, alias=None, lock_timeout=TIMEOUT):
+        self.ttls = RESPONSE_CACHE_TTLS if ttls is None else ttls
+        self.alias = alias or CACHE_ALIAS
+        self.lock_timeout = lock_timeout
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def get_ttl(self, endpoint):
+        return self.ttls.get(endpoint, self.ttls.get("*", 0))
+
+    def _generation_key(self, endpoint):
+        return "{}:generation:{}".format(self.prefix, _digest(endpoint))
+
+    def make_key(self, endpoint, key_data):
+        """Key of the response of endpoint for key_data (e.g. the url formatted with the parameters)"""
+        generation = self.cache.get(self._generation_key(endpoint), 0)
+        return "{}:{}:{}:{}".format(self.prefix, _digest(endpoint), generation, _digest(key_data))
+
+    def get_or_fetch(self, endpoint, key_data, fetch, cacheable=None):
+        """Returns the cached response, or the result of fetch, cached if cacheable(result) is true"""
+        ttl = self.get_ttl(endpoint)
+        if not ttl:
+            return fetch()
+
+        cache = self.cache
+        key = self.make_key(endpoint, key_data)
+        value = cache.get(key, _missing)
+        if value is not _missing:
+            return value
+
+        lock_key = "{}:lock".format(key)
+        if not cache.add(lock_key, 1, self.lock_timeout):
+            value = self._wait(key, lock_key)
+            if value is not _missing:
+                return value
+            # the response was not cached by the other caller, e.g. it failed
+            return fetch()
+
+        try:
+            value = fetch()
+            if cacheable is None or cacheable(value):
+                cache.set(key, value, ttl)
+        finally:
+            cache.delete(lock_key)
+        return value
+
+    def _wait(self, key, lock_key):
+        logger.debug("Waiting for the response {} fetched by another caller".format(key))
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(self.poll_interval)
+            value = self.cache.get(key, _missing)
+            if value is not _missing or not self.cache.get(lock_key):
+                return value
+        return _missing
+
+    def invalidate(self, endpoint, key_data=None):
+        """Drops the cached response of endpoint for key_data, or all the responses of endpoint"""
+        if key_data is not None:
+            self.cache.delete(self.make_key(endpoint, key_data))
+            return
+        generation_key = self._generation_key(endpoint)
+        self.cache.add(generation_key, 0, None)
+        try:
+            self.cache.incr(generation_key)
+        except ValueError:
+            # evicted in the meantime
+            self.cache.set(generation_key, 1, None)
+
+
+response_cache = ResponseCache()
@@ -9,11 +9,23 @@ from django.conf import settings
 import requests
 from requests.auth import HTTPDigestAuth
 
-from unicef_vision.settings import TIMEOUT
+from unicef_vision.cache import response_cache
+from unicef_vision.retries import get_circuit_breaker, retry_policy
+from unicef_vision.settings import REQUEST_TIMEOUT
+from unicef_vision.utils import get_session
 
 logger = logging.getLogger(__name__)
 
 
+def _detached(response):
+    """Copy of response that can be pickled"""
+    copy = requests.Response()
+    for name in ("status_code", "headers", "url", "encoding", "reason", "elapsed"):
+        setattr(copy, name, getattr(response, name))
+    copy._content = response.content
+    return copy
+
+
 class VisionAPIClient:
     """Client to Synchronize with Vision"""
 
@@ -38,19 +50,44 @@ class VisionAPIClient:
             os.path.normpath(path),
         )
 
+    def _cache_key_data(self, path):
+        # the responses may depend on the credentials
+        return "{} {}".format(getattr(getattr(self, "auth", None), "username", ""), self.build_path(path))
+
+    def _get(self, path):
+        url = self.build_path(path)
+        return retry_policy.call(
+            lambda: get_session().get(url, auth=getattr(self, "auth", ()), timeout=REQUEST_TIMEOUT),
+            get_circuit_breaker(url),
+        )
+
     def make_request(self, path):
-        response = requests.get(self.build_path(path), auth=getattr(self, "auth", ()), timeout=TIMEOUT)
-        return response
+        """Returns the response of the request to path, cached if path is listed in INSIGHT_RESPONSE_CACHE_TTLS
+
+        Cached responses are copies without the request, which holds the authentication.
+        """
+        if not response_cache.get_ttl(path):
+            return self._get(path)
+        return response_cache.get_or_fetch(
+            path,
+            self._cache_key_data(path),
+            lambda: _detached(self._get(path)),
+            lambda response: response.status_code == 200,
+        )
+
+    def invalidate(self, path):
+        """Drops the cached response of path"""
+        response_cache.invalidate(path, self._cache_key_data(path))
 
     def call_command(self, command_type, **properties):
         payload = json.dumps({"type": command_type, "command": {"properties": properties}})
 
-        response = requests.post(
+        response = get_session().post(
             self.build_path("command"),
             headers={"cache-control": "application/json"},
             auth=getattr(self, "auth", ()),
             data=payload,
-            timeout=TIMEOUT,
+            timeout=REQUEST_TIMEOUT,
         )
         return response
 
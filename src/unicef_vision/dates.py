@@ -0,0 +1,58 @@
+import datetime
+import re
+from functools import lru_cache
+
+from unicef_vision.settings import DATE_CACHE_SIZE, INSIGHT_DATE_FORMAT
+
+# /Date(1334030400000)/ or /Date(1334030400000+0300)/, milliseconds since the epoch in UTC and an optional offset
+# of the local time the date is taken from
+EPOCH_DATE_RE = re.compile(r"^/Date\((-?\d+)(?:([+-])(\d{2})(\d{2}))?\)/$")
+EPOCH = datetime.date(1970, 1, 1)
+
+
+class DateParser:
+    """Converts the dates of the Insight records to datetime.date
+
+    Handles the strings in date_format and the /Date(milliseconds)/ epoch strings. Insight dates repeat heavily, the
+    results are memoized in a LRU cache of cache_size strings.
+    """
+
+    def __init__(self, date_format=INSIGHT_DATE_FORMAT, cache_size=DATE_CACHE_SIZE):
+        self.date_format = date_format
+        self.parse = lru_cache(maxsize=cache_size)(self._parse)
+
+    def _parse(self, value):
+        if value.startswith("/Date("):
+            match = EPOCH_DATE_RE.match(value)
+            if match is None:
+                raise ValueError("time data {!r} is not a valid epoch date".format(value))
+            milliseconds, sign, hours, minutes = match.groups()
+            local_time = datetime.timedelta(milliseconds=int(milliseconds))
+            if sign:
+                offset = datetime.timedelta(hours=int(hours), minutes=int(minutes))
+                local_time += -offset if sign == "-" else offset
+            # the time of the day is dropped as for the formatted dates
+            return EPOCH + local_time
+        return datetime.datetime.strptime(value, self.date_format).date()
+
+    def __call__(self, value):
+        if not isinstance(value, str):
+            raise TypeError("date must be a string, not {}".format(type(value).__name__))
+        return self.parse(value)
+
+    def parse_many(self, values):
+        """Converts a column of dates at once, each distinct value is parsed only once"""
+        values = list(values)
+        dates = {value: self(value) for value in set(values)}
+        return [dates[value] for value in values]
+
+    def cache_info(self):
+        return self.parse.cache_info()
+
+
+parse_date = DateParser()
+
+
+def parse_dates(values):
+    """Converts a list of Insight dates, see DateParser.parse_many"""
+    return parse_date.parse_many(values)
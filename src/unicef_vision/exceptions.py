@@ -1,2 +1,10 @@
 class VisionException(Exception):
     """Vision Generic Exception"""
+
+
+class VisionNotModified(VisionException):
+    """Data not modified since the last successful sync"""
+
+
+class VisionCircuitOpen(VisionException):
+    """Insight failed too many times in a row, calls are refused for a while"""
@@ -0,0 +1,75 @@
+import hashlib
+import json
+
+from django.db.models import Model
+from django.utils import timezone
+
+from unicef_vision.utils import get_vision_fingerprint_model
+
+
+def _json_default(value):
+    if isinstance(value, Model):
+        return value.pk
+    return str(value)
+
+
+def make_hash(value):
+    """Stable hash of a json serializable structure, model instances are represented by their primary key"""
+    content = json.dumps(value, sort_keys=True, default=_json_default)
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+class FingerprintStore:
+    """Fingerprints of the items written by a sync, stored in the INSIGHT_FINGERPRINT_MODEL model
+
+    An item whose fingerprint did not change since it was last written is skipped. Fingerprints are not aware of
+    changes made to the synced rows by other means: they should be deleted for the rows changed or removed outside
+    of the syncs.
+    """
+
+    def __init__(self):
+        self.skipped = 0
+        self.written = 0
+
+    def filter_changed(self, model, items, unique_key):
+        """Returns the (kwargs, defaults) items whose content changed and their (key, fingerprint) entries
+
+        unique_key returns the normalized value of the unique fields of an item, the stored fingerprints of the
+        items are fetched with one query.
+        """
+        entries = [(make_hash(unique_key(kwargs)), make_hash([kwargs, defaults])) for kwargs, defaults in items]
+        stored = dict(
+            get_vision_fingerprint_model()
+            .objects.filter(model_label=model._meta.label, key__in=[key for key, _ in entries])
+            .values_list("key", "fingerprint")
+        )
+
+        changed, changed_entries = [], []
+        for item, (key, fingerprint) in zip(items, entries):
+            if stored.get(key) == fingerprint:
+                self.skipped += 1
+            else:
+                changed.append(item)
+                changed_entries.append((key, fingerprint))
+        return changed, changed_entries
+
+    def save(self, model, entries):
+        """Stores the (key, fingerprint) entries of the items written"""
+        self.written += len(entries)
+        if not entries:
+            return
+        fingerprint_model = get_vision_fingerprint_model()
+        label = model._meta.label
+        entries = dict(entries)
+        existing = list(fingerprint_model.objects.filter(model_label=label, key__in=list(entries)))
+        now = timezone.now()
+        for instance in existing:
+            instance.fingerprint = entries.pop(instance.key)
+            instance.date_synced = now
+        fingerprint_model.objects.bulk_update(existing, ["fingerprint", "date_synced"])
+        fingerprint_model.objects.bulk_create(
+            [
+                fingerprint_model(model_label=label, key=key, fingerprint=fingerprint)
+                for key, fingerprint in entries.items()
+            ]
+        )
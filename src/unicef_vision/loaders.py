@@ -1,24 +1,63 @@
+import gzip
+import hashlib
 import json
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from urllib.parse import urlencode
 
 from django.conf import settings
+from django.core.cache import caches
 
-import requests
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None
 
-from unicef_vision.exceptions import VisionException
-from unicef_vision.settings import TIMEOUT
-from unicef_vision.utils import base_headers
+from unicef_vision.exceptions import VisionException, VisionNotModified
+from unicef_vision.parsers import iter_rowset
+from unicef_vision.retries import get_circuit_breaker, retry_policy
+from unicef_vision.settings import (
+    CACHE_ALIAS,
+    CONNECT_TIMEOUT,
+    PAGE_PREFETCH,
+    READ_TIMEOUT,
+    REQUEST_TIMEOUT,
+    STREAM_CHUNK_SIZE,
+)
+from unicef_vision.timing import PhaseTimer
+from unicef_vision.utils import base_headers, get_session
 
 logger = logging.getLogger(__name__)
 
 INSIGHT_NO_DATA_MESSAGE = "No Data Available"
 
 
+def iter_rows(payload):
+    """Yields the single records contained in an Insight payload, unwrapping the ROWSET envelope"""
+    if isinstance(payload, list):
+        yield from payload
+    elif payload and isinstance(payload, dict) and "ROWSET" in payload:
+        rows = payload["ROWSET"]["ROW"]
+        if isinstance(rows, list):
+            yield from rows
+        else:
+            yield rows
+
+
 class VisionDataLoader:
-    """Base class for Data Loading"""
+    """Base class for Data Loading
+
+    With conditional, the ETag and Last-Modified of the response are sent back with the next request of the same url
+    once save_validators is called, and a 304 response raises VisionNotModified.
+    The time spent decoding the response and the bytes downloaded are recorded in timer, which the synchronizers
+    replace with their own.
+    """
 
-    def __init__(self, endpoint, detail=None, **kwargs):
+    def __init__(self, endpoint, detail=None, conditional=False, **kwargs):
+        self.conditional = conditional
+        self.timer = PhaseTimer()
+        self.validators = {}
         self.URL = kwargs.get("url", settings.INSIGHT_URL)
         self.set_headers(kwargs.get("headers", ()))
         querystring = urlencode(kwargs)
@@ -40,25 +79,254 @@ class VisionDataLoader:
             for header_name, header_value in headers:
                 self.headers[header_name] = header_value
 
-    def get(self):
-        response = requests.get(self.url, headers=self.headers, timeout=TIMEOUT)
+    @property
+    def validators_key(self):
+        return "unicef_vision:validators:{}".format(hashlib.sha1(self.url.encode("utf-8")).hexdigest())
+
+    def get_request_headers(self):
+        if not self.conditional:
+            return self.headers
+        headers = dict(self.headers)
+        validators = caches[CACHE_ALIAS].get(self.validators_key) or {}
+        if validators.get("ETag"):
+            headers["If-None-Match"] = validators["ETag"]
+        if validators.get("Last-Modified"):
+            headers["If-Modified-Since"] = validators["Last-Modified"]
+        return headers
 
+    def check_response(self, response):
+        if self.conditional and response.status_code == 304:
+            raise VisionNotModified("Data not modified since the last sync")
         if response.status_code != 200:
             raise VisionException("Load data failed! Http code: {}".format(response.status_code))
-        json_response = response.json()
+        if self.conditional:
+            self.validators = {
+                name: response.headers[name] for name in ("ETag", "Last-Modified") if response.headers.get(name)
+            }
+
+    def save_validators(self):
+        """Keeps the validators of the last response for the next request, to be called once the data is saved"""
+        if self.validators:
+            caches[CACHE_ALIAS].set(self.validators_key, self.validators, None)
+
+    def _send(self, url=None, **kwargs):
+        """Sends the request, retried with backoff and guarded by the circuit breaker of the Insight host"""
+        url = url or self.url
+        headers = self.get_request_headers()
+        return retry_policy.call(
+            lambda: get_session().get(url, headers=headers, timeout=REQUEST_TIMEOUT, **kwargs),
+            get_circuit_breaker(url),
+        )
+
+    def _decode(self, response):
+        self.check_response(response)
+        self.timer.bytes_downloaded = (self.timer.bytes_downloaded or 0) + len(response.content)
+        with self.timer.phase("decode"):
+            json_response = response.json()
         if json_response == INSIGHT_NO_DATA_MESSAGE:
             return []
 
         return json_response
 
+    def get(self):
+        return self._decode(self._send())
+
+    def stream(self):
+        """Yields the records one at a time, parsing the response while it is downloaded"""
+        response = self._send(stream=True)
+        try:
+            self.check_response(response)
+            chunks = self.timer.count_bytes(response.iter_content(chunk_size=STREAM_CHUNK_SIZE))
+            yield from self.timer.iter("decode", iter_rowset(self.timer.iter("fetch", chunks)))
+        finally:
+            response.close()
+
+
+class PaginatedVisionDataLoader(VisionDataLoader):
+    """Loader fetching the records of an endpoint one page of page_size records at a time
+
+    Each page is requested with page_size in page_size_param and either its offset in offset_param, or with
+    cursor_param set to the cursor returned in the cursor_key of the previous page. The records end with the first
+    empty page (offset) or the page without cursor (cursor). A server returning less than page_size records before
+    the last page caps the page size, records would be skipped by the next offsets: the loader raises a
+    VisionException, page_size has to be lowered to the cap.
+    While a page is processed the next ones are downloaded in background: up to prefetch pages with offsets, only the
+    next one with cursors as its url depends on the current page. The pages are always returned in order.
+    The requests are not conditional, each page having its own validators.
+    """
+
+    def __init__(
+        self,
+        endpoint,
+        detail=None,
+        page_size=1000,
+        page_size_param="pagesize",
+        offset_param="offset",
+        cursor_param=None,
+        cursor_key=None,
+        prefetch=PAGE_PREFETCH,
+        conditional=False,
+        **kwargs
+    ):
+        self.page_size = page_size
+        self.page_size_param = page_size_param
+        self.offset_param = offset_param
+        self.cursor_param = cursor_param
+        self.cursor_key = cursor_key or cursor_param
+        self.prefetch = max(1, prefetch)
+        super().__init__(endpoint, detail, **kwargs)
+
+    def page_url(self, offset=0, cursor=None):
+        params = {self.page_size_param: self.page_size}
+        if self.cursor_param:
+            if cursor is not None:
+                params[self.cursor_param] = cursor
+        else:
+            params[self.offset_param] = offset
+        separator = "&" if "?" in self.url else "/?"
+        return "{}{}{}".format(self.url, separator, urlencode(params))
+
+    def next_cursor(self, payload):
+        if isinstance(payload, dict):
+            return payload.get(self.cursor_key) or None
+        return None
+
+    def _iter_offset_pages(self, executor):
+        pending = []
+        offset = 0
+        short_page = None
+        try:
+            while True:
+                # keep prefetch pages in flight
+                while len(pending) < self.prefetch:
+                    pending.append(executor.submit(self._send, self.page_url(offset=offset)))
+                    offset += self.page_size
+                rows = list(iter_rows(self._decode(pending.pop(0).result())))
+                if not rows:
+                    return
+                if short_page is not None:
+                    raise VisionException(
+                        "{} returned a page of {} records for a page size of {}, the page size is capped".format(
+                            self.url, short_page, self.page_size
+                        )
+                    )
+                if len(rows) < self.page_size:
+                    short_page = len(rows)
+                yield rows
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def _iter_cursor_pages(self, executor):
+        future = executor.submit(self._send, self.page_url())
+        try:
+            while future is not None:
+                payload = self._decode(future.result())
+                rows = list(iter_rows(payload))
+                cursor = self.next_cursor(payload) if rows else None
+                future = executor.submit(self._send, self.page_url(cursor=cursor)) if cursor else None
+                yield rows
+        finally:
+            if future is not None:
+                future.cancel()
+
+    def pages(self):
+        """Yields the records of each page, in order"""
+        with ThreadPoolExecutor(max_workers=1 if self.cursor_param else self.prefetch) as executor:
+            if self.cursor_param:
+                yield from self._iter_cursor_pages(executor)
+            else:
+                yield from self._iter_offset_pages(executor)
+
+    def get(self):
+        return [row for page in self.pages() for row in page]
+
+    def stream(self):
+        """Yields the records one at a time, downloading the next pages while they are processed"""
+        for page in self.pages():
+            yield from page
+
+
+class AsyncVisionDataLoader(VisionDataLoader):
+    """Loader fetching the data with an async HTTP client, requires httpx
+
+    An httpx.AsyncClient can be shared by the loaders running on the same event loop through the client argument,
+    otherwise a client is opened for each request.
+    """
+
+    def __init__(self, endpoint, detail=None, client=None, **kwargs):
+        if httpx is None:  # pragma: no cover
+            raise VisionException("httpx is required to load data asynchronously")
+        self.client = client
+        super().__init__(endpoint, detail, **kwargs)
+
+    async def _send(self):
+        headers = self.get_request_headers()
+        timeout = httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT)
+        if self.client is not None:
+            return await self.client.get(self.url, headers=headers, timeout=timeout)
+        async with httpx.AsyncClient() as client:
+            return await client.get(self.url, headers=headers, timeout=timeout)
+
+    async def _request(self):
+        return await retry_policy.acall(self._send, get_circuit_breaker(self.url))
+
+    async def get(self):
+        return self._decode(await self._request())
+
 
 class FileDataLoader:
-    """Loader to read json file instead of REST API"""
+    """Loader to read json file instead of REST API
+
+    Reads .json files, holding a list of records or a ROWSET envelope like the Insight responses, and .ndjson files
+    with one record (or envelope) per line; both can be gzip compressed (.json.gz, .ndjson.gz).
+    """
 
     def __init__(self, filename, detail=None, **kwargs):
         self.filename = filename
         self.detail = detail
+        self.timer = PhaseTimer()
+
+    @property
+    def compressed(self):
+        return str(self.filename).endswith(".gz")
+
+    @property
+    def ndjson(self):
+        name = str(self.filename)
+        if self.compressed:
+            name = name[:-3]
+        return name.endswith(".ndjson")
+
+    def open(self):
+        if self.compressed:
+            return gzip.open(self.filename, "rb")
+        return open(self.filename, "rb")
+
+    def _iter_lines(self, data_file):
+        for line in self.timer.iter("fetch", self.timer.count_bytes(data_file)):
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            if isinstance(row, dict) and "ROWSET" not in row:
+                yield row
+            else:
+                yield from iter_rows(row)
 
     def get(self):
-        data = json.load(open(self.filename))
-        return data
+        with self.open() as data_file:
+            if self.ndjson:
+                return list(self.timer.iter("decode", self._iter_lines(data_file)))
+            content = data_file.read()
+        self.timer.bytes_downloaded = (self.timer.bytes_downloaded or 0) + len(content)
+        with self.timer.phase("decode"):
+            return json.loads(content)
+
+    def stream(self):
+        """Yields the records one at a time, parsing the file incrementally so that it is never loaded as a whole"""
+        with self.open() as data_file:
+            if self.ndjson:
+                yield from self.timer.iter("decode", self._iter_lines(data_file))
+            else:
+                chunks = self.timer.count_bytes(iter(partial(data_file.read, STREAM_CHUNK_SIZE), b""))
+                yield from self.timer.iter("decode", iter_rowset(self.timer.iter("fetch", chunks)))
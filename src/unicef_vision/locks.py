@@ -0,0 +1,135 @@
+import asyncio
+import hashlib
+import logging
+import time
+import uuid
+
+from django.core.cache import caches
+from django.db import connections
+
+from asgiref.sync import sync_to_async
+
+from unicef_vision.exceptions import VisionException
+from unicef_vision.settings import CACHE_ALIAS
+
+logger = logging.getLogger(__name__)
+
+
+class SyncLock:
+    """Lock named after a sync, shared by all the processes syncing"""
+
+    poll_interval = 0.5
+
+    def __init__(self, name):
+        self.name = name
+        self.acquired = False
+
+    def _try_acquire(self):  # pragma: no cover
+        raise NotImplementedError
+
+    def _release(self):  # pragma: no cover
+        raise NotImplementedError
+
+    def acquire(self, wait=0):
+        """Takes the lock, waiting up to wait seconds for it to be released, returns False if it was not"""
+        deadline = time.monotonic() + (wait or 0)
+        while not self._try_acquire():
+            if time.monotonic() >= deadline:
+                logger.info("Lock {} is taken".format(self.name))
+                return False
+            time.sleep(self.poll_interval)
+        self.acquired = True
+        return True
+
+    async def aacquire(self, wait=0):
+        """Same as acquire, waiting without blocking the event loop nor the thread running the ORM calls"""
+        deadline = time.monotonic() + (wait or 0)
+        while not await sync_to_async(self._try_acquire)():
+            if time.monotonic() >= deadline:
+                logger.info("Lock {} is taken".format(self.name))
+                return False
+            await asyncio.sleep(self.poll_interval)
+        self.acquired = True
+        return True
+
+    def release(self):
+        if self.acquired:
+            self._release()
+            self.acquired = False
+
+
+class CacheSyncLock(SyncLock):
+    """Lock stored in the cache, expiring after ttl seconds in case its holder dies
+
+    The cache must be shared by the processes (e.g. redis or memcached, locmem only works within a process) and ttl
+    longer than the sync, otherwise the lock can be taken again while the sync is running.
+    """
+
+    def __init__(self, name, ttl, alias=None):
+        super().__init__(name)
+        self.ttl = ttl
+        self.alias = alias or CACHE_ALIAS
+        self.token = uuid.uuid4().hex
+
+    @property
+    def key(self):
+        return "unicef_vision:lock:{}".format(hashlib.sha1(self.name.encode("utf-8")).hexdigest())
+
+    def _try_acquire(self):
+        return caches[self.alias].add(self.key, self.token, self.ttl)
+
+    def _release(self):
+        cache = caches[self.alias]
+        # do not release the lock taken by another process once this one expired
+        if cache.get(self.key) == self.token:
+            cache.delete(self.key)
+
+
+class DatabaseSyncLock(SyncLock):
+    """PostgreSQL session advisory lock, held on a connection of its own until released or the process dies"""
+
+    def __init__(self, name, using="default"):
+        super().__init__(name)
+        self.using = using
+        self.connection = None
+        # advisory locks are identified by a signed 64 bits integer
+        self.lock_id = int.from_bytes(hashlib.sha1(name.encode("utf-8")).digest()[:8], "big", signed=True)
+
+    def _try_acquire(self):
+        if self.connection is None:
+            if connections[self.using].vendor != "postgresql":
+                raise VisionException("Database sync locks require PostgreSQL")
+            # not the connection of the thread, which the runners close while the sync is running
+            self.connection = connections.create_connection(self.using)
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute("SELECT pg_try_advisory_lock(%s)", [self.lock_id])
+                acquired = cursor.fetchone()[0]
+        except Exception:
+            self._close()
+            raise
+        if not acquired:
+            self._close()
+        return acquired
+
+    def _release(self):
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_unlock(%s)", [self.lock_id])
+        finally:
+            self._close()
+
+    def _close(self):
+        self.connection.close()
+        self.connection = None
+
+
+def get_sync_lock(backend, name, ttl, using="default"):
+    """Lock of the sync name for the backend ("cache" or "database"), None if no backend is set"""
+    if not backend:
+        return None
+    if backend == "cache":
+        return CacheSyncLock(name, ttl)
+    if backend == "database":
+        return DatabaseSyncLock(name, using)
+    raise VisionException("Unknown sync lock backend {}".format(backend))
@@ -0,0 +1,48 @@
+from django.db.models import NOT_PROVIDED
+
+from unicef_vision.dates import parse_date
+from unicef_vision.exceptions import VisionException
+
+
+class Empty:
+    pass
+
+
+def map_value(field, record):
+    """Value of a field of a model which does not need the database, for a json record
+
+    field is a (field name, json key, is date, field default, handler) tuple. Dates are parsed and the handlers are
+    not applied to them, the other values default to the field default when the key is missing.
+    """
+    field_name, field_json_code, is_date, default, handler = field
+    if is_date:
+        return parse_date(record[field_json_code])
+    value = record.get(field_json_code, Empty)
+    if value is Empty and default is not NOT_PROVIDED:
+        value = default
+    if handler:
+        value = handler(value)
+    return value
+
+
+def map_values(fields, record):
+    """Values of the fields of a model which do not need the database, by field name, see map_value"""
+    return {field[0]: map_value(field, record) for field in fields}
+
+
+def map_records(plans, records):
+    """Maps a chunk of records in a worker process
+
+    plans is a list of (model name, fields) pairs, see map_values. Returns for each record a dict of the values of
+    each model, or of the VisionException describing why they could not be mapped.
+    """
+    results = []
+    for record in records:
+        mapped = {}
+        for model_name, fields in plans:
+            try:
+                mapped[model_name] = map_values(fields, record)
+            except Exception as e:
+                mapped[model_name] = VisionException("{}: {}".format(type(e).__name__, e))
+        results.append(mapped)
+    return results
@@ -9,13 +9,38 @@ class AbstractVisionLog(models.Model):
     business_area_code = models.CharField(max_length=10, verbose_name=_("Business Area Code"), null=True, blank=True)
     total_records = models.IntegerField(default=0, verbose_name=_("Total Records"))
     total_processed = models.IntegerField(default=0, verbose_name=_("Total Processed"))
+    total_failed = models.IntegerField(default=0, verbose_name=_("Total Failed"))
     successful = models.BooleanField(default=False, verbose_name=_("Successful"))
     details = models.CharField(max_length=2048, blank=True, default="", verbose_name=_("Details"))
     exception_message = models.TextField(blank=True, default="", verbose_name=_("Exception Message"))
     date_processed = models.DateTimeField(auto_now=True, verbose_name=_("Date Processed"))
+    date_started = models.DateTimeField(null=True, blank=True, verbose_name=_("Date Started"))
+    fetch_time = models.FloatField(null=True, blank=True, verbose_name=_("Fetch Time (s)"))
+    decode_time = models.FloatField(null=True, blank=True, verbose_name=_("Decode Time (s)"))
+    convert_time = models.FloatField(null=True, blank=True, verbose_name=_("Convert Time (s)"))
+    filter_time = models.FloatField(null=True, blank=True, verbose_name=_("Filter Time (s)"))
+    save_time = models.FloatField(null=True, blank=True, verbose_name=_("Save Time (s)"))
+    bytes_downloaded = models.BigIntegerField(null=True, blank=True, verbose_name=_("Bytes Downloaded"))
+    peak_memory = models.BigIntegerField(null=True, blank=True, verbose_name=_("Peak Memory (bytes)"))
 
     def __str__(self):
         return "{0.business_area_code}: {0.date_processed}:{0.successful} {0.total_processed}".format(self)
 
     class Meta:
         abstract = True
+
+
+class AbstractVisionFingerprint(models.Model):
+    """Fingerprint of the content last synced for a record, used to skip the records not changed since"""
+
+    model_label = models.CharField(max_length=100, verbose_name=_("Model"))
+    key = models.CharField(max_length=64, verbose_name=_("Key"))
+    fingerprint = models.CharField(max_length=64, verbose_name=_("Fingerprint"))
+    date_synced = models.DateTimeField(auto_now=True, verbose_name=_("Date Synced"))
+
+    def __str__(self):
+        return "{0.model_label}: {0.key}".format(self)
+
+    class Meta:
+        abstract = True
+        unique_together = (("model_label", "key"),)
@@ -0,0 +1,128 @@
+import codecs
+import json
+
+WHITESPACE = " \t\n\r"
+
+_decoder = json.JSONDecoder()
+
+
+class ChunkBuffer:
+    """Text buffer fed by an iterable of bytes (or str) chunks, decoding JSON values as soon as they are complete"""
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.decoder = codecs.getincrementaldecoder("utf-8")()
+        self.text = ""
+        self.pos = 0
+        self.exhausted = False
+
+    def fill(self):
+        """Appends the next chunk to the buffer, returns False when the stream is over"""
+        while not self.exhausted:
+            try:
+                chunk = next(self.chunks)
+            except StopIteration:
+                self.exhausted = True
+                chunk = self.decoder.decode(b"", final=True)
+            else:
+                if isinstance(chunk, bytes):
+                    chunk = self.decoder.decode(chunk)
+            if chunk:
+                consumed, self.pos = self.pos, 0
+                self.text = self.text[consumed:] + chunk
+                return True
+        return False
+
+    def peek(self):
+        """Skips whitespaces and returns the next character, an empty string at the end of the stream"""
+        while True:
+            while self.pos < len(self.text) and self.text[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise json.JSONDecodeError("Expecting '{}'".format(char), self.text, self.pos)
+        self.pos += 1
+
+    def value(self):
+        """Decodes the next complete JSON value"""
+        self.peek()
+        while True:
+            try:
+                obj, end = _decoder.raw_decode(self.text, self.pos)
+            except json.JSONDecodeError:
+                if not self.fill():
+                    raise
+                continue
+            # a value ending with the buffer (e.g. a number) may continue in the next chunk
+            if end == len(self.text) and self.fill():
+                continue
+            self.pos = end
+            return obj
+
+    def array(self):
+        """Yields the items of the array starting at the current position"""
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            char = self.peek()
+            self.pos += 1
+            if char == "]":
+                return
+            if char != ",":
+                raise json.JSONDecodeError("Expecting ',' delimiter", self.text, self.pos - 1)
+
+    def members(self):
+        """Yields the keys of the object starting at the current position, the caller has to consume the values"""
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(":")
+            yield key
+            char = self.peek()
+            self.pos += 1
+            if char == "}":
+                return
+            if char != ",":
+                raise json.JSONDecodeError("Expecting ',' delimiter", self.text, self.pos - 1)
+
+
+def _iter_envelope(buffer):
+    for key in buffer.members():
+        if key == "ROWSET" and buffer.peek() == "{":
+            for row_key in buffer.members():
+                if row_key != "ROW":
+                    buffer.value()
+                elif buffer.peek() == "[":
+                    yield from buffer.array()
+                else:
+                    yield buffer.value()
+        else:
+            buffer.value()
+
+
+def iter_rowset(chunks):
+    """Incrementally parses an Insight response and yields the records as soon as they are downloaded
+
+    Handles the same payloads as the loaders: a bare list of records, a ROWSET envelope whose ROW is either a list
+    or a single record, and anything else (like the no data message) which yields nothing.
+    """
+    buffer = ChunkBuffer(chunks)
+    char = buffer.peek()
+    if char == "[":
+        yield from buffer.array()
+    elif char == "{":
+        yield from _iter_envelope(buffer)
+    elif char:
+        buffer.value()
@@ -0,0 +1,87 @@
+from collections.abc import Mapping
+from functools import lru_cache
+
+
+class Missing:
+    """Value of the keys not present in the json record"""
+
+
+class CompactRecord(tuple, Mapping):
+    """Read only mapping storing the values of the record_keys of a json record in a tuple
+
+    The index of the keys is shared by all the records of the class, see compact_record_class. The records behave
+    as the json dicts for the keys they hold, the other keys are missing.
+    """
+
+    __slots__ = ()
+    record_keys = ()
+    keys_index = {}
+
+    @classmethod
+    def from_row(cls, row):
+        if type(row) is cls:
+            return row
+        get = row.get
+        return tuple.__new__(cls, [get(key, Missing) for key in cls.record_keys])
+
+    def __getitem__(self, key):
+        value = tuple.__getitem__(self, self.keys_index[key])
+        if value is Missing:
+            raise KeyError(key)
+        return value
+
+    def get(self, key, default=None):
+        index = self.keys_index.get(key)
+        if index is None:
+            return default
+        value = tuple.__getitem__(self, index)
+        return default if value is Missing else value
+
+    def __contains__(self, key):
+        index = self.keys_index.get(key)
+        return index is not None and tuple.__getitem__(self, index) is not Missing
+
+    def __iter__(self):
+        return (key for key, value in zip(self.record_keys, tuple.__iter__(self)) if value is not Missing)
+
+    def __len__(self):
+        return sum(1 for value in tuple.__iter__(self) if value is not Missing)
+
+    __eq__ = Mapping.__eq__
+    __hash__ = None
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    def __repr__(self):
+        return "{}({!r})".format(self.__class__.__name__, dict(self))
+
+    def __reduce__(self):
+        return _restore, (self.record_keys, tuple(tuple.__iter__(self)))
+
+
+@lru_cache(maxsize=None)
+def compact_record_class(record_keys):
+    """CompactRecord class holding the keys of the record_keys tuple, the same class is returned for the same keys"""
+    return type(
+        "CompactRecord",
+        (CompactRecord,),
+        {
+            "__slots__": (),
+            "record_keys": record_keys,
+            "keys_index": {key: index for index, key in enumerate(record_keys)},
+        },
+    )
+
+
+def _restore(record_keys, values):
+    return tuple.__new__(compact_record_class(record_keys), values)
+
+
+def compact_records(records, keys):
+    """Projects the json records to the keys, a list of records gives a list and any other iterable an iterator"""
+    from_row = compact_record_class(tuple(sorted(keys))).from_row
+    if isinstance(records, list):
+        return [from_row(record) for record in records]
+    return map(from_row, records)
@@ -0,0 +1,146 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None
+
+from unicef_vision.exceptions import VisionCircuitOpen
+from unicef_vision.settings import (
+    BREAKER_RESET_TIMEOUT,
+    BREAKER_THRESHOLD,
+    RETRIES,
+    RETRY_BACKOFF,
+    RETRY_BACKOFF_MAX,
+    RETRY_STATUSES,
+)
+
+logger = logging.getLogger(__name__)
+
+RETRY_EXCEPTIONS = (requests.ConnectionError, requests.Timeout)
+if httpx is not None:
+    RETRY_EXCEPTIONS += (httpx.TransportError,)
+
+
+class CircuitBreaker:
+    """Refuses the calls for reset_timeout seconds after threshold failures in a row
+
+    Once reset_timeout has passed a call is let through: its success closes the circuit, its failure opens it again.
+    A threshold of 0 disables the breaker.
+    """
+
+    def __init__(self, name, threshold=BREAKER_THRESHOLD, reset_timeout=BREAKER_RESET_TIMEOUT):
+        self.name = name
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        return self.opened_at is not None and time.monotonic() - self.opened_at < self.reset_timeout
+
+    def before_call(self):
+        if self.threshold and self.is_open:
+            raise VisionCircuitOpen("Too many failures calling {}, retry later".format(self.name))
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        if not self.threshold:
+            return
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.threshold:
+                if self.opened_at is None:
+                    logger.warning("{} failed {} times in a row, opening the circuit".format(self.name, self.failures))
+                self.opened_at = time.monotonic()
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(url):
+    """Circuit breaker shared by all the calls to the host of url"""
+    name = urlsplit(url).netloc or url
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name)
+        return _breakers[name]
+
+
+class RetryPolicy:
+    """Sends a request again when it fails with a connection error, a timeout or one of statuses
+
+    The delay before the retry n is a random value up to backoff * 2 ** n seconds (full jitter), capped at
+    backoff_max. Every attempt is recorded by the circuit breaker, which stops the retries once open.
+    """
+
+    def __init__(self, retries=RETRIES, backoff=RETRY_BACKOFF, backoff_max=RETRY_BACKOFF_MAX, statuses=RETRY_STATUSES):
+        self.retries = retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.statuses = statuses
+
+    def get_delay(self, attempt):
+        return random.uniform(0, min(self.backoff_max, self.backoff * 2**attempt))
+
+    def _check(self, attempt, breaker, response=None, error=None):
+        """Records the outcome of an attempt, returns True if the request has to be sent again"""
+        if error is None and response.status_code not in self.statuses:
+            breaker.record_success()
+            return False
+        breaker.record_failure()
+        if attempt >= self.retries:
+            return False
+        logger.info("Retrying {} after {}".format(breaker.name, error or "status {}".format(response.status_code)))
+        return True
+
+    def call(self, send, breaker):
+        """Returns the response of send(), sending it again as long as it fails and retries are left"""
+        attempt = 0
+        while True:
+            breaker.before_call()
+            try:
+                response = send()
+            except RETRY_EXCEPTIONS as e:
+                if not self._check(attempt, breaker, error=e):
+                    raise
+            else:
+                if not self._check(attempt, breaker, response=response):
+                    return response
+                response.close()
+            time.sleep(self.get_delay(attempt))
+            attempt += 1
+
+    async def acall(self, send, breaker):
+        """Same as call, for a coroutine function"""
+        attempt = 0
+        while True:
+            breaker.before_call()
+            try:
+                response = await send()
+            except RETRY_EXCEPTIONS as e:
+                if not self._check(attempt, breaker, error=e):
+                    raise
+            else:
+                if not self._check(attempt, breaker, response=response):
+                    return response
+                await response.aclose()
+            await asyncio.sleep(self.get_delay(attempt))
+            attempt += 1
+
+
+retry_policy = RetryPolicy()
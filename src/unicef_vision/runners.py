@@ -0,0 +1,63 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.db import connections
+
+from unicef_vision.exceptions import VisionException
+from unicef_vision.settings import SYNC_DB_CONNECTIONS, SYNC_WORKERS
+
+logger = logging.getLogger(__name__)
+
+
+def _db_guard(semaphore):
+    @contextmanager
+    def guard():
+        with semaphore:
+            try:
+                yield
+            finally:
+                # give the connection back, so that no more than the allowed connections are open at once
+                connections.close_all()
+
+    return guard
+
+
+def _sync_business_area(synchronizer_class, business_area_code, semaphore, **kwargs):
+    synchronizer = synchronizer_class(business_area_code=business_area_code, **kwargs)
+    synchronizer.db_guard = _db_guard(semaphore)
+    try:
+        synchronizer.sync()
+    except VisionException:
+        # the error is recorded in the log of the business area, the other ones go on
+        logger.warning("Sync failed for {}".format(business_area_code), exc_info=True)
+    finally:
+        connections.close_all()
+    return synchronizer.log
+
+
+def sync_business_areas(synchronizer_class, business_area_codes, max_workers=None, db_connections=None, **kwargs):
+    """Syncs several business areas concurrently and returns their logs keyed by business area code
+
+    The load and conversion of the business areas run in a pool of max_workers threads, while the database writes
+    are limited to db_connections at a time. Each business area writes its own VisionLog.
+    """
+    semaphore = threading.BoundedSemaphore(db_connections or SYNC_DB_CONNECTIONS)
+    with ThreadPoolExecutor(max_workers=max_workers or SYNC_WORKERS) as executor:
+        futures = {
+            code: executor.submit(_sync_business_area, synchronizer_class, code, semaphore, **kwargs)
+            for code in business_area_codes
+        }
+    logs = {code: future.result() for code, future in futures.items()}
+
+    successful = sum(1 for log in logs.values() if log.successful)
+    logger.info(
+        "{} synced {}/{} business areas, {} records processed".format(
+            synchronizer_class.__name__,
+            successful,
+            len(logs),
+            sum(log.total_processed for log in logs.values()),
+        )
+    )
+    return logs
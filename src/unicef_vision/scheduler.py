@@ -0,0 +1,191 @@
+import datetime
+import logging
+import threading
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.utils import timezone
+
+from unicef_vision.exceptions import VisionException
+from unicef_vision.runners import _sync_business_area
+from unicef_vision.settings import ENDPOINT_CONCURRENCY, ENDPOINT_CONCURRENCY_LIMITS, SYNC_DB_CONNECTIONS, SYNC_WORKERS
+from unicef_vision.utils import get_vision_logger_domain_model
+
+logger = logging.getLogger(__name__)
+
+
+def _timedelta(value):
+    return value if isinstance(value, datetime.timedelta) else datetime.timedelta(seconds=value)
+
+
+class ScheduleEntry:
+    """A synchronizer class synced every interval for each of its business areas
+
+    When the last sync of a business area was successful but processed no record (e.g. not modified), the next one
+    is due after idle_interval instead, twice the interval by default.
+    """
+
+    def __init__(
+        self, synchronizer_class, interval, priority=0, business_area_codes=None, idle_interval=None, **kwargs
+    ):
+        if business_area_codes is None and not synchronizer_class.GLOBAL_CALL:
+            raise VisionException("business_area_codes are required to schedule {}".format(synchronizer_class.__name__))
+        self.synchronizer_class = synchronizer_class
+        self.interval = _timedelta(interval)
+        self.idle_interval = self.interval * 2 if idle_interval is None else _timedelta(idle_interval)
+        self.priority = priority
+        self.business_area_codes = list(business_area_codes) if business_area_codes is not None else [None]
+        self.kwargs = kwargs
+
+    @property
+    def handler_name(self):
+        return self.synchronizer_class.__name__
+
+    @property
+    def endpoint(self):
+        return getattr(self.synchronizer_class, "ENDPOINT", None) or self.handler_name
+
+    def get_interval(self, last_log):
+        if last_log.successful and not last_log.total_processed:
+            return self.idle_interval
+        return self.interval
+
+    def get_last_logs(self, now):
+        """Last VisionLog of each business area within the longest interval"""
+        logs = get_vision_logger_domain_model().objects.filter(
+            handler_name=self.handler_name,
+            date_processed__gte=now - max(self.interval, self.idle_interval),
+        )
+        if self.business_area_codes == [None]:
+            logs = logs.filter(business_area_code__isnull=True)
+        else:
+            logs = logs.filter(business_area_code__in=self.business_area_codes)
+        return {log.business_area_code: log for log in logs.order_by("date_processed")}
+
+    def get_due_jobs(self, now):
+        last_logs = self.get_last_logs(now)
+        jobs = []
+        for code in self.business_area_codes:
+            last_log = last_logs.get(code)
+            if last_log is None or now - last_log.date_processed >= self.get_interval(last_log):
+                jobs.append(ScheduledJob(self, code, last_log))
+        return jobs
+
+
+class ScheduledJob:
+    """Sync of a business area due for a schedule entry"""
+
+    def __init__(self, entry, business_area_code, last_log=None):
+        self.entry = entry
+        self.business_area_code = business_area_code
+        self.last_log = last_log
+
+    @property
+    def key(self):
+        return self.entry.handler_name, self.business_area_code
+
+    @property
+    def sort_key(self):
+        # higher priorities first, then the business areas never synced and the ones waiting for the longest time
+        if self.last_log is None:
+            return -self.entry.priority, 0
+        return -self.entry.priority, 1, self.last_log.date_processed
+
+    def __repr__(self):
+        return "<ScheduledJob {} {}>".format(*self.key)
+
+
+class Scheduler:
+    """Runs the syncs of the registered synchronizers when they are due, without any external broker
+
+    The due syncs run in a pool of max_workers threads, by priority. At most the limit of an ENDPOINT
+    (endpoint_limits, default_endpoint_limit otherwise) run at once, so that the Insight gateway is never called more
+    than allowed, and a business area is synced by one synchronizer at a time; the syncs that can not start yet are
+    skipped for the next ones, keeping the pool busy. The database writes are limited to db_connections at a time.
+    """
+
+    def __init__(
+        self,
+        max_workers=None,
+        db_connections=None,
+        endpoint_limits=None,
+        default_endpoint_limit=None,
+    ):
+        self.max_workers = max_workers or SYNC_WORKERS
+        self.db_connections = db_connections or SYNC_DB_CONNECTIONS
+        self.endpoint_limits = ENDPOINT_CONCURRENCY_LIMITS if endpoint_limits is None else endpoint_limits
+        self.default_endpoint_limit = default_endpoint_limit or ENDPOINT_CONCURRENCY
+        self.entries = []
+        self.stop_event = threading.Event()
+
+    def register(
+        self, synchronizer_class, interval, priority=0, business_area_codes=None, idle_interval=None, **kwargs
+    ):
+        """Schedules synchronizer_class every interval (seconds or timedelta), kwargs are passed to the synchronizer"""
+        entry = ScheduleEntry(synchronizer_class, interval, priority, business_area_codes, idle_interval, **kwargs)
+        self.entries.append(entry)
+        return entry
+
+    def get_endpoint_limit(self, endpoint):
+        return max(1, self.endpoint_limits.get(endpoint, self.default_endpoint_limit))
+
+    def get_due_jobs(self, now=None):
+        now = now or timezone.now()
+        jobs = [job for entry in self.entries for job in entry.get_due_jobs(now)]
+        return sorted(jobs, key=lambda job: job.sort_key)
+
+    def _can_start(self, job, endpoints, business_areas):
+        return (
+            endpoints[job.entry.endpoint] < self.get_endpoint_limit(job.entry.endpoint)
+            and job.business_area_code not in business_areas
+        )
+
+    def run_pending(self, now=None):
+        """Runs the due syncs and returns their logs by (handler name, business area code)"""
+        pending = self.get_due_jobs(now)
+        if not pending:
+            return {}
+        logger.info("{} syncs due".format(len(pending)))
+
+        semaphore = threading.BoundedSemaphore(self.db_connections)
+        running, logs = {}, {}
+        endpoints, business_areas = Counter(), set()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while pending or running:
+                for job in list(pending):
+                    if len(running) >= self.max_workers:
+                        break
+                    if not self._can_start(job, endpoints, business_areas):
+                        continue
+                    pending.remove(job)
+                    endpoints[job.entry.endpoint] += 1
+                    business_areas.add(job.business_area_code)
+                    future = executor.submit(
+                        _sync_business_area,
+                        job.entry.synchronizer_class,
+                        job.business_area_code,
+                        semaphore,
+                        **job.entry.kwargs
+                    )
+                    running[future] = job
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    job = running.pop(future)
+                    endpoints[job.entry.endpoint] -= 1
+                    business_areas.discard(job.business_area_code)
+                    try:
+                        logs[job.key] = future.result()
+                    except Exception:
+                        logger.warning("Sync failed for {} {}".format(*job.key), exc_info=True)
+        return logs
+
+    def run_forever(self, poll_interval=60):
+        """Runs the due syncs every poll_interval seconds, until stop is called"""
+        self.stop_event.clear()
+        while not self.stop_event.is_set():
+            self.run_pending()
+            self.stop_event.wait(poll_interval)
+
+    def stop(self):
+        self.stop_event.set()
@@ -3,3 +3,50 @@ from django.conf import settings
 # Timeout settings defaults to 400 secods or 5 min
 TIMEOUT = settings.INSIGHT_REQUESTS_TIMEOUT if hasattr(settings, "INSIGHT_REQUESTS_TIMEOUT") else 400
 INSIGHT_DATE_FORMAT = settings.INSIGHT_DATE_FORMAT if hasattr(settings, "INSIGHT_DATE_FORMAT") else "%d-%b-%y"
+# Number of distinct date strings whose conversion is memoized
+DATE_CACHE_SIZE = settings.INSIGHT_DATE_CACHE_SIZE if hasattr(settings, "INSIGHT_DATE_CACHE_SIZE") else 4096
+# Connect and read timeouts of the requests to Insight, both default to TIMEOUT
+CONNECT_TIMEOUT = settings.INSIGHT_CONNECT_TIMEOUT if hasattr(settings, "INSIGHT_CONNECT_TIMEOUT") else TIMEOUT
+READ_TIMEOUT = settings.INSIGHT_READ_TIMEOUT if hasattr(settings, "INSIGHT_READ_TIMEOUT") else TIMEOUT
+REQUEST_TIMEOUT = TIMEOUT if CONNECT_TIMEOUT == READ_TIMEOUT == TIMEOUT else (CONNECT_TIMEOUT, READ_TIMEOUT)
+# Retries of the requests failing with a connection error, a timeout or one of RETRY_STATUSES, the delay before the
+# retry n is a random value up to RETRY_BACKOFF * 2 ** n seconds, capped at RETRY_BACKOFF_MAX
+RETRIES = settings.INSIGHT_RETRIES if hasattr(settings, "INSIGHT_RETRIES") else 0
+RETRY_BACKOFF = settings.INSIGHT_RETRY_BACKOFF if hasattr(settings, "INSIGHT_RETRY_BACKOFF") else 1
+RETRY_BACKOFF_MAX = settings.INSIGHT_RETRY_BACKOFF_MAX if hasattr(settings, "INSIGHT_RETRY_BACKOFF_MAX") else 30
+RETRY_STATUSES = (
+    settings.INSIGHT_RETRY_STATUSES if hasattr(settings, "INSIGHT_RETRY_STATUSES") else (500, 502, 503, 504)
+)
+# After BREAKER_THRESHOLD failures in a row the requests to the same host fail fast for BREAKER_RESET_TIMEOUT
+# seconds, 0 disables the circuit breaker
+BREAKER_THRESHOLD = settings.INSIGHT_BREAKER_THRESHOLD if hasattr(settings, "INSIGHT_BREAKER_THRESHOLD") else 0
+BREAKER_RESET_TIMEOUT = (
+    settings.INSIGHT_BREAKER_RESET_TIMEOUT if hasattr(settings, "INSIGHT_BREAKER_RESET_TIMEOUT") else 60
+)
+# Size of the chunks read from the response when streaming data from Insight
+STREAM_CHUNK_SIZE = settings.INSIGHT_STREAM_CHUNK_SIZE if hasattr(settings, "INSIGHT_STREAM_CHUNK_SIZE") else 64 * 1024
+# Pages of a paginated endpoint fetched ahead of the one being processed
+PAGE_PREFETCH = settings.INSIGHT_PAGE_PREFETCH if hasattr(settings, "INSIGHT_PAGE_PREFETCH") else 2
+# Connection pool of the session shared by the requests to Insight
+POOL_CONNECTIONS = settings.INSIGHT_POOL_CONNECTIONS if hasattr(settings, "INSIGHT_POOL_CONNECTIONS") else 10
+POOL_MAXSIZE = settings.INSIGHT_POOL_MAXSIZE if hasattr(settings, "INSIGHT_POOL_MAXSIZE") else 10
+MAX_RETRIES = settings.INSIGHT_MAX_RETRIES if hasattr(settings, "INSIGHT_MAX_RETRIES") else 0
+# Threads and database connections used when syncing several business areas at once
+SYNC_WORKERS = settings.INSIGHT_SYNC_WORKERS if hasattr(settings, "INSIGHT_SYNC_WORKERS") else 4
+SYNC_DB_CONNECTIONS = settings.INSIGHT_SYNC_DB_CONNECTIONS if hasattr(settings, "INSIGHT_SYNC_DB_CONNECTIONS") else 2
+# Syncs of the same ENDPOINT run at once by the scheduler, INSIGHT_ENDPOINT_CONCURRENCY_LIMITS sets it by endpoint
+ENDPOINT_CONCURRENCY = settings.INSIGHT_ENDPOINT_CONCURRENCY if hasattr(settings, "INSIGHT_ENDPOINT_CONCURRENCY") else 2
+ENDPOINT_CONCURRENCY_LIMITS = (
+    settings.INSIGHT_ENDPOINT_CONCURRENCY_LIMITS if hasattr(settings, "INSIGHT_ENDPOINT_CONCURRENCY_LIMITS") else {}
+)
+# Cache used to keep data between syncs, like the validators of the conditional requests
+CACHE_ALIAS = settings.INSIGHT_CACHE_ALIAS if hasattr(settings, "INSIGHT_CACHE_ALIAS") else "default"
+# Time to live in seconds of the responses of get_data_from_insight and VisionAPIClient.make_request by endpoint,
+# "*" applies to any endpoint. Responses are not cached by default
+RESPONSE_CACHE_TTLS = settings.INSIGHT_RESPONSE_CACHE_TTLS if hasattr(settings, "INSIGHT_RESPONSE_CACHE_TTLS") else {}
+# Lock taken by the syncs so that the same handler and business area are not synced twice at once: None, "cache"
+# (INSIGHT_CACHE_ALIAS, held for up to SYNC_LOCK_TTL seconds) or "database" (PostgreSQL advisory lock). A sync
+# finding the lock taken waits up to SYNC_LOCK_WAIT seconds, then is skipped
+SYNC_LOCK_BACKEND = settings.INSIGHT_SYNC_LOCK if hasattr(settings, "INSIGHT_SYNC_LOCK") else None
+SYNC_LOCK_TTL = settings.INSIGHT_SYNC_LOCK_TTL if hasattr(settings, "INSIGHT_SYNC_LOCK_TTL") else 3600
+SYNC_LOCK_WAIT = settings.INSIGHT_SYNC_LOCK_WAIT if hasattr(settings, "INSIGHT_SYNC_LOCK_WAIT") else 0
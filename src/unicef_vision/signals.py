@@ -0,0 +1,76 @@
+from time import perf_counter
+
+from django.dispatch import Signal
+
+# sent at the start of the phases of a sync (load, convert, filter, save and, for MultiModelDataSynchronizer, the
+# write of each model and the map in the process pool) with the synchronizer, the phase and the number of records
+# going in, None when not known
+phase_started = Signal()
+# sent at the end of the phases with the synchronizer, the phase, the number of records coming out, the duration in
+# seconds and the exception raised by the phase, if any
+phase_finished = Signal()
+
+
+def _has_receivers():
+    return bool(phase_started.receivers or phase_finished.receivers)
+
+
+class SyncPhase:
+    """Context manager sending phase_started and phase_finished around a phase of a sync
+
+    The block sets records to the number of records coming out of the phase. Extra keyword arguments (e.g. the model
+    written) are sent with both signals. When no receiver is connected nothing is sent.
+    """
+
+    __slots__ = ("synchronizer", "phase", "records", "extra", "active", "started")
+
+    def __init__(self, synchronizer, phase, records=None, **extra):
+        self.synchronizer = synchronizer
+        self.phase = phase
+        self.records = records
+        self.extra = extra
+        self.active = _has_receivers()
+
+    def __enter__(self):
+        if self.active:
+            phase_started.send(
+                sender=self.synchronizer.__class__,
+                synchronizer=self.synchronizer,
+                phase=self.phase,
+                records=self.records,
+                **self.extra,
+            )
+            self.records = None
+            self.started = perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.active:
+            phase_finished.send(
+                sender=self.synchronizer.__class__,
+                synchronizer=self.synchronizer,
+                phase=self.phase,
+                records=self.records,
+                duration=perf_counter() - self.started,
+                exception=exc_value,
+                **self.extra,
+            )
+
+
+def _iter_phase(synchronizer, phase, iterable, extra):
+    with SyncPhase(synchronizer, phase, **extra) as event:
+        count = 0
+        for item in iterable:
+            count += 1
+            yield item
+        event.records = count
+
+
+def iter_phase(synchronizer, phase, iterable, **extra):
+    """Sends the signals of a lazy phase, started with the first item pulled and finished once iterable is exhausted
+
+    The iterable is returned as it is when no receiver is connected.
+    """
+    if not _has_receivers():
+        return iterable
+    return _iter_phase(synchronizer, phase, iterable, extra)
@@ -1,23 +1,140 @@
 import datetime
 import logging
+import multiprocessing
+import pickle
+import queue
 import sys
+import threading
 import types
 from abc import ABCMeta, abstractmethod
-from collections import OrderedDict
+from collections import Counter, OrderedDict
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from functools import partial
+from itertools import islice
 
-from django.db.models import NOT_PROVIDED
+import django
+from django.db import connections, router, transaction
+from django.db.models import Model
+from django.utils import timezone
 from django.utils.encoding import force_str
 
-from unicef_vision.exceptions import VisionException
-from unicef_vision.loaders import FileDataLoader, VisionDataLoader
-from unicef_vision.settings import INSIGHT_DATE_FORMAT
+from asgiref.sync import sync_to_async
+
+from unicef_vision.exceptions import VisionException, VisionNotModified
+from unicef_vision.fingerprints import FingerprintStore
+from unicef_vision.loaders import AsyncVisionDataLoader, FileDataLoader, PaginatedVisionDataLoader, VisionDataLoader
+from unicef_vision.locks import get_sync_lock
+from unicef_vision.mapping import Empty, map_records, map_value  # noqa: F401
+from unicef_vision.records import compact_records
+from unicef_vision.settings import SYNC_LOCK_BACKEND, SYNC_LOCK_TTL, SYNC_LOCK_WAIT
+from unicef_vision.signals import iter_phase, SyncPhase
+from unicef_vision.timing import PeakMemory, PHASES, PhaseTimer
 from unicef_vision.utils import get_vision_logger_domain_model
 
 logger = logging.getLogger(__name__)
 
 
-class Empty:
-    pass
+def merge_totals(totals, batch_totals):
+    """Merges the value returned by _save_records for a batch into the totals of the previous batches"""
+    if totals is None:
+        return batch_totals
+    if not isinstance(totals, dict) and not isinstance(batch_totals, dict):
+        return totals + batch_totals
+
+    totals = totals if isinstance(totals, dict) else {"processed": totals}
+    batch_totals = batch_totals if isinstance(batch_totals, dict) else {"processed": batch_totals}
+    merged = dict(totals, **batch_totals)
+    merged["processed"] = totals.get("processed", 0) + batch_totals.get("processed", 0)
+    if "total_records" in totals or "total_records" in batch_totals:
+        merged["total_records"] = totals.get("total_records", 0) + batch_totals.get("total_records", 0)
+    details = [d for d in (totals.get("details", ""), batch_totals.get("details", "")) if d]
+    merged["details"] = details[0] if len(set(details)) == 1 else "; ".join(details)
+    return merged
+
+
+def processed_count(totals):
+    """Number of records processed according to the value returned by _save_records"""
+    return totals.get("processed", 0) if isinstance(totals, dict) else totals
+
+
+class ModelPlan:
+    """Mapping of the json records to a model, compiled once and applied to every record
+
+    fields is a list of (field name, json key, converter, handler) tuples, the converter extracts the value from
+    the json record and the optional handler post-processes it.
+    related_lookups lists the (related model, lookup field, json key) of the fields fetched from the database.
+    pure_fields lists the fields which do not need the database, as expected by mapping.map_values.
+    """
+
+    def __init__(self, model, fields, unique_fields, defaults, related_lookups=(), pure_fields=()):
+        self.model = model
+        self.fields = fields
+        self.unique_fields = unique_fields
+        self.defaults = defaults
+        self.related_lookups = related_lookups
+        self.pure_fields = pure_fields
+
+    def map(self, json_item, values=None):
+        """Returns the lookup kwargs and the defaults of the json record
+
+        values holds the fields already mapped, e.g. by a worker process, the other ones are converted here.
+        """
+        kwargs, defaults = {}, {}
+        unique_fields = self.unique_fields
+        for field_name, _, converter, handler in self.fields:
+            if values is not None and field_name in values:
+                value = values[field_name]
+            else:
+                value = converter(json_item)
+                if handler:
+                    value = handler(value)
+            if field_name in unique_fields:
+                kwargs[field_name] = value
+            else:
+                defaults[field_name] = value
+        defaults.update(self.defaults)
+        return kwargs, defaults
+
+
+class RelatedObjectCache:
+    """Cache of the related objects fetched by the MODEL_MAPPING lookups during a sync"""
+
+    def __init__(self):
+        self.objects = {}
+        self.fields = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, model, field_name, value):
+        field = self.fields.get((model, field_name))
+        if field is None:
+            field = self.fields[(model, field_name)] = model._meta.get_field(field_name)
+        return model, field_name, None if value is None else field.to_python(value)
+
+    def get(self, model, field_name, value):
+        key = self._key(model, field_name, value)
+        obj = self.objects.get(key)
+        if obj is None:
+            self.misses += 1
+            obj = self.objects[key] = model.objects.get(**{field_name: value})
+        else:
+            self.hits += 1
+        return obj
+
+    def preload(self, model, field_name, values):
+        """Fetches with one query the objects not cached yet"""
+        missing = {value for value in values if value is not None}
+        missing = [value for value in missing if self._key(model, field_name, value) not in self.objects]
+        if not missing:
+            return
+        found = {}
+        for obj in model.objects.filter(**{"{}__in".format(field_name): missing}):
+            key = self._key(model, field_name, getattr(obj, field_name))
+            # leave ambiguous values to get(), so that it raises as the plain lookup does
+            found[key] = None if key in found else obj
+        self.objects.update((key, obj) for key, obj in found.items() if obj is not None)
 
 
 class DataSynchronizer:
@@ -26,7 +143,24 @@ class DataSynchronizer:
     REQUIRED_KEYS = {}
     GLOBAL_CALL = False
     LOADER_CLASS = None
+    ASYNC_LOADER_CLASS = None
     LOADER_EXTRA_KWARGS = []
+    # when STREAMING is enabled records flow from the loader to _save_records in batches of BATCH_SIZE
+    STREAMING = False
+    BATCH_SIZE = 1000
+    # when PIPELINED is enabled a producer thread streams the records into a queue of up to PIPELINE_QUEUE_SIZE
+    # batches of BATCH_SIZE, converted and saved by the sync thread while the next ones are downloaded
+    PIPELINED = False
+    PIPELINE_QUEUE_SIZE = 4
+    # when COMPACT_RECORDS is enabled the converted records only keep the keys returned by get_record_keys, stored
+    # in read only mappings much smaller than the json dicts; RECORD_KEYS lists the other keys used by the subclass
+    COMPACT_RECORDS = False
+    RECORD_KEYS = ()
+    # lock taken before syncing, so that the same handler and business area are never synced twice at once: a sync
+    # finding it taken waits up to LOCK_WAIT seconds, then is skipped and logged as such (see INSIGHT_SYNC_LOCK)
+    LOCK_BACKEND = SYNC_LOCK_BACKEND
+    LOCK_TTL = SYNC_LOCK_TTL
+    LOCK_WAIT = SYNC_LOCK_WAIT
     detail = None
     business_area_code = None
 
@@ -46,59 +180,364 @@ class DataSynchronizer:
         self.business_area_code = business_area_code
         logger.info("Synchronizer is {} - {} {}".format(self.__class__.__name__, self.detail, self.business_area_code))
         self.kwargs = self.set_kwargs(**kwargs)
+        # context manager wrapping the database writes, runners use it to bound the concurrent connections
+        self.db_guard = nullcontext
+        self.timer = PhaseTimer()
+        self._reset_rejections()
+
+    def _reset_rejections(self):
+        # records discarded by _filter_records, and how many of them missed each of the REQUIRED_KEYS
+        self.rejected_records = 0
+        self.missing_keys = Counter()
+        # records which could not be saved, the sync is still successful but they are fetched again by the next one
+        self.failed_records = 0
+
+    def _iter_valid_records(self, records, required_keys):
+        """Yields the records holding all the required_keys, counting the keys missing from the other ones"""
+        for record in records:
+            if record.keys() >= required_keys:
+                yield record
+            else:
+                self.rejected_records += 1
+                self.missing_keys.update(key for key in required_keys if key not in record)
 
     def _filter_records(self, records):
-        def is_valid_record(record):
-            for key in self.REQUIRED_KEYS:
-                if key not in record:
-                    return False
-            return True
+        required_keys = frozenset(self.REQUIRED_KEYS)
+        if isinstance(records, list):
+            with self.timer.phase("filter"), SyncPhase(self, "filter", records=len(records)) as event:
+                filtered = list(self._iter_valid_records(records, required_keys)) if required_keys else records[:]
+                event.records = len(filtered)
+            return filtered
+        filtered = self._iter_valid_records(records, required_keys) if required_keys else iter(records)
+        return self.timer.iter("filter", iter_phase(self, "filter", filtered))
+
+    def get_record_keys(self):
+        """Keys of the json records used by the sync"""
+        return set(self.REQUIRED_KEYS) | set(self.RECORD_KEYS)
+
+    def _compact_records(self, records):
+        if not self.COMPACT_RECORDS:
+            return records
+        return compact_records(records, self.get_record_keys())
+
+    def _count_records(self, records):
+        for record in records:
+            self.log.total_records += 1
+            yield record
+
+    @staticmethod
+    def _chunks(records, size):
+        records = iter(records)
+        chunk = list(islice(records, size))
+        while chunk:
+            yield chunk
+            chunk = list(islice(records, size))
+
+    def _sync_stream(self, data_getter):
+        """Streams the records from the loader and saves them in batches, so that only one batch is in memory"""
+        records = self.timer.iter("fetch", iter_phase(self, "load", data_getter.stream()))
+        converted_records = self._compact_records(self._convert_records(records))
+        converted_records = self.timer.iter("convert", iter_phase(self, "convert", converted_records))
+
+        totals = None
+        for batch in self._chunks(self._count_records(converted_records), self.BATCH_SIZE):
+            with self.db_guard(), self.timer.phase("save"), SyncPhase(self, "save", records=len(batch)) as event:
+                batch_totals = self._save_records(batch)
+                event.records = processed_count(batch_totals)
+            totals = merge_totals(totals, batch_totals)
+        logger.info("{} records streamed in batches of {}".format(self.log.total_records, self.BATCH_SIZE))
+        return 0 if totals is None else totals
+
+    @staticmethod
+    def _put(batches, item, stop):
+        """Puts item in the queue, blocking while it is full unless the sync is stopped"""
+        while not stop.is_set():
+            try:
+                batches.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _produce(self, data_getter, batches, stop):
+        """Runs in the producer thread of a pipelined sync, puts (batch, None) items then (None, error or None)"""
+        records = None
+        try:
+            records = data_getter.stream()
+            loaded = data_getter.timer.iter("fetch", iter_phase(self, "load", records))
+            for batch in self._chunks(loaded, self.BATCH_SIZE):
+                if not self._put(batches, (batch, None), stop):
+                    return
+        except Exception as e:
+            self._put(batches, (None, e), stop)
+        else:
+            self._put(batches, (None, None), stop)
+        finally:
+            close = getattr(records, "close", None)
+            if close is not None:
+                close()
 
-        return [rec for rec in records if is_valid_record(rec)]
+    def _sync_pipelined(self, data_getter):
+        """Saves the batches of records while the producer thread downloads the next ones
+
+        The queue holds at most PIPELINE_QUEUE_SIZE batches: the producer waits when the writes fall behind. The
+        errors of the producer are raised here, an error while saving stops the producer.
+        """
+        # the timers are not thread safe, the producer has its own
+        data_getter.timer = PhaseTimer()
+        batches = queue.Queue(maxsize=self.PIPELINE_QUEUE_SIZE)
+        stop = threading.Event()
+        producer = threading.Thread(
+            target=self._produce,
+            args=(data_getter, batches, stop),
+            name="{}-producer".format(self.__class__.__name__),
+            daemon=True,
+        )
+        producer.start()
+
+        totals = None
+        try:
+            while True:
+                batch, error = batches.get()
+                if error is not None:
+                    raise error
+                if batch is None:
+                    break
+                with self.timer.phase("convert"), SyncPhase(self, "convert", records=len(batch)) as event:
+                    converted_records = self._compact_records(self._convert_records(batch))
+                    if not isinstance(converted_records, list):
+                        converted_records = list(converted_records)
+                    event.records = len(converted_records)
+                self.log.total_records += len(converted_records)
+                with self.db_guard(), self.timer.phase("save"):
+                    with SyncPhase(self, "save", records=len(converted_records)) as event:
+                        batch_totals = self._save_records(converted_records)
+                        event.records = processed_count(batch_totals)
+                totals = merge_totals(totals, batch_totals)
+        finally:
+            stop.set()
+            producer.join()
+            self.timer.merge(data_getter.timer)
+        logger.info("{} records pipelined in batches of {}".format(self.log.total_records, self.BATCH_SIZE))
+        return 0 if totals is None else totals
 
     def preload(self):  # pragma: no cover
         """hook to execute custom code before loading"""
         pass
 
+    def get_sync_stats(self):
+        """Counters of the current sync, appended to the VisionLog details"""
+        stats = {}
+        if self.rejected_records:
+            stats["rejected"] = self.rejected_records
+            for key, count in self.missing_keys.most_common():
+                stats["missing_{}".format(key)] = count
+        if self.failed_records:
+            stats["failed"] = self.failed_records
+        return stats
+
+    def _log_details(self, details):
+        stats = ", ".join("{}={}".format(key, value) for key, value in self.get_sync_stats().items())
+        details = "; ".join(detail for detail in (details, stats) if detail)
+        return details[: self.log._meta.get_field("details").max_length]
+
+    def _log_timings(self):
+        """Sets the duration of the phases, the bytes downloaded and the peak memory of the sync on the log"""
+        for phase in PHASES:
+            duration = self.timer.durations.get(phase)
+            setattr(self.log, "{}_time".format(phase), None if duration is None else round(duration, 6))
+        self.log.bytes_downloaded = self.timer.bytes_downloaded
+        self.log.peak_memory = self.memory.stop()
+
     def logger_parameters(self):
         return {
             "handler_name": self.__class__.__name__,
             "business_area_code": self.business_area_code,
         }
 
+    def _log_totals(self, totals):
+        if isinstance(totals, dict):
+            self.log.total_processed = totals.get("processed", 0)
+            self.log.details = totals.get("details", "")
+            self.log.total_records = totals.get("total_records", self.log.total_records)
+        else:
+            self.log.total_processed = totals
+        self.log.total_failed = self.failed_records
+        self.log.successful = True
+
+    def get_loader_kwargs(self):
+        return self.kwargs
+
+    def get_loader_class(self):
+        return self.LOADER_CLASS
+
+    def get_last_successful_log(self, **filters):
+        """Last successful VisionLog of the same handler and business area, matching the filters"""
+        return (
+            get_vision_logger_domain_model()
+            .objects.filter(successful=True, **filters, **self.logger_parameters())
+            .order_by("-date_processed")
+            .first()
+        )
+
+    def _loader_succeeded(self, data_getter):
+        """Called once the loaded data is saved
+
+        The validators are not kept when records failed, so that the next sync fetches them again instead of being
+        answered with a 304.
+        """
+        if hasattr(data_getter, "save_validators") and not self.failed_records:
+            data_getter.save_validators()
+
+    def _start_sync(self):
+        """Sets up the state of a new sync"""
+        self.log = get_vision_logger_domain_model()(**self.logger_parameters())
+        self.log.date_started = timezone.now()
+        self.memory = PeakMemory()
+        self.memory.start()
+        self.timer = PhaseTimer()
+        self._reset_rejections()
+
+    def _end_sync(self):
+        """Releases the resources held during the sync"""
+        pass
+
+    def get_lock(self):
+        """Lock of the handler and business area, None when LOCK_BACKEND is not set"""
+        name = "sync:{handler_name}:{business_area_code}".format(**self.logger_parameters())
+        using = router.db_for_write(get_vision_logger_domain_model())
+        return get_sync_lock(self.LOCK_BACKEND, name, self.LOCK_TTL, using)
+
+    def _log_skipped(self):
+        """Logs a sync skipped because the same one is already running"""
+        logger.info("{} {} is already running, skipped".format(self.__class__.__name__, self.business_area_code))
+        self._start_sync()
+        self.memory.stop()
+        self.log.details = "Skipped, already running"
+        with self.db_guard():
+            self.log.save()
+
     def sync(self):
         """
-        Performs the database sync
+        Performs the database sync, unless the same sync is already running elsewhere
         :return:
         """
-        self.log = get_vision_logger_domain_model()(**self.logger_parameters())
+        lock = self.get_lock()
+        if lock is not None and not lock.acquire(self.LOCK_WAIT):
+            self._log_skipped()
+            return
+        try:
+            self._sync()
+        finally:
+            if lock is not None:
+                lock.release()
+
+    def _sync(self):
+        self._start_sync()
 
-        data_getter = self.LOADER_CLASS(**self.kwargs)
+        data_getter = self.get_loader_class()(**self.get_loader_kwargs())
+        data_getter.timer = self.timer
 
         try:
-            original_records = data_getter.get()
+            if self.PIPELINED:
+                totals = self._sync_pipelined(data_getter)
+            elif self.STREAMING:
+                totals = self._sync_stream(data_getter)
+            else:
+                with self.timer.phase("fetch"), SyncPhase(self, "load") as event:
+                    original_records = data_getter.get()
+                    event.records = len(original_records)
+                logger.info("{} records returned from get".format(len(original_records)))
+
+                with self.timer.phase("convert"), SyncPhase(self, "convert", records=len(original_records)) as event:
+                    converted_records = self._compact_records(self._convert_records(original_records))
+                    event.records = len(converted_records)
+                # release the json records, only the converted ones are saved
+                del original_records
+                self.log.total_records = len(converted_records)
+                logger.info("{} records returned from conversion".format(len(converted_records)))
+
+                with self.db_guard(), self.timer.phase("save"):
+                    with SyncPhase(self, "save", records=len(converted_records)) as event:
+                        totals = self._save_records(converted_records)
+                        event.records = processed_count(totals)
+        except VisionNotModified:
+            logger.info("Data not modified")
+            self._log_totals({"processed": 0, "details": "Not modified"})
+        except Exception as e:
+            logger.info("sync", exc_info=True)
+            self.log.exception_message = force_str(e)
+            traceback = sys.exc_info()[2]
+            raise VisionException(force_str(e)).with_traceback(traceback)
+        else:
+            self._log_totals(totals)
+            self._loader_succeeded(data_getter)
+        finally:
+            self._end_sync()
+            self.log.details = self._log_details(self.log.details)
+            self._log_timings()
+            with self.db_guard():
+                self.log.save()
+
+    async def async_sync(self):
+        """
+        Performs the database sync fetching the data with ASYNC_LOADER_CLASS, without blocking the event loop.
+        The records are saved in batches of BATCH_SIZE, each one in a thread through sync_to_async.
+        :return:
+        """
+        if self.ASYNC_LOADER_CLASS is None:
+            raise VisionException("{} does not support async sync".format(self.__class__.__name__))
+        lock = await sync_to_async(self.get_lock)()
+        if lock is not None and not await lock.aacquire(self.LOCK_WAIT):
+            await sync_to_async(self._log_skipped)()
+            return
+        try:
+            await self._async_sync()
+        finally:
+            if lock is not None:
+                await sync_to_async(lock.release)()
+
+    async def _async_sync(self):
+        self._start_sync()
+
+        data_getter = self.ASYNC_LOADER_CLASS(**await sync_to_async(self.get_loader_kwargs)())
+        data_getter.timer = self.timer
+
+        try:
+            with self.timer.phase("fetch"), SyncPhase(self, "load") as event:
+                original_records = await data_getter.get()
+                event.records = len(original_records)
             logger.info("{} records returned from get".format(len(original_records)))
 
-            converted_records = self._convert_records(original_records)
+            with self.timer.phase("convert"), SyncPhase(self, "convert", records=len(original_records)) as event:
+                converted_records = self._compact_records(self._convert_records(original_records))
+                event.records = len(converted_records)
+            del original_records
             self.log.total_records = len(converted_records)
             logger.info("{} records returned from conversion".format(len(converted_records)))
 
-            totals = self._save_records(converted_records)
+            totals = None
+            for batch in self._chunks(converted_records, self.BATCH_SIZE):
+                with self.timer.phase("save"), SyncPhase(self, "save", records=len(batch)) as event:
+                    batch_totals = await sync_to_async(self._save_records)(batch)
+                    event.records = processed_count(batch_totals)
+                totals = merge_totals(totals, batch_totals)
+        except VisionNotModified:
+            logger.info("Data not modified")
+            self._log_totals({"processed": 0, "details": "Not modified"})
         except Exception as e:
             logger.info("sync", exc_info=True)
             self.log.exception_message = force_str(e)
             traceback = sys.exc_info()[2]
             raise VisionException(force_str(e)).with_traceback(traceback)
         else:
-            if isinstance(totals, dict):
-                self.log.total_processed = totals.get("processed", 0)
-                self.log.details = totals.get("details", "")
-                self.log.total_records = totals.get("total_records", self.log.total_records)
-            else:
-                self.log.total_processed = totals
-            self.log.successful = True
+            self._log_totals(0 if totals is None else totals)
+            await sync_to_async(self._loader_succeeded)(data_getter)
         finally:
-            self.log.save()
+            await sync_to_async(self._end_sync)()
+            self.log.details = self._log_details(self.log.details)
+            self._log_timings()
+            await sync_to_async(self.log.save)()
 
 
 class VisionDataSynchronizer(DataSynchronizer):
@@ -106,6 +545,23 @@ class VisionDataSynchronizer(DataSynchronizer):
 
     ENDPOINT = None
     LOADER_CLASS = VisionDataLoader
+    ASYNC_LOADER_CLASS = AsyncVisionDataLoader
+    # send the validators of the last sync in which no record failed, a 304 ends the sync as successful with no changes
+    CONDITIONAL_FETCH = False
+    # query parameter sent with the start date of the last successful sync, minus CHANGED_SINCE_OVERLAP
+    CHANGED_SINCE_PARAM = None
+    CHANGED_SINCE_FORMAT = "%Y-%m-%dT%H:%M:%S"
+    CHANGED_SINCE_OVERLAP = datetime.timedelta(hours=1)
+    # with PAGE_SIZE the endpoint is fetched a page at a time by PAGINATED_LOADER_CLASS, passing the page size in
+    # PAGE_SIZE_PARAM and the offset in PAGE_OFFSET_PARAM, or the PAGE_CURSOR_KEY of the previous page in
+    # PAGE_CURSOR_PARAM; PAGE_PREFETCH pages are downloaded ahead (INSIGHT_PAGE_PREFETCH by default)
+    PAGINATED_LOADER_CLASS = PaginatedVisionDataLoader
+    PAGE_SIZE = None
+    PAGE_SIZE_PARAM = "pagesize"
+    PAGE_OFFSET_PARAM = "offset"
+    PAGE_CURSOR_PARAM = None
+    PAGE_CURSOR_KEY = None
+    PAGE_PREFETCH = None
 
     def __init__(self, detail=None, business_area_code=None, *args, **kwargs) -> None:
         if business_area_code is None and not self.GLOBAL_CALL:
@@ -115,7 +571,8 @@ class VisionDataSynchronizer(DataSynchronizer):
         super().__init__(detail, business_area_code, *args, **kwargs)
 
     def _convert_records(self, records):
-        if isinstance(records, list):
+        if isinstance(records, (list, Iterator)):
+            # an iterator comes from a streaming loader, which already yields single rows
             return records
         elif records and "ROWSET" in records:
             records = records["ROWSET"]["ROW"]
@@ -134,8 +591,53 @@ class VisionDataSynchronizer(DataSynchronizer):
             kwargs["detail"] = self.detail
         if self.business_area_code:
             kwargs["businessarea"] = self.business_area_code
+        if self.CONDITIONAL_FETCH:
+            kwargs["conditional"] = True
+        return kwargs
+
+    def get_loader_kwargs(self):
+        kwargs = super().get_loader_kwargs()
+        if self.CHANGED_SINCE_PARAM:
+            changed_since = self.get_changed_since()
+            if changed_since:
+                kwargs = dict(kwargs, **{self.CHANGED_SINCE_PARAM: changed_since.strftime(self.CHANGED_SINCE_FORMAT)})
+        if self.PAGE_SIZE:
+            kwargs = dict(kwargs, **self.get_pagination_kwargs())
         return kwargs
 
+    def get_changed_since(self):
+        """Start of the last successful sync in which no record failed, minus CHANGED_SINCE_OVERLAP
+
+        The changes made while that sync was running and the records failing since are fetched again.
+        """
+        with self.db_guard():
+            last_log = self.get_last_successful_log(total_failed=0, date_started__isnull=False)
+        if last_log is None:
+            return None
+        return last_log.date_started - self.CHANGED_SINCE_OVERLAP
+
+    def get_pagination_kwargs(self):
+        kwargs = {
+            "page_size": self.PAGE_SIZE,
+            "page_size_param": self.PAGE_SIZE_PARAM,
+            "offset_param": self.PAGE_OFFSET_PARAM,
+            "cursor_param": self.PAGE_CURSOR_PARAM,
+            "cursor_key": self.PAGE_CURSOR_KEY,
+        }
+        if self.PAGE_PREFETCH is not None:
+            kwargs["prefetch"] = self.PAGE_PREFETCH
+        return kwargs
+
+    def get_loader_class(self):
+        if self.PAGE_SIZE:
+            return self.PAGINATED_LOADER_CLASS
+        return super().get_loader_class()
+
+    async def async_sync(self):
+        if self.PAGE_SIZE:
+            raise VisionException("{} is paginated, it does not support async sync".format(self.__class__.__name__))
+        return await super().async_sync()
+
 
 class FileDataSynchronizer(DataSynchronizer):
     __metaclass__ = ABCMeta
@@ -161,92 +663,419 @@ class MultiModelDataSynchronizer(VisionDataSynchronizer):
     DATE_FIELDS = []
     DEFAULTS = {}
     FIELD_HANDLERS = {}
+    # when BULK is enabled records are upserted in chunks of BULK_BATCH_SIZE with bulk_create and bulk_update,
+    # using INSERT ... ON CONFLICT where the database supports it and BULK_ON_CONFLICT is set
+    BULK = False
+    BULK_BATCH_SIZE = 1000
+    BULK_ON_CONFLICT = True
+    # when PRELOAD_RELATED is enabled the related objects of the records are fetched with one query per batch
+    PRELOAD_RELATED = False
+    # when SKIP_UNCHANGED is enabled the items whose content did not change since the last sync are not written,
+    # fingerprints are stored in INSIGHT_FINGERPRINT_MODEL and records are processed in chunks of BULK_BATCH_SIZE
+    SKIP_UNCHANGED = False
+    # when TRANSACTION_BATCH_SIZE is set records are saved in transactions of TRANSACTION_BATCH_SIZE records
+    # (BULK_BATCH_SIZE in bulk mode), each record in its own savepoint so that a failing record is rolled back alone
+    TRANSACTION_BATCH_SIZE = None
+    # when MAPPING_PROCESSES is set the fields which do not need the database (dates, plain values and their
+    # FIELD_HANDLERS) are mapped by a pool of MAPPING_PROCESSES processes, in chunks of MAPPING_CHUNK_SIZE records;
+    # FIELD_HANDLERS and the field defaults must be picklable, and the processes, started fresh rather than forked,
+    # set up Django with the settings of DJANGO_SETTINGS_MODULE
+    MAPPING_PROCESSES = 0
+    MAPPING_CHUNK_SIZE = 1000
+
+    def __init__(self, detail=None, business_area_code=None, *args, **kwargs) -> None:
+        super().__init__(detail, business_area_code, *args, **kwargs)
+        self._model_plans = {}
+        self._mapping_pool = None
+        self.related_cache = RelatedObjectCache()
+        self.fingerprints = FingerprintStore()
+
+    def _start_sync(self):
+        super()._start_sync()
+        self._model_plans = {}
+        self.related_cache = RelatedObjectCache()
+        self.fingerprints = FingerprintStore()
+
+    def _end_sync(self):
+        super()._end_sync()
+        if self._mapping_pool is not None:
+            self._mapping_pool.shutdown()
+            self._mapping_pool = None
+
+    def get_record_keys(self):
+        keys = super().get_record_keys() | set(self.DATE_FIELDS)
+        for mapping in self.MAPPING.values():
+            keys.update(mapping.values())
+        return keys
+
+    def get_sync_stats(self):
+        stats = super().get_sync_stats()
+        if self.related_cache.hits or self.related_cache.misses:
+            stats["related_cache_hits"] = self.related_cache.hits
+            stats["related_cache_misses"] = self.related_cache.misses
+        if self.SKIP_UNCHANGED:
+            stats["skipped_unchanged"] = self.fingerprints.skipped
+            stats["written"] = self.fingerprints.written
+        return stats
+
+    def _preload_related(self, records):
+        for model_name, model in self.MODEL_MAPPING.items():
+            try:
+                plan = self.get_model_plan(model_name, model)
+            except Exception:
+                # the error is logged for each record while processing them
+                continue
+            for related_model, lookup_field, field_json_code in plan.related_lookups:
+                values = [record.get(field_json_code, None) for record in records]
+                self.related_cache.preload(related_model, lookup_field, values)
 
     def _get_field_value(self, field_name, field_json_code, json_item, model):
-        if field_json_code in self.DATE_FIELDS:
-            # parsing field as date
-            return datetime.datetime.strptime(json_item[field_json_code], INSIGHT_DATE_FORMAT).date()
-        elif field_name in self.MODEL_MAPPING.keys():
-            # this is related model, so we need to fetch somehow related object.
-            related_model = self.MODEL_MAPPING[field_name]
-
-            if isinstance(related_model, types.FunctionType):
-                # callable provided, object should be returned from it
-                result = related_model(data=json_item, key_field=field_json_code)
-            else:
-                # model class provided, related object can be fetched with query by field
-                # analogue of field_json_code
-                reversed_dict = dict(
-                    zip(
-                        self.MAPPING[field_name].values(),
-                        self.MAPPING[field_name].keys(),
-                    )
-                )
-                result = related_model.objects.get(
-                    **{reversed_dict[field_json_code]: json_item.get(field_json_code, None)}
-                )
+        model_name = {y: x for x, y in self.MODEL_MAPPING.items()}.get(model)
+        if field_json_code in self.DATE_FIELDS or field_name not in self.MODEL_MAPPING.keys():
+            # dates and fields used as they are, with their default and handler, see mapping.map_value
+            return map_value(self._pure_field(field_name, field_json_code, model_name, model), json_item)
+
+        # this is related model, so we need to fetch somehow related object.
+        related_model = self.MODEL_MAPPING[field_name]
+        if isinstance(related_model, types.FunctionType):
+            # callable provided, object should be returned from it
+            result = related_model(data=json_item, key_field=field_json_code)
         else:
-            # field can be used as it is without custom mappings. if field has default, it should be used
-            result = json_item.get(field_json_code, Empty)
-            if result is Empty:
-                # try to get default for field
-                field_default = model._meta.get_field(field_name).default
-                if field_default is not NOT_PROVIDED:
-                    result = field_default
+            # model class provided, related object can be fetched with query by field
+            # analogue of field_json_code
+            result = related_model.objects.get(
+                **{self._related_lookup_field(field_name, field_json_code): json_item.get(field_json_code, None)}
+            )
 
         # additional logic on field may be applied
-        value_handler = self.FIELD_HANDLERS.get({y: x for x, y in self.MODEL_MAPPING.items()}.get(model), {}).get(
-            field_name, None
-        )
+        value_handler = self.FIELD_HANDLERS.get(model_name, {}).get(field_name, None)
         if value_handler:
             result = value_handler(result)
         return result
 
-    def _process_record(self, json_item):
+    def _pure_field(self, field_name, field_json_code, model_name, model):
+        """Field converted without the database, as expected by mapping.map_value"""
+        return (
+            field_name,
+            field_json_code,
+            field_json_code in self.DATE_FIELDS,
+            model._meta.get_field(field_name).default,
+            self.FIELD_HANDLERS.get(model_name, {}).get(field_name, None),
+        )
+
+    def _related_lookup_field(self, field_name, field_json_code):
+        """Field of the related model mapped to the same json key"""
+        return dict(zip(self.MAPPING[field_name].values(), self.MAPPING[field_name].keys()))[field_json_code]
+
+    def _compile_field(self, field_name, field_json_code, model_name, model):
+        """Returns the converter of a json value and the handler applied to its result, as in _get_field_value"""
+        if type(self)._get_field_value is not MultiModelDataSynchronizer._get_field_value:
+            # keep honouring subclasses customizing the conversion
+            return lambda json_item: self._get_field_value(field_name, field_json_code, json_item, model), None
+
+        if field_json_code in self.DATE_FIELDS or field_name not in self.MODEL_MAPPING.keys():
+            # the handler is applied by map_value
+            return partial(map_value, self._pure_field(field_name, field_json_code, model_name, model)), None
+
+        related_model = self.MODEL_MAPPING[field_name]
+        if isinstance(related_model, types.FunctionType):
+
+            def converter(json_item):
+                return related_model(data=json_item, key_field=field_json_code)
+
+        else:
+            lookup_field = self._related_lookup_field(field_name, field_json_code)
+
+            def converter(json_item):
+                return self.related_cache.get(related_model, lookup_field, json_item.get(field_json_code, None))
+
+        return converter, self.FIELD_HANDLERS.get(model_name, {}).get(field_name, None)
+
+    def _compile_model_plan(self, model_name, model):
+        mapping = self.MAPPING[model_name]
+        fields = [
+            (field_name, field_json_code) + self._compile_field(field_name, field_json_code, model_name, model)
+            for field_name, field_json_code in mapping.items()
+        ]
+
+        unique_fields = [field_name for field_name in mapping if model._meta.get_field(field_name).unique]
+        if not unique_fields:
+            for fields_together in model._meta.unique_together:
+                if all(field in mapping.keys() for field in fields_together):
+                    unique_fields = list(fields_together)
+                    break
+            else:
+                raise VisionException("No unique fields mapped for {}".format(model_name))
+
+        related_lookups = [
+            (self.MODEL_MAPPING[field_name], self._related_lookup_field(field_name, field_json_code), field_json_code)
+            for field_name, field_json_code in mapping.items()
+            if field_name in self.MODEL_MAPPING.keys()
+            and field_json_code not in self.DATE_FIELDS
+            and not isinstance(self.MODEL_MAPPING[field_name], types.FunctionType)
+        ]
+
+        if type(self)._get_field_value is MultiModelDataSynchronizer._get_field_value:
+            pure_fields = [
+                self._pure_field(field_name, field_json_code, model_name, model)
+                for field_name, field_json_code in mapping.items()
+                if field_json_code in self.DATE_FIELDS or field_name not in self.MODEL_MAPPING.keys()
+            ]
+        else:
+            pure_fields = []
+
+        return ModelPlan(model, fields, unique_fields, self.DEFAULTS.get(model, {}), related_lookups, pure_fields)
+
+    def get_model_plan(self, model_name, model):
+        """Mapping plan of the model, compiled on first use and reset when a sync starts"""
+        plan = self._model_plans.get(model_name)
+        if plan is None:
+            plan = self._model_plans[model_name] = self._compile_model_plan(model_name, model)
+        return plan
+
+    def _map_item(self, json_item, model_name, model, mapped=None):
+        """Maps the json record to the lookup kwargs and the defaults used to upsert an instance of model
+
+        mapped holds the values of the record mapped by the process pool, by model name.
+        """
+        values = None if mapped is None else mapped.get(model_name)
+        if isinstance(values, Exception):
+            raise values
+        return self.get_model_plan(model_name, model).map(json_item, values)
+
+    def _get_mapping_pool(self):
+        if self._mapping_pool is None:
+            # forking a process running other threads (producer, runners, scheduler) can deadlock the worker
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+            # the FIELD_HANDLERS are usually defined in modules importing models, Django is set up to unpickle them
+            self._mapping_pool = ProcessPoolExecutor(
+                max_workers=self.MAPPING_PROCESSES, mp_context=context, initializer=django.setup
+            )
+        return self._mapping_pool
+
+    def _map_records(self, records):
+        """Maps the fields of the records which do not need the database in the process pool
+
+        Returns a list with the values mapped for each record, by model name.
+        """
+        plans = []
+        for model_name, model in self.MODEL_MAPPING.items():
+            try:
+                plans.append((model_name, self.get_model_plan(model_name, model).pure_fields))
+            except Exception:
+                # the error is logged for each record while processing them
+                continue
         try:
-            for model_name, model in self.MODEL_MAPPING.items():
-                mapped_item = dict(
-                    [
-                        (
-                            field_name,
-                            self._get_field_value(field_name, field_json_code, json_item, model),
-                        )
-                        for field_name, field_json_code in self.MAPPING[model_name].items()
-                    ]
-                )
-                kwargs = dict(
-                    [
-                        (field_name, value)
-                        for field_name, value in mapped_item.items()
-                        if model._meta.get_field(field_name).unique
-                    ]
-                )
+            pickle.dumps(plans)
+        except Exception as e:
+            raise VisionException(
+                "FIELD_HANDLERS and field defaults must be picklable to use MAPPING_PROCESSES: {}".format(e)
+            )
 
-                if not kwargs:
-                    for fields in model._meta.unique_together:
-                        if all(field in mapped_item.keys() for field in fields):
-                            unique_fields = fields
-                            break
+        chunks = self._chunks(records, self.MAPPING_CHUNK_SIZE)
+        return [
+            mapped
+            for results in self._get_mapping_pool().map(partial(map_records, plans), chunks)
+            for mapped in results
+        ]
 
-                    kwargs = {field: mapped_item[field] for field in unique_fields}
+    def _atomic(self, model=None):
+        """Transaction (or savepoint) on the database model is written to, the one of the models by default"""
+        if model is None:
+            model = next(iter(self.MODEL_MAPPING.values()))
+        return transaction.atomic(using=router.db_for_write(model))
 
-                defaults = dict(
-                    [
-                        (field_name, value)
-                        for field_name, value in mapped_item.items()
-                        if field_name not in kwargs.keys()
-                    ]
-                )
-                defaults.update(self.DEFAULTS.get(model, {}))
-                model.objects.update_or_create(defaults=defaults, **kwargs)
+    def _savepoint(self):
+        return self._atomic() if self.TRANSACTION_BATCH_SIZE and self.MODEL_MAPPING else nullcontext()
+
+    def _process_record(self, json_item, mapped=None):
+        try:
+            with self._savepoint():
+                for model_name, model in self.MODEL_MAPPING.items():
+                    kwargs, defaults = self._map_item(json_item, model_name, model, mapped)
+                    with SyncPhase(self, "write", records=1, model=model) as event:
+                        model.objects.update_or_create(defaults=defaults, **kwargs)
+                        event.records = 1
         except Exception:
             logger.warning("Exception processing record", exc_info=True)
+            self.failed_records += 1
+
+    def _process_mapped_record(self, json_item, mapped):
+        """Processes the record, passing mapped only when the process pool is used
+
+        Subclasses overriding _process_record(json_item) keep working as long as MAPPING_PROCESSES is not set.
+        """
+        if mapped is None:
+            self._process_record(json_item)
+        else:
+            self._process_record(json_item, mapped)
+
+    def _unique_key(self, model, fields, values):
+        """Normalized values of the unique fields, to match mapped items with the existing instances"""
+        key = []
+        for field_name in fields:
+            field = model._meta.get_field(field_name)
+            value = values[field_name]
+            if field.is_relation:
+                key.append(value.pk if isinstance(value, Model) else value)
+            else:
+                key.append(field.to_python(value))
+        return tuple(key)
+
+    def _bulk_upsert(self, model, items):
+        """Creates or updates the mapped items of a model with a constant number of queries
+
+        items is a list of (kwargs, defaults) pairs as returned by _map_item. As with bulk_create and bulk_update,
+        model save() and signals are not called.
+        """
+        unique_fields = list(items[0][0].keys())
+        # the last occurrence of the same key wins, as it would with update_or_create
+        items = {self._unique_key(model, unique_fields, kwargs): (kwargs, defaults) for kwargs, defaults in items}
+        update_fields = list(dict.fromkeys(field for kwargs, defaults in items.values() for field in defaults))
+
+        features = connections[router.db_for_write(model)].features
+        if self.BULK_ON_CONFLICT and getattr(features, "supports_update_conflicts_with_target", False):
+            instances = [model(**kwargs, **defaults) for kwargs, defaults in items.values()]
+            if update_fields:
+                model.objects.bulk_create(
+                    instances,
+                    batch_size=self.BULK_BATCH_SIZE,
+                    update_conflicts=True,
+                    unique_fields=unique_fields,
+                    update_fields=update_fields,
+                )
+            else:
+                model.objects.bulk_create(instances, batch_size=self.BULK_BATCH_SIZE, ignore_conflicts=True)
+            return
+
+        # one IN lookup per unique column instead of an OR of the items, which databases limit in depth, the
+        # candidates are then matched on the whole key; the columns are read by attname not to fetch related objects
+        attnames = [model._meta.get_field(field).attname for field in unique_fields]
+        lookup = {"{}__in".format(attname): {key[index] for key in items} for index, attname in enumerate(attnames)}
+        existing = {
+            self._unique_key(
+                model,
+                unique_fields,
+                {field: getattr(instance, attname) for field, attname in zip(unique_fields, attnames)},
+            ): instance
+            for instance in model.objects.filter(**lookup)
+        }
+
+        to_create, to_update = [], []
+        for key, (kwargs, defaults) in items.items():
+            instance = existing.get(key)
+            if instance is None:
+                to_create.append(model(**kwargs, **defaults))
+            else:
+                for field_name, value in defaults.items():
+                    setattr(instance, field_name, value)
+                to_update.append(instance)
+
+        if to_create:
+            model.objects.bulk_create(to_create, batch_size=self.BULK_BATCH_SIZE)
+        if to_update and update_fields:
+            model.objects.bulk_update(to_update, update_fields, batch_size=self.BULK_BATCH_SIZE)
+
+    def _write_items(self, model_name, model, items):
+        """Writes the (kwargs, defaults) items of a model, returns the indexes of the items written"""
+        if self.BULK:
+            try:
+                # bulk_create and bulk_update do not use a savepoint, a failing chunk would break the transaction
+                with self._atomic(model):
+                    self._bulk_upsert(model, items)
+            except Exception:
+                logger.warning("Exception processing records for {}".format(model_name), exc_info=True)
+                self.failed_records += len(items)
+                return []
+            return list(range(len(items)))
+
+        written = []
+        for index, (kwargs, defaults) in enumerate(items):
+            try:
+                model.objects.update_or_create(defaults=defaults, **kwargs)
+            except Exception:
+                logger.warning("Exception processing record", exc_info=True)
+                self.failed_records += 1
+            else:
+                written.append(index)
+        return written
+
+    def _save_chunk(self, records, mapped=None):
+        """Saves a chunk of records model by model, following the order of MODEL_MAPPING
+
+        Each model is written before the next one is mapped, so related objects written for a previous model can be
+        fetched while mapping. A record failing to be mapped or written for a model is skipped for the following
+        models.
+        With SKIP_UNCHANGED, the items whose fingerprint did not change are not written.
+        mapped lists the values of the records mapped by the process pool, if any.
+        """
+        records = list(zip(records, mapped or [None] * len(records)))
+        for model_name, model in self.MODEL_MAPPING.items():
+            items, valid_records = [], []
+            for record, values in records:
+                try:
+                    items.append(self._map_item(record, model_name, model, values))
+                except Exception:
+                    logger.warning("Exception processing record", exc_info=True)
+                    self.failed_records += 1
+                else:
+                    valid_records.append((record, values))
+            records = valid_records
+
+            # index of the record of each item, the unchanged items are not written
+            positions = list(range(len(items)))
+            if self.SKIP_UNCHANGED and items:
+                plan = self.get_model_plan(model_name, model)
+                indexes = {id(item): index for index, item in enumerate(items)}
+                items, entries = self.fingerprints.filter_changed(
+                    model, items, lambda kwargs: self._unique_key(model, plan.unique_fields, kwargs)
+                )
+                positions = [indexes[id(item)] for item in items]
+            if not items:
+                continue
+
+            with SyncPhase(self, "write", records=len(items), model=model) as event:
+                written = self._write_items(model_name, model, items)
+                event.records = len(written)
+            if self.SKIP_UNCHANGED:
+                self.fingerprints.save(model, [entries[index] for index in written])
+            if len(written) < len(items):
+                failed = {positions[index] for index in set(range(len(items))) - set(written)}
+                records = [record for index, record in enumerate(records) if index not in failed]
 
     def _save_records(self, records):
         processed = 0
         filtered_records = self._filter_records(records)
+        if self.PRELOAD_RELATED or self.MAPPING_PROCESSES:
+            filtered_records = list(filtered_records)
+        if self.PRELOAD_RELATED:
+            self._preload_related(filtered_records)
+        if self.MAPPING_PROCESSES:
+            with self.timer.phase("convert"), SyncPhase(self, "map", records=len(filtered_records)):
+                mapped = self._map_records(filtered_records)
+            records_mapped = zip(filtered_records, mapped)
+        else:
+            records_mapped = ((record, None) for record in filtered_records)
+
+        transactional = self.TRANSACTION_BATCH_SIZE and self.MODEL_MAPPING
+        if self.BULK or self.SKIP_UNCHANGED:
+            for chunk in self._chunks(records_mapped, self.BULK_BATCH_SIZE):
+                records, mapped = zip(*chunk)
+                with self._atomic() if transactional else nullcontext():
+                    self._save_chunk(records, mapped if self.MAPPING_PROCESSES else None)
+                processed += len(chunk)
+            return processed
+
+        if transactional:
+            for chunk in self._chunks(records_mapped, self.TRANSACTION_BATCH_SIZE):
+                with self._atomic():
+                    for record, mapped in chunk:
+                        self._process_mapped_record(record, mapped)
+                processed += len(chunk)
+            return processed
 
-        for record in filtered_records:
-            self._process_record(record)
+        for record, mapped in records_mapped:
+            self._process_mapped_record(record, mapped)
             processed += 1
         return processed
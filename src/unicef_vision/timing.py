@@ -0,0 +1,111 @@
+import threading
+import tracemalloc
+import weakref
+from collections import defaultdict
+from contextlib import contextmanager
+from time import perf_counter
+
+PHASES = ("fetch", "decode", "convert", "filter", "save")
+
+
+class PeakMemory:
+    """Peak of the memory allocated by Python during a sync, measured only while tracemalloc is tracing
+
+    tracemalloc has a single peak for the process: a measure overlapping another one, e.g. the syncs run at once by
+    the runners or the scheduler, is discarded rather than reporting the allocations of the other syncs.
+    """
+
+    _lock = threading.Lock()
+    # the measures of the syncs which ended without stopping them are dropped with their synchronizer
+    _running = weakref.WeakSet()
+
+    def __init__(self):
+        self.overlapped = False
+
+    def start(self):
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                return
+            self.overlapped = bool(self._running)
+            for other in self._running:
+                other.overlapped = True
+            self._running.add(self)
+            if not self.overlapped:
+                tracemalloc.reset_peak()
+
+    def stop(self):
+        """Returns the peak in bytes since start, None when it was not measured or overlapped another measure"""
+        with self._lock:
+            if self not in self._running:
+                return None
+            self._running.discard(self)
+            if self.overlapped or not tracemalloc.is_tracing():
+                return None
+            return tracemalloc.get_traced_memory()[1]
+
+
+class PhaseTimer:
+    """Time spent in the phases of a sync
+
+    Phases can be nested, the time spent in the inner phase is not accounted to the outer one: the duration of the
+    phases adds up to the elapsed time. Lazy steps are timed by wrapping their iterator with iter.
+    """
+
+    def __init__(self):
+        self.durations = defaultdict(float)
+        self.bytes_downloaded = None
+        self._stack = []
+        self._started = None
+
+    def _switch(self):
+        now = perf_counter()
+        if self._stack:
+            self.durations[self._stack[-1]] += now - self._started
+        self._started = now
+
+    @contextmanager
+    def phase(self, name):
+        self._switch()
+        self._stack.append(name)
+        try:
+            yield
+        finally:
+            self._switch()
+            self._stack.pop()
+
+    def iter(self, name, iterable):
+        """Yields the items of iterable, accounting the time spent producing them to the phase"""
+        iterator = iter(iterable)
+        durations, stack = self.durations, self._stack
+        # same as entering phase for every item, inlined as it runs once per record
+        while True:
+            now = perf_counter()
+            if stack:
+                durations[stack[-1]] += now - self._started
+            stack.append(name)
+            self._started = now
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                now = perf_counter()
+                durations[name] += now - self._started
+                self._started = now
+                stack.pop()
+            yield item
+
+    def merge(self, other):
+        """Adds the durations and the bytes downloaded of other, e.g. the timer of a thread of the sync"""
+        for name, duration in other.durations.items():
+            self.durations[name] += duration
+        if other.bytes_downloaded is not None:
+            self.bytes_downloaded = (self.bytes_downloaded or 0) + other.bytes_downloaded
+
+    def count_bytes(self, chunks):
+        """Yields the chunks, adding their size to bytes_downloaded"""
+        if self.bytes_downloaded is None:
+            self.bytes_downloaded = 0
+        for chunk in chunks:
+            self.bytes_downloaded += len(chunk)
+            yield chunk
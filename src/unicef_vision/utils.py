@@ -1,9 +1,15 @@
+import threading
+from http.cookiejar import DefaultCookiePolicy
+
 from django.apps import apps
 from django.conf import settings
 
 import requests
+from requests.adapters import HTTPAdapter
 
-from unicef_vision.settings import TIMEOUT
+from unicef_vision.cache import response_cache
+from unicef_vision.retries import get_circuit_breaker, retry_policy
+from unicef_vision.settings import MAX_RETRIES, POOL_CONNECTIONS, POOL_MAXSIZE, REQUEST_TIMEOUT
 
 base_headers = {
     "Content-Type": "application/json",
@@ -11,20 +17,71 @@ base_headers = {
 }
 
 
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Returns the session shared by all the requests to Insight, keeping its connections alive in a pool
+
+    Headers and auth are passed with each request and the cookies set by the responses are not kept, so that no
+    state leaks from a call to the next ones and the session can be used from several threads at once; the pool size
+    should match the number of threads.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                # no domain is allowed to set cookies
+                session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+                adapter = HTTPAdapter(
+                    pool_connections=POOL_CONNECTIONS,
+                    pool_maxsize=POOL_MAXSIZE,
+                    max_retries=MAX_RETRIES,
+                )
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
 def get_vision_logger_domain_model():
     get_model = apps.get_model
     return get_model(settings.INSIGHT_LOGGER_MODEL)
 
 
-def get_data_from_insight(endpoint, data=None):
+def get_vision_fingerprint_model():
+    return apps.get_model(settings.INSIGHT_FINGERPRINT_MODEL)
+
+
+def _insight_url(endpoint, data=None):
     separator = "" if settings.INSIGHT_URL.endswith("/") else "/"
 
     if not data:
         data = {}
 
-    url = "{}{}{}".format(settings.INSIGHT_URL, separator, endpoint).format(**data)
+    return "{}{}{}".format(settings.INSIGHT_URL, separator, endpoint).format(**data)
+
+
+def get_data_from_insight(endpoint, data=None):
+    """Returns the (success, result) of the request to endpoint, formatted with data
+
+    Successful results are cached for the endpoints listed in INSIGHT_RESPONSE_CACHE_TTLS.
+    """
+    url = _insight_url(endpoint, data)
+    return response_cache.get_or_fetch(endpoint, url, lambda: _fetch_from_insight(url, data), lambda result: result[0])
+
+
+def invalidate_data_from_insight(endpoint, data=None):
+    """Drops the cached result of endpoint for data, or all the cached results of endpoint without data"""
+    response_cache.invalidate(endpoint, None if data is None else _insight_url(endpoint, data))
+
 
-    resp = requests.get(url, headers=base_headers, timeout=TIMEOUT)
+def _fetch_from_insight(url, data):
+    resp = retry_policy.call(
+        lambda: get_session().get(url, headers=base_headers, timeout=REQUEST_TIMEOUT), get_circuit_breaker(url)
+    )
     if resp.status_code != 200:
         return False, "Loading data from Vision Failed, status {}".format(resp.status_code)
     try:
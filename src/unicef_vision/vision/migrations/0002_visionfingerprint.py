@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("vision", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="VisionFingerprint",
+            fields=[
+                ("id", models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("model_label", models.CharField(max_length=100, verbose_name="Model")),
+                ("key", models.CharField(max_length=64, verbose_name="Key")),
+                ("fingerprint", models.CharField(max_length=64, verbose_name="Fingerprint")),
+                ("date_synced", models.DateTimeField(auto_now=True, verbose_name="Date Synced")),
+            ],
+            options={
+                "abstract": False,
+                "unique_together": {("model_label", "key")},
+            },
+        ),
+    ]
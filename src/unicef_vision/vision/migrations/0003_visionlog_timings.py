@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("vision", "0002_visionfingerprint"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="visionlog",
+            name="bytes_downloaded",
+            field=models.BigIntegerField(blank=True, null=True, verbose_name="Bytes Downloaded"),
+        ),
+        migrations.AddField(
+            model_name="visionlog",
+            name="convert_time",
+            field=models.FloatField(blank=True, null=True, verbose_name="Convert Time (s)"),
+        ),
+        migrations.AddField(
+            model_name="visionlog",
+            name="decode_time",
+            field=models.FloatField(blank=True, null=True, verbose_name="Decode Time (s)"),
+        ),
+        migrations.AddField(
+            model_name="visionlog",
+            name="fetch_time",
+            field=models.FloatField(blank=True, null=True, verbose_name="Fetch Time (s)"),
+        ),
+        migrations.AddField(
+            model_name="visionlog",
+            name="filter_time",
+            field=models.FloatField(blank=True, null=True, verbose_name="Filter Time (s)"),
+        ),
+        migrations.AddField(
+            model_name="visionlog",
+            name="peak_memory",
+            field=models.BigIntegerField(blank=True, null=True, verbose_name="Peak Memory (bytes)"),
+        ),
+        migrations.AddField(
+            model_name="visionlog",
+            name="save_time",
+            field=models.FloatField(blank=True, null=True, verbose_name="Save Time (s)"),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("vision", "0003_visionlog_timings"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="visionlog",
+            name="date_started",
+            field=models.DateTimeField(blank=True, null=True, verbose_name="Date Started"),
+        ),
+        migrations.AddField(
+            model_name="visionlog",
+            name="total_failed",
+            field=models.IntegerField(default=0, verbose_name="Total Failed"),
+        ),
+    ]
@@ -1,5 +1,9 @@
-from unicef_vision.models import AbstractVisionLog
+from unicef_vision.models import AbstractVisionFingerprint, AbstractVisionLog
 
 
 class VisionLog(AbstractVisionLog):
     """Concrete model for logging"""
+
+
+class VisionFingerprint(AbstractVisionFingerprint):
+    """Concrete model for the fingerprints of the synced records"""
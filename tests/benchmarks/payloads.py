@@ -0,0 +1,71 @@
+"""Synthetic Insight payloads, shaped like the records of tests/sample_partner.json"""
+
+import datetime
+import gzip
+import json
+import os
+
+SAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sample_partner.json")
+
+FORMATS = ("json", "json.gz", "ndjson", "ndjson.gz")
+
+# a record in MISSING_KEY_EVERY lacks GRANT_REF, and is discarded by _filter_records
+MISSING_KEY_EVERY = 100
+# consecutive records share the partner, as the grants of the same vendor do
+GRANTS_PER_PARTNER = 4
+
+
+def make_rows(count):
+    """Yields count records, generated lazily so that the payloads are never held in memory"""
+    with open(SAMPLE) as sample:
+        template = json.load(sample)
+    base_date = datetime.date(2012, 1, 1)
+    for index in range(count):
+        partner = index // GRANTS_PER_PARTNER
+        row = dict(
+            template,
+            VENDOR_CODE="{:010d}".format(partner),
+            VENDOR_NAME="PARTNER {}".format(partner),
+            GRANT_REF="SC{:08d}".format(index),
+            AGREEMENT_AMT=round(1000 + index * 1.25, 2),
+            POSTING_BLOCK=partner % 10 == 0,
+            ASSESSMENT_DATE=(base_date + datetime.timedelta(days=partner % 3650)).strftime("%d-%b-%y"),
+        )
+        if index % MISSING_KEY_EVERY == MISSING_KEY_EVERY - 1:
+            del row["GRANT_REF"]
+        yield row
+
+
+def write_payload(filename, count, fmt="json"):
+    """Writes count records to filename in one of FORMATS
+
+    json holds a ROWSET envelope like the Insight responses, ndjson a record per line.
+    """
+    ndjson = fmt.startswith("ndjson")
+    if fmt.endswith(".gz"):
+        payload_file = gzip.open(filename, "wt", compresslevel=1)
+    else:
+        payload_file = open(filename, "w")
+    with payload_file as payload:
+        if not ndjson:
+            payload.write('{"ROWSET": {"ROW": [')
+        for index, row in enumerate(make_rows(count)):
+            if ndjson:
+                payload.write(json.dumps(row))
+                payload.write("\n")
+            else:
+                payload.write(", " if index else "")
+                payload.write(json.dumps(row))
+        if not ndjson:
+            payload.write("]}}")
+
+
+def payload_filename(data_dir, count, fmt="json"):
+    """Path of the payload of count records, written on the first request"""
+    filename = os.path.join(data_dir, "rows_{}.{}".format(count, fmt))
+    if not os.path.exists(filename):
+        os.makedirs(data_dir, exist_ok=True)
+        partial = filename + ".partial"
+        write_payload(partial, count, fmt)
+        os.rename(partial, filename)
+    return filename
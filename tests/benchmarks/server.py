@@ -0,0 +1,50 @@
+"""Local stub of the Insight API, serving the payload files of a directory"""
+
+import os
+import shutil
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+
+class _InsightHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        # /<endpoint>/?businessarea=... is answered with <data_dir>/<endpoint>.json
+        endpoint = urlsplit(self.path).path.strip("/").split("/")[0]
+        filename = os.path.join(self.server.data_dir, "{}.json".format(endpoint))
+        if not endpoint or not os.path.isfile(filename):
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(os.path.getsize(filename)))
+        self.end_headers()
+        with open(filename, "rb") as payload:
+            shutil.copyfileobj(payload, self.wfile, 64 * 1024)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubInsightServer:
+    """Serves the payloads of data_dir on a free local port while the context is open"""
+
+    def __init__(self, data_dir):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _InsightHandler)
+        self.server.daemon_threads = True
+        self.server.data_dir = data_dir
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        return "http://{}:{}/".format(*self.server.server_address)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,6 @@
+from demo.sample.models import Partner
+
+
+def partner_name(value):
+    """FIELD_HANDLERS handler cutting the name to the length of the Partner field"""
+    return value[: Partner._meta.get_field("name").max_length]  # noqa: E203
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("sample", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Partner",
+            fields=[
+                ("id", models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("vendor_code", models.CharField(max_length=32, unique=True)),
+                ("name", models.CharField(max_length=150)),
+                ("blocked", models.BooleanField(default=False)),
+                ("last_assessment_date", models.DateField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="Grant",
+            fields=[
+                ("id", models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("grant_ref", models.CharField(max_length=32)),
+                ("amount", models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ("partner", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to="sample.partner")),
+            ],
+            options={
+                "unique_together": {("partner", "grant_ref")},
+            },
+        ),
+    ]
@@ -27,3 +27,19 @@ class Author(models.Model):
 class Book(models.Model):
     name = models.CharField(max_length=150)
     author = models.ForeignKey(Author, on_delete=models.CASCADE)
+
+
+class Partner(models.Model):
+    vendor_code = models.CharField(max_length=32, unique=True)
+    name = models.CharField(max_length=150)
+    blocked = models.BooleanField(default=False)
+    last_assessment_date = models.DateField(null=True, blank=True)
+
+
+class Grant(models.Model):
+    partner = models.ForeignKey(Partner, on_delete=models.CASCADE)
+    grant_ref = models.CharField(max_length=32)
+    amount = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = (("partner", "grant_ref"),)
@@ -95,4 +95,5 @@ STATIC_URL = "/static/"
 MEDIA_ROOT = "/tmp/"
 INSIGHT_URL = "https://api.example.com"
 INSIGHT_LOGGER_MODEL = "vision.VisionLog"
+INSIGHT_FINGERPRINT_MODEL = "vision.VisionFingerprint"
 INSIGHT_SUB_KEY = "insight_sub_key"
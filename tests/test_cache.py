@@ -0,0 +1,91 @@
+import threading
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+import mock
+
+from unicef_vision.cache import ResponseCache
+
+
+class TestResponseCache(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.response_cache = ResponseCache(ttls={"GetPartners": 60}, lock_timeout=1)
+        self.fetch = mock.Mock(return_value=[42])
+
+    def test_not_cached(self):
+        response_cache = ResponseCache(ttls={})
+        self.assertEqual(response_cache.get_or_fetch("GetPartners", "url", self.fetch), [42])
+        self.assertEqual(response_cache.get_or_fetch("GetPartners", "url", self.fetch), [42])
+        self.assertEqual(self.fetch.call_count, 2)
+        self.assertEqual(self.response_cache.get_or_fetch("GetGrants", "url", self.fetch), [42])
+        self.assertEqual(self.fetch.call_count, 3)
+
+    def test_cached(self):
+        self.assertEqual(self.response_cache.get_or_fetch("GetPartners", "url", self.fetch), [42])
+        self.assertEqual(self.response_cache.get_or_fetch("GetPartners", "url", self.fetch), [42])
+        self.assertEqual(self.fetch.call_count, 1)
+
+        self.response_cache.get_or_fetch("GetPartners", "other url", self.fetch)
+        self.assertEqual(self.fetch.call_count, 2)
+
+    def test_default_ttl(self):
+        response_cache = ResponseCache(ttls={"*": 60, "GetGrants": 0})
+        for endpoint in ("GetPartners", "GetPartners", "GetGrants", "GetGrants"):
+            response_cache.get_or_fetch(endpoint, "url", self.fetch)
+        self.assertEqual(self.fetch.call_count, 3)
+
+    def test_not_cacheable(self):
+        for _ in range(2):
+            self.response_cache.get_or_fetch("GetPartners", "url", self.fetch, lambda value: False)
+        self.assertEqual(self.fetch.call_count, 2)
+
+    def test_invalidate(self):
+        for key_data in ("url", "other url"):
+            self.response_cache.get_or_fetch("GetPartners", key_data, self.fetch)
+
+        self.response_cache.invalidate("GetPartners", "url")
+        for key_data in ("url", "other url"):
+            self.response_cache.get_or_fetch("GetPartners", key_data, self.fetch)
+        self.assertEqual(self.fetch.call_count, 3)
+
+        self.response_cache.invalidate("GetPartners")
+        self.response_cache.invalidate("GetPartners")
+        for key_data in ("url", "other url"):
+            self.response_cache.get_or_fetch("GetPartners", key_data, self.fetch)
+        self.assertEqual(self.fetch.call_count, 5)
+
+    def test_fetch_error(self):
+        self.fetch.side_effect = ValueError("Wrong!")
+        with self.assertRaises(ValueError):
+            self.response_cache.get_or_fetch("GetPartners", "url", self.fetch)
+        # the lock is released
+        self.fetch.side_effect = None
+        self.assertEqual(self.response_cache.get_or_fetch("GetPartners", "url", self.fetch), [42])
+
+    def test_stampede(self):
+        """Concurrent callers wait for the response fetched by the first one"""
+        fetching, release = threading.Event(), threading.Event()
+
+        def slow_fetch():
+            fetching.set()
+            release.wait(1)
+            return [42]
+
+        thread = threading.Thread(target=self.response_cache.get_or_fetch, args=("GetPartners", "url", slow_fetch))
+        thread.start()
+        fetching.wait(1)
+        threading.Timer(0.1, release.set).start()
+        self.assertEqual(self.response_cache.get_or_fetch("GetPartners", "url", self.fetch), [42])
+        thread.join()
+        self.assertEqual(self.fetch.call_count, 0)
+
+    def test_stampede_not_cached(self):
+        """The waiting callers fetch the response themselves if the first one does not cache it"""
+        key = self.response_cache.make_key("GetPartners", "url")
+        cache.add("{}:lock".format(key), 1)
+        threading.Timer(0.1, cache.delete, args=("{}:lock".format(key),)).start()
+        self.assertEqual(self.response_cache.get_or_fetch("GetPartners", "url", self.fetch), [42])
+        self.assertEqual(self.fetch.call_count, 1)
@@ -1,7 +1,9 @@
 import sys
 
+from django.core.cache import cache
 from django.test import SimpleTestCase
 
+import mock
 import responses
 
 from unicef_vision import client
@@ -43,6 +45,26 @@ class TestVisionClient(SimpleTestCase):
         )
         c.make_request(path)
 
+    @responses.activate
+    def test_make_request_cached(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        responses.add(responses.GET, "https://api.example.com/partners", status=200, json=[42])
+        c = client.VisionAPIClient(username="test", password="123")
+
+        with mock.patch.dict(client.response_cache.ttls, {"partners": 60}):
+            self.assertEqual(c.make_request("partners").json(), [42])
+            self.assertEqual(c.make_request("partners").json(), [42])
+            self.assertEqual(len(responses.calls), 1)
+            self.assertIsNone(c.make_request("partners").request)
+            # the responses are cached by user
+            client.VisionAPIClient(username="other", password="123").make_request("partners")
+            self.assertEqual(len(responses.calls), 2)
+
+            c.invalidate("partners")
+            c.make_request("partners")
+            self.assertEqual(len(responses.calls), 3)
+
     @responses.activate
     def test_call_command(self):
         c = client.VisionAPIClient(username="test", password="123")
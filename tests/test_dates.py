@@ -0,0 +1,46 @@
+import datetime
+
+from django.test import SimpleTestCase
+
+from unicef_vision.dates import DateParser, parse_date, parse_dates
+
+
+class TestDateParser(SimpleTestCase):
+    def test_formatted(self):
+        self.assertEqual(parse_date("10-Apr-12"), datetime.date(2012, 4, 10))
+        self.assertEqual(DateParser("%Y-%m-%d")("2012-04-10"), datetime.date(2012, 4, 10))
+
+    def test_epoch(self):
+        self.assertEqual(parse_date("/Date(1334030400000)/"), datetime.date(2012, 4, 10))
+        self.assertEqual(parse_date("/Date(1334030400000+0300)/"), datetime.date(2012, 4, 10))
+        # 2012-04-09T21:00Z is midnight of the 10th at +03:00 and 17:00 of the 9th at -04:00
+        self.assertEqual(parse_date("/Date(1334005200000+0300)/"), datetime.date(2012, 4, 10))
+        self.assertEqual(parse_date("/Date(1334005200000-0400)/"), datetime.date(2012, 4, 9))
+        self.assertEqual(parse_date("/Date(1334005200000+0000)/"), datetime.date(2012, 4, 9))
+        self.assertEqual(parse_date("/Date(0)/"), datetime.date(1970, 1, 1))
+        self.assertEqual(parse_date("/Date(-1)/"), datetime.date(1969, 12, 31))
+
+    def test_invalid(self):
+        for value in ("2012-04-10", "/Date(abc)/", ""):
+            with self.assertRaises(ValueError):
+                parse_date(value)
+        for value in (None, 1334030400000):
+            with self.assertRaises(TypeError):
+                parse_date(value)
+
+    def test_cache(self):
+        parser = DateParser(cache_size=2)
+        for value in ("10-Apr-12", "10-Apr-12", "11-Apr-12", "/Date(0)/", "10-Apr-12"):
+            parser(value)
+        cache_info = parser.cache_info()
+        self.assertEqual((cache_info.hits, cache_info.misses, cache_info.currsize), (1, 4, 2))
+
+    def test_parse_many(self):
+        parser = DateParser()
+        values = ["10-Apr-12", "/Date(0)/", "10-Apr-12"]
+        self.assertEqual(
+            parser.parse_many(iter(values)),
+            [datetime.date(2012, 4, 10), datetime.date(1970, 1, 1), datetime.date(2012, 4, 10)],
+        )
+        self.assertEqual(parser.cache_info().misses, 2)
+        self.assertEqual(parse_dates([]), [])
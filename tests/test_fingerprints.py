@@ -0,0 +1,39 @@
+import datetime
+from decimal import Decimal
+
+from django.test import TestCase
+
+from unicef_vision.fingerprints import FingerprintStore, make_hash
+from unicef_vision.vision.models import VisionFingerprint
+
+from demo.sample.models import Partner
+
+
+class TestMakeHash(TestCase):
+    def test_stable(self):
+        partner = Partner.objects.create(vendor_code="1", name="Partner")
+        value = [{"partner": partner, "date": datetime.date(2012, 4, 10)}, {"amount": Decimal("1.50"), "a": 1}]
+        self.assertEqual(
+            make_hash(value), make_hash([{"date": datetime.date(2012, 4, 10), "partner": partner.pk}, value[1]])
+        )
+        self.assertNotEqual(make_hash(value), make_hash([value[0], {"amount": Decimal("1.5"), "a": 1}]))
+
+
+class TestFingerprintStore(TestCase):
+    def test_filter_changed_and_save(self):
+        store = FingerprintStore()
+        items = [({"vendor_code": "1"}, {"name": "A"}), ({"vendor_code": "2"}, {"name": "B"})]
+
+        changed, entries = store.filter_changed(Partner, items, lambda kwargs: kwargs["vendor_code"])
+        self.assertEqual(changed, items)
+        store.save(Partner, entries)
+        self.assertEqual(VisionFingerprint.objects.filter(model_label="sample.Partner").count(), 2)
+
+        items[1] = ({"vendor_code": "2"}, {"name": "C"})
+        changed, entries = store.filter_changed(Partner, items, lambda kwargs: kwargs["vendor_code"])
+        self.assertEqual(changed, items[1:])
+        store.save(Partner, entries)
+
+        self.assertEqual((store.skipped, store.written), (1, 3))
+        self.assertEqual(VisionFingerprint.objects.count(), 2)
+        self.assertEqual(VisionFingerprint.objects.get(key=entries[0][0]).fingerprint, entries[0][1])
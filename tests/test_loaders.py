@@ -1,13 +1,27 @@
+import gzip
 import json
 import os
+import re
+from urllib.parse import parse_qs, urlsplit
 
 from django.conf import settings
-from django.test import override_settings, TestCase
+from django.core.cache import caches
+from django.test import override_settings, SimpleTestCase, TestCase
 
+import httpx
 import mock
-
-from unicef_vision.exceptions import VisionException
-from unicef_vision.loaders import FileDataLoader, INSIGHT_NO_DATA_MESSAGE, VisionDataLoader
+import responses
+
+from unicef_vision.exceptions import VisionException, VisionNotModified
+from unicef_vision.loaders import (
+    AsyncVisionDataLoader,
+    FileDataLoader,
+    INSIGHT_NO_DATA_MESSAGE,
+    PaginatedVisionDataLoader,
+    VisionDataLoader,
+)
+from unicef_vision.retries import RetryPolicy
+from unicef_vision.settings import CACHE_ALIAS
 from unicef_vision.utils import base_headers
 
 FAUX_INSIGHT_URL = "https://api.example.com/foo.svc/"
@@ -47,11 +61,13 @@ class TestVisionDataLoader(TestCase):
         self.assertEqual(loader.url, "{}/GetSomeStuff_JSON".format(loader.URL))
 
     @override_settings(INSIGHT_URL=FAUX_INSIGHT_URL)
-    @mock.patch("unicef_vision.loaders.requests", spec=["get"])
-    def test_get_success_with_response(self, mock_requests):
+    @mock.patch("unicef_vision.loaders.get_session")
+    def test_get_success_with_response(self, mock_get_session):
         """Test loader.get() when the response is 200 OK and data is returned"""
-        mock_get_response = mock.Mock(spec=["status_code", "json"])
+        mock_requests = mock_get_session.return_value
+        mock_get_response = mock.Mock(spec=["status_code", "content", "json"])
         mock_get_response.status_code = 200
+        mock_get_response.content = b"[42]"
         mock_get_response.json = mock.Mock(return_value=[42])
         mock_requests.get = mock.Mock(return_value=mock_get_response)
 
@@ -61,13 +77,16 @@ class TestVisionDataLoader(TestCase):
         self._assertGetFundamentals(loader.url, mock_requests, mock_get_response)
 
         self.assertEqual(response, [42])
+        self.assertEqual(loader.timer.bytes_downloaded, 4)
 
     @override_settings(INSIGHT_URL=FAUX_INSIGHT_URL)
-    @mock.patch("unicef_vision.loaders.requests", spec=["get"])
-    def test_get_success_with_response_and_headers(self, mock_requests):
+    @mock.patch("unicef_vision.loaders.get_session")
+    def test_get_success_with_response_and_headers(self, mock_get_session):
         """Test loader.get() when the response is 200 OK and data is returned"""
-        mock_get_response = mock.Mock(spec=["status_code", "json"])
+        mock_requests = mock_get_session.return_value
+        mock_get_response = mock.Mock(spec=["status_code", "content", "json"])
         mock_get_response.status_code = 200
+        mock_get_response.content = b"[42]"
         mock_get_response.json = mock.Mock(return_value=[42])
         mock_requests.get = mock.Mock(return_value=mock_get_response)
 
@@ -83,11 +102,13 @@ class TestVisionDataLoader(TestCase):
         self.assertEqual(response, [42])
 
     @override_settings(INSIGHT_URL=FAUX_INSIGHT_URL)
-    @mock.patch("unicef_vision.loaders.requests", spec=["get"])
-    def test_get_success_no_response(self, mock_requests):
+    @mock.patch("unicef_vision.loaders.get_session")
+    def test_get_success_no_response(self, mock_get_session):
         """Test loader.get() when the response is 200 OK but no data is returned"""
-        mock_get_response = mock.Mock(spec=["status_code", "json"])
+        mock_requests = mock_get_session.return_value
+        mock_get_response = mock.Mock(spec=["status_code", "content", "json"])
         mock_get_response.status_code = 200
+        mock_get_response.content = b'"No Data Available"'
         mock_get_response.json = mock.Mock(return_value=INSIGHT_NO_DATA_MESSAGE)
         mock_requests.get = mock.Mock(return_value=mock_get_response)
 
@@ -99,9 +120,10 @@ class TestVisionDataLoader(TestCase):
         self.assertEqual(response, [])
 
     @override_settings(INSIGHT_URL=FAUX_INSIGHT_URL)
-    @mock.patch("unicef_vision.loaders.requests", spec=["get"])
-    def test_get_failure(self, mock_requests):
+    @mock.patch("unicef_vision.loaders.get_session")
+    def test_get_failure(self, mock_get_session):
         """Test loader.get() when the response is something other than 200"""
+        mock_requests = mock_get_session.return_value
         # Note that in contrast to the other mock_get_response variables declared in this test case, this one
         # doesn't have 'json' in the spec. I don't expect the loaderto access response.json during this test, so if
         # it does this configuration ensures the test will fail.
@@ -121,11 +143,206 @@ class TestVisionDataLoader(TestCase):
         self.assertEqual(mock_requests.get.call_args[0], (loader.url,))
         self.assertEqual(mock_requests.get.call_args[1], {"headers": base_headers, "timeout": 400})
 
+    @override_settings(INSIGHT_URL=FAUX_INSIGHT_URL)
+    @mock.patch("unicef_vision.loaders.get_session")
+    def test_stream(self, mock_get_session):
+        """Test loader.stream() parses the response chunks and yields single records"""
+        mock_requests = mock_get_session.return_value
+        mock_get_response = mock.Mock(spec=["status_code", "iter_content", "close"])
+        mock_get_response.status_code = 200
+        mock_get_response.iter_content.return_value = [b'{"ROWSET": {"ROW": [{"a": 1}', b', {"a": 2}]}}']
+        mock_requests.get = mock.Mock(return_value=mock_get_response)
+
+        loader = VisionDataLoader("GetSomeStuff_JSON")
+        self.assertEqual(list(loader.stream()), [{"a": 1}, {"a": 2}])
+
+        self.assertEqual(mock_requests.get.call_args[0], (loader.url,))
+        self.assertEqual(
+            mock_requests.get.call_args[1],
+            {"headers": base_headers, "timeout": 400, "stream": True},
+        )
+        self.assertEqual(mock_get_response.close.call_count, 1)
+        self.assertEqual(loader.timer.bytes_downloaded, 41)
+        self.assertEqual(set(loader.timer.durations), {"fetch", "decode"})
+
+    @override_settings(INSIGHT_URL=FAUX_INSIGHT_URL)
+    @mock.patch("unicef_vision.loaders.get_session")
+    def test_stream_failure(self, mock_get_session):
+        mock_requests = mock_get_session.return_value
+        mock_get_response = mock.Mock(spec=["status_code", "close"])
+        mock_get_response.status_code = 500
+        mock_requests.get = mock.Mock(return_value=mock_get_response)
+
+        loader = VisionDataLoader("GetSomeStuff_JSON")
+        with self.assertRaises(VisionException) as context_manager:
+            list(loader.stream())
+
+        self.assertIn("500", str(context_manager.exception))
+        self.assertEqual(mock_get_response.close.call_count, 1)
+
+    @responses.activate
+    def test_get_conditional(self):
+        loader = VisionDataLoader("GetSomeStuff_JSON", conditional=True, businessarea="ABC")
+        self.assertNotIn("conditional", loader.url)
+        responses.add(
+            responses.GET,
+            loader.url,
+            json=[42],
+            headers={"ETag": '"v1"', "Last-Modified": "Wed, 21 Oct 2026 07:28:00 GMT"},
+        )
+        responses.add(responses.GET, loader.url, status=304)
+
+        self.assertEqual(loader.get(), [42])
+        self.assertNotIn("If-None-Match", responses.calls[0].request.headers)
+        loader.save_validators()
+
+        loader = VisionDataLoader("GetSomeStuff_JSON", conditional=True, businessarea="ABC")
+        with self.assertRaises(VisionNotModified):
+            loader.get()
+        self.assertEqual(responses.calls[1].request.headers["If-None-Match"], '"v1"')
+        self.assertEqual(responses.calls[1].request.headers["If-Modified-Since"], "Wed, 21 Oct 2026 07:28:00 GMT")
+        caches[CACHE_ALIAS].delete(loader.validators_key)
+
+    @responses.activate
+    def test_get_conditional_not_saved(self):
+        """Validators are sent only once saved, i.e. once the data of the response is synced"""
+        loader = VisionDataLoader("GetSomeStuff_JSON", conditional=True)
+        responses.add(responses.GET, loader.url, json=[42], headers={"ETag": '"v1"'})
+
+        loader.get()
+        loader.get()
+        self.assertNotIn("If-None-Match", responses.calls[1].request.headers)
+
+    @responses.activate
+    @mock.patch("unicef_vision.retries.time.sleep")
+    @mock.patch("unicef_vision.loaders.retry_policy", RetryPolicy(retries=1))
+    def test_get_retried(self, mock_sleep):
+        loader = VisionDataLoader("GetSomeStuff_JSON")
+        responses.add(responses.GET, loader.url, status=503)
+        responses.add(responses.GET, loader.url, json=[42])
+        self.assertEqual(loader.get(), [42])
+        self.assertEqual(len(responses.calls), 2)
+        self.assertEqual(mock_sleep.call_count, 1)
+
     def test_detail(self):
         a = VisionDataLoader("api", "123")
         self.assertEqual(a.url, "{}/api/123".format(settings.INSIGHT_URL))
 
 
+class TestAsyncVisionDataLoader(SimpleTestCase):
+    def _client(self, status_code, payload):
+        def handler(request):
+            self.requests.append(request)
+            return httpx.Response(status_code, json=payload)
+
+        self.requests = []
+        return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    async def test_get_success_with_response(self):
+        loader = AsyncVisionDataLoader("GetSomeStuff_JSON", client=self._client(200, [42]), businessarea="ABC")
+        self.assertEqual(await loader.get(), [42])
+        self.assertEqual(str(self.requests[0].url), loader.url)
+        self.assertEqual(
+            self.requests[0].headers["Ocp-Apim-Subscription-Key"], base_headers["Ocp-Apim-Subscription-Key"]
+        )
+
+    async def test_get_success_no_response(self):
+        loader = AsyncVisionDataLoader("GetSomeStuff_JSON", client=self._client(200, INSIGHT_NO_DATA_MESSAGE))
+        self.assertEqual(await loader.get(), [])
+
+    async def test_get_failure(self):
+        loader = AsyncVisionDataLoader("GetSomeStuff_JSON", client=self._client(401, {}))
+        with self.assertRaises(VisionException) as context_manager:
+            await loader.get()
+        self.assertIn("401", str(context_manager.exception))
+
+    @mock.patch("unicef_vision.loaders.httpx.AsyncClient")
+    async def test_get_without_client(self, mock_client_class):
+        mock_client = mock_client_class.return_value.__aenter__.return_value
+        mock_client.get = mock.AsyncMock(return_value=httpx.Response(200, json=[42]))
+
+        loader = AsyncVisionDataLoader("GetSomeStuff_JSON")
+        self.assertEqual(await loader.get(), [42])
+        self.assertEqual(mock_client.get.call_args[0], (loader.url,))
+
+
+class TestPaginatedVisionDataLoader(SimpleTestCase):
+    records = [{"ID": i} for i in range(5)]
+
+    def _offset_page(self, request):
+        query = parse_qs(urlsplit(request.url).query)
+        self.assertEqual(query["businessarea"], ["ABC"])
+        offset, size = int(query["offset"][0]), int(query["pagesize"][0])
+        rows = self.records[offset : offset + size]  # noqa: E203
+        if not rows:
+            return 200, {}, json.dumps(INSIGHT_NO_DATA_MESSAGE)
+        return 200, {}, json.dumps({"ROWSET": {"ROW": rows if len(rows) > 1 else rows[0]}})
+
+    def _cursor_page(self, request):
+        cursor = int(parse_qs(urlsplit(request.url).query).get("cursor", ["0"])[0])
+        payload = {"ROWSET": {"ROW": self.records[cursor : cursor + 2]}}  # noqa: E203
+        if cursor + 2 < len(self.records):
+            payload["NEXT"] = str(cursor + 2)
+        return 200, {}, json.dumps(payload)
+
+    def _loader(self, **kwargs):
+        return PaginatedVisionDataLoader("GetSomeStuff_JSON", businessarea="ABC", page_size=2, **kwargs)
+
+    @responses.activate
+    def test_offset(self):
+        responses.add_callback(responses.GET, re.compile(".*/GetSomeStuff_JSON/.*"), callback=self._offset_page)
+        loader = self._loader(prefetch=3)
+        self.assertEqual(list(loader.pages()), [self.records[:2], self.records[2:4], self.records[4:]])
+        self.assertEqual(loader.get(), self.records)
+        self.assertEqual(list(loader.stream()), self.records)
+        self.assertGreater(loader.timer.bytes_downloaded, 0)
+
+    @responses.activate
+    def test_offset_exact_pages(self):
+        self.records = self.records[:4]
+        responses.add_callback(responses.GET, re.compile(".*/GetSomeStuff_JSON/.*"), callback=self._offset_page)
+        loader = self._loader(prefetch=1)
+        self.assertEqual(list(loader.pages()), [self.records[:2], self.records[2:4]])
+        self.assertEqual(len(responses.calls), 3)
+
+    @responses.activate
+    def test_offset_capped_page_size(self):
+        """Test that a server returning less records than the page size before the last page fails the load"""
+
+        def capped_page(request):
+            query = parse_qs(urlsplit(request.url).query)
+            offset = int(query["offset"][0])
+            # the page size is capped to 2 records
+            return 200, {}, json.dumps({"ROWSET": {"ROW": self.records[offset : offset + 2]}})  # noqa: E203
+
+        responses.add_callback(responses.GET, re.compile(".*/GetSomeStuff_JSON/.*"), callback=capped_page)
+        loader = PaginatedVisionDataLoader("GetSomeStuff_JSON", businessarea="ABC", page_size=3, prefetch=1)
+        with self.assertRaisesRegex(VisionException, "page size is capped"):
+            loader.get()
+
+    @responses.activate
+    def test_cursor(self):
+        responses.add_callback(responses.GET, re.compile(".*/GetSomeStuff_JSON/.*"), callback=self._cursor_page)
+        loader = self._loader(cursor_param="cursor", cursor_key="NEXT")
+        self.assertEqual(loader.get(), self.records)
+        self.assertEqual(len(responses.calls), 3)
+        self.assertNotIn("cursor", responses.calls[0].request.url)
+        self.assertIn("cursor=4", responses.calls[2].request.url)
+
+    @responses.activate
+    def test_failure(self):
+        responses.add(responses.GET, re.compile(".*/GetSomeStuff_JSON/.*"), status=401)
+        with self.assertRaises(VisionException):
+            list(self._loader().stream())
+
+    def test_page_url(self):
+        loader = self._loader(page_size_param="limit", offset_param="skip")
+        self.assertEqual(loader.page_url(offset=4), loader.url + "&limit=2&skip=4")
+        loader = PaginatedVisionDataLoader("GetSomeStuff_JSON", page_size=2, cursor_param="cursor")
+        self.assertEqual(loader.page_url(), loader.url + "/?pagesize=2")
+        self.assertEqual(loader.page_url(cursor="abc"), loader.url + "/?pagesize=2&cursor=abc")
+
+
 class TestFileDataLoader(TestCase):
     def setUp(self):
         self.test_file_content = "abcd"
@@ -142,3 +359,61 @@ class TestFileDataLoader(TestCase):
     def test_get(self):
         fl = FileDataLoader(self.filename)
         self.assertEqual(fl.get(), self.test_file_content)
+
+    def test_stream(self):
+        fl = FileDataLoader("tests/sample_dct.json")
+        records = list(fl.stream())
+        self.assertEqual(len(records), len(fl.get()))
+        self.assertEqual(records[0]["VENDOR_NAME"], "SAWA GROUP BAALBECK")
+
+    def test_get_closes_file(self):
+        fl = FileDataLoader(self.filename)
+        data_file = fl.open()
+        with mock.patch.object(fl, "open", return_value=data_file):
+            fl.get()
+        self.assertTrue(data_file.closed)
+
+    def test_stream_rowset(self):
+        payload = {"ROWSET": {"ROW": [{"ID": 1}, {"ID": 2}]}}
+        with open(self.filename, "w") as f:
+            json.dump(payload, f)
+
+        fl = FileDataLoader(self.filename)
+        self.assertEqual(fl.get(), payload)
+        self.assertEqual(list(fl.stream()), [{"ID": 1}, {"ID": 2}])
+
+    def test_stream_no_data(self):
+        self.assertEqual(list(FileDataLoader(self.filename).stream()), [])
+
+    def test_stream_gzip(self):
+        filename = "tests/test.json.gz"
+        with gzip.open(filename, "wt") as f:
+            json.dump({"ROWSET": {"ROW": {"ID": 1}}}, f)
+        self.addCleanup(os.remove, filename)
+
+        fl = FileDataLoader(filename)
+        self.assertTrue(fl.compressed)
+        self.assertFalse(fl.ndjson)
+        self.assertEqual(list(fl.stream()), [{"ID": 1}])
+
+    def test_ndjson(self):
+        filename = "tests/test.ndjson.gz"
+        with gzip.open(filename, "wt") as f:
+            f.write('{"ID": 1}\n\n[{"ID": 2}, {"ID": 3}]\n{"ROWSET": {"ROW": {"ID": 4}}}\n')
+        self.addCleanup(os.remove, filename)
+
+        fl = FileDataLoader(filename)
+        self.assertTrue(fl.ndjson)
+        expected = [{"ID": 1}, {"ID": 2}, {"ID": 3}, {"ID": 4}]
+        self.assertEqual(list(fl.stream()), expected)
+        self.assertEqual(fl.get(), expected)
+
+    def test_stream_closes_file(self):
+        fl = FileDataLoader("tests/sample_dct.json")
+        data_file = fl.open()
+        with mock.patch.object(fl, "open", return_value=data_file):
+            records = fl.stream()
+            next(records)
+            self.assertFalse(data_file.closed)
+            records.close()
+        self.assertTrue(data_file.closed)
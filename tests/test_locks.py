@@ -0,0 +1,220 @@
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+
+import mock
+
+from unicef_vision.exceptions import VisionException
+from unicef_vision.locks import CacheSyncLock, DatabaseSyncLock, get_sync_lock
+from unicef_vision.synchronizers import VisionDataSynchronizer
+from unicef_vision.vision.models import VisionLog
+
+
+class TestCacheSyncLock(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_acquire(self):
+        lock = CacheSyncLock("sync:GetPartners:ABC", ttl=60)
+        self.assertTrue(lock.acquire())
+        self.assertFalse(CacheSyncLock("sync:GetPartners:ABC", ttl=60).acquire())
+        self.assertTrue(CacheSyncLock("sync:GetPartners:DEF", ttl=60).acquire())
+
+        lock.release()
+        self.assertFalse(lock.acquired)
+        self.assertTrue(CacheSyncLock("sync:GetPartners:ABC", ttl=60).acquire())
+
+    def test_wait(self):
+        lock = CacheSyncLock("sync:GetPartners:ABC", ttl=60)
+        lock.acquire()
+        other = CacheSyncLock("sync:GetPartners:ABC", ttl=60)
+        other.poll_interval = 0.01
+        with mock.patch("unicef_vision.locks.time.sleep", side_effect=lambda seconds: lock.release()) as sleep:
+            self.assertTrue(other.acquire(wait=1))
+        self.assertEqual(sleep.call_count, 1)
+
+    def test_wait_timeout(self):
+        CacheSyncLock("sync:GetPartners:ABC", ttl=60).acquire()
+        other = CacheSyncLock("sync:GetPartners:ABC", ttl=60)
+        other.poll_interval = 0.01
+        self.assertFalse(other.acquire(wait=0.05))
+        self.assertFalse(other.acquired)
+
+    async def test_aacquire(self):
+        lock = CacheSyncLock("sync:GetPartners:ABC", ttl=60)
+        lock.acquire()
+        other = CacheSyncLock("sync:GetPartners:ABC", ttl=60)
+        other.poll_interval = 0.01
+
+        async def sleep(seconds):
+            lock.release()
+
+        with mock.patch("unicef_vision.locks.asyncio.sleep", side_effect=sleep) as asyncio_sleep:
+            with mock.patch("unicef_vision.locks.time.sleep") as time_sleep:
+                self.assertTrue(await other.aacquire(wait=1))
+        self.assertEqual(asyncio_sleep.call_count, 1)
+        time_sleep.assert_not_called()
+        self.assertTrue(other.acquired)
+
+    async def test_aacquire_timeout(self):
+        CacheSyncLock("sync:GetPartners:ABC", ttl=60).acquire()
+        other = CacheSyncLock("sync:GetPartners:ABC", ttl=60)
+        other.poll_interval = 0.01
+        self.assertFalse(await other.aacquire(wait=0.05))
+        self.assertFalse(other.acquired)
+
+    def test_release_expired(self):
+        lock = CacheSyncLock("sync:GetPartners:ABC", ttl=60)
+        lock.acquire()
+        # the lock expired and was taken by another sync
+        cache.delete(lock.key)
+        other = CacheSyncLock("sync:GetPartners:ABC", ttl=60)
+        other.acquire()
+
+        lock.release()
+        self.assertEqual(cache.get(lock.key), other.token)
+
+
+class TestDatabaseSyncLock(SimpleTestCase):
+    databases = {"default"}
+
+    def test_not_postgresql(self):
+        with self.assertRaises(VisionException):
+            DatabaseSyncLock("sync:GetPartners:ABC").acquire()
+
+    @mock.patch("unicef_vision.locks.connections")
+    def test_acquire(self, connections):
+        connections.__getitem__.return_value.vendor = "postgresql"
+        cursor = connections.create_connection.return_value.cursor.return_value.__enter__.return_value
+        cursor.fetchone.return_value = (True,)
+        lock = DatabaseSyncLock("sync:GetPartners:ABC")
+
+        self.assertTrue(lock.acquire())
+        cursor.execute.assert_called_with("SELECT pg_try_advisory_lock(%s)", [lock.lock_id])
+        lock.release()
+        cursor.execute.assert_called_with("SELECT pg_advisory_unlock(%s)", [lock.lock_id])
+        connections.create_connection.return_value.close.assert_called_once_with()
+        self.assertIsNone(lock.connection)
+
+    @mock.patch("unicef_vision.locks.connections")
+    def test_taken(self, connections):
+        connections.__getitem__.return_value.vendor = "postgresql"
+        cursor = connections.create_connection.return_value.cursor.return_value.__enter__.return_value
+        cursor.fetchone.return_value = (False,)
+        lock = DatabaseSyncLock("sync:GetPartners:ABC")
+
+        self.assertFalse(lock.acquire())
+        connections.create_connection.return_value.close.assert_called_once_with()
+
+    @mock.patch("unicef_vision.locks.connections")
+    def test_error(self, connections):
+        connections.__getitem__.return_value.vendor = "postgresql"
+        cursor = connections.create_connection.return_value.cursor.return_value.__enter__.return_value
+        cursor.execute.side_effect = ValueError("Wrong!")
+        lock = DatabaseSyncLock("sync:GetPartners:ABC")
+
+        with self.assertRaises(ValueError):
+            lock.acquire()
+        connections.create_connection.return_value.close.assert_called_once_with()
+        self.assertIsNone(lock.connection)
+        self.assertFalse(lock.acquired)
+
+    def test_lock_id(self):
+        lock_id = DatabaseSyncLock("sync:GetPartners:ABC").lock_id
+        self.assertEqual(DatabaseSyncLock("sync:GetPartners:ABC").lock_id, lock_id)
+        self.assertNotEqual(DatabaseSyncLock("sync:GetPartners:DEF").lock_id, lock_id)
+        self.assertTrue(-(2**63) <= lock_id < 2**63)
+
+
+class TestGetSyncLock(SimpleTestCase):
+    def test_backends(self):
+        self.assertIsNone(get_sync_lock(None, "sync", 60))
+        self.assertIsInstance(get_sync_lock("cache", "sync", 60), CacheSyncLock)
+        self.assertIsInstance(get_sync_lock("database", "sync", 60), DatabaseSyncLock)
+        with self.assertRaises(VisionException):
+            get_sync_lock("file", "sync", 60)
+
+
+class _Loader:
+    def __init__(self, **kwargs):
+        pass
+
+    def get(self):
+        return [1, 2, 3]
+
+
+class _LockedSynchronizer(VisionDataSynchronizer):
+    ENDPOINT = "GetPartners"
+    LOADER_CLASS = _Loader
+    LOCK_BACKEND = "cache"
+
+    def _convert_records(self, records):
+        return records
+
+    def _save_records(self, records):
+        return len(records)
+
+
+class TestSyncLock(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_no_lock(self):
+        synchronizer = _LockedSynchronizer(business_area_code="ABC")
+        synchronizer.LOCK_BACKEND = None
+        self.assertIsNone(synchronizer.get_lock())
+
+    def test_sync(self):
+        synchronizer = _LockedSynchronizer(business_area_code="ABC")
+        synchronizer.sync()
+        self.assertTrue(synchronizer.log.successful)
+        self.assertEqual(synchronizer.log.total_processed, 3)
+        # the lock was released
+        self.assertTrue(synchronizer.get_lock().acquire())
+
+    def test_skipped(self):
+        lock = _LockedSynchronizer(business_area_code="ABC").get_lock()
+        lock.acquire()
+
+        synchronizer = _LockedSynchronizer(business_area_code="ABC")
+        synchronizer.sync()
+        log = VisionLog.objects.get()
+        self.assertEqual(log, synchronizer.log)
+        self.assertFalse(log.successful)
+        self.assertEqual(log.total_processed, 0)
+        self.assertEqual(log.details, "Skipped, already running")
+
+        # the lock of another business area is not taken
+        _LockedSynchronizer(business_area_code="DEF").sync()
+        self.assertTrue(VisionLog.objects.get(business_area_code="DEF").successful)
+        # the lock taken by the other sync is untouched
+        self.assertEqual(cache.get(lock.key), lock.token)
+
+    def test_wait(self):
+        lock = _LockedSynchronizer(business_area_code="ABC").get_lock()
+        lock.acquire()
+
+        synchronizer = _LockedSynchronizer(business_area_code="ABC")
+        synchronizer.LOCK_WAIT = 10
+        with mock.patch("unicef_vision.locks.time.sleep", side_effect=lambda seconds: lock.release()):
+            synchronizer.sync()
+        self.assertTrue(synchronizer.log.successful)
+        self.assertEqual(synchronizer.log.total_processed, 3)
+
+    def test_released_on_error(self):
+        synchronizer = _LockedSynchronizer(business_area_code="ABC")
+        with mock.patch.object(synchronizer, "_save_records", side_effect=ValueError("Wrong!")):
+            with self.assertRaises(VisionException):
+                synchronizer.sync()
+        self.assertTrue(synchronizer.get_lock().acquire())
+
+    async def test_async_skipped(self):
+        synchronizer = _LockedSynchronizer(business_area_code="ABC")
+        synchronizer.ASYNC_LOADER_CLASS = mock.Mock()
+        lock = synchronizer.get_lock()
+        lock.acquire()
+
+        await synchronizer.async_sync()
+        self.assertEqual(synchronizer.log.details, "Skipped, already running")
+        synchronizer.ASYNC_LOADER_CLASS.assert_not_called()
@@ -0,0 +1,36 @@
+import datetime
+
+from django.db.models import NOT_PROVIDED
+from django.test import SimpleTestCase
+
+from unicef_vision.exceptions import VisionException
+from unicef_vision.mapping import Empty, map_records, map_values
+
+FIELDS = [
+    ("vendor_code", "VENDOR_CODE", False, NOT_PROVIDED, None),
+    ("blocked", "POSTING_BLOCK", False, False, bool),
+    ("last_assessment_date", "ASSESSMENT_DATE", True, None, None),
+]
+
+
+class TestMapping(SimpleTestCase):
+    def test_map_values(self):
+        record = {"VENDOR_CODE": "123", "POSTING_BLOCK": "X", "ASSESSMENT_DATE": "31-Mar-24"}
+        self.assertEqual(
+            map_values(FIELDS, record),
+            {"vendor_code": "123", "blocked": True, "last_assessment_date": datetime.date(2024, 3, 31)},
+        )
+
+    def test_map_values_missing(self):
+        values = map_values(FIELDS[:2], {})
+        self.assertIs(values["vendor_code"], Empty)
+        self.assertIs(values["blocked"], False)
+
+    def test_map_records(self):
+        records = [{"VENDOR_CODE": "123", "ASSESSMENT_DATE": "31-Mar-24"}, {"VENDOR_CODE": "456"}]
+        plans = [("partner", FIELDS), ("grant", FIELDS[:1])]
+        first, second = map_records(plans, records)
+        self.assertEqual(first["partner"]["last_assessment_date"], datetime.date(2024, 3, 31))
+        self.assertIsInstance(second["partner"], VisionException)
+        self.assertIn("KeyError", str(second["partner"]))
+        self.assertEqual(second["grant"], {"vendor_code": "456"})
@@ -0,0 +1,49 @@
+import json
+
+from django.test import SimpleTestCase
+
+from unicef_vision.loaders import INSIGHT_NO_DATA_MESSAGE
+from unicef_vision.parsers import iter_rowset
+
+
+def chunked(payload, size=7):
+    data = json.dumps(payload).encode("utf-8")
+    chunks = []
+    while data:
+        chunks.append(data[:size])
+        data = data[size:]
+    return chunks
+
+
+class TestIterRowset(SimpleTestCase):
+    def test_list(self):
+        rows = [{"VENDOR_CODE": "t1", "AMT": 12345}, {"VENDOR_CODE": "t2", "AMT": 6420.02}]
+        self.assertEqual(list(iter_rowset(chunked(rows))), rows)
+
+    def test_rowset_list(self):
+        rows = [{"VENDOR_CODE": "t1", "NAME": "Café"}, {"VENDOR_CODE": "t2", "NAME": None}]
+        payload = {"EXTRA": [1, {"ROWSET": 2}], "ROWSET": {"COUNT": 2, "ROW": rows}}
+        self.assertEqual(list(iter_rowset(chunked(payload, size=3))), rows)
+
+    def test_rowset_single_row(self):
+        row = {"VENDOR_CODE": "t1"}
+        self.assertEqual(list(iter_rowset(chunked({"ROWSET": {"ROW": row}}))), [row])
+
+    def test_no_data(self):
+        self.assertEqual(list(iter_rowset(chunked(INSIGHT_NO_DATA_MESSAGE))), [])
+        self.assertEqual(list(iter_rowset(chunked({"foo": "bar"}))), [])
+        self.assertEqual(list(iter_rowset(chunked([]))), [])
+        self.assertEqual(list(iter_rowset([])), [])
+
+    def test_incremental(self):
+        """Records are yielded before the whole payload is read"""
+        chunks = iter([b'[{"a": 1}, ', b'{"a": 2}, ', b'{"a"'])
+        rows = iter_rowset(chunks)
+        self.assertEqual(next(rows), {"a": 1})
+        self.assertEqual(next(rows), {"a": 2})
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            list(iter_rowset([b'[{"a": 1} {"a": 2}]']))
+        with self.assertRaises(ValueError):
+            list(iter_rowset([b'[{"a": 1}, {"a"']))
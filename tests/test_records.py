@@ -0,0 +1,68 @@
+import json
+import os
+import pickle
+import tracemalloc
+
+from django.test import SimpleTestCase
+
+from unicef_vision.records import compact_record_class, compact_records, CompactRecord
+
+SAMPLE_PARTNER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sample_partner.json")
+
+KEYS = ("VENDOR_CODE", "VENDOR_NAME", "GRANT_REF")
+
+
+class TestCompactRecord(SimpleTestCase):
+    def setUp(self):
+        self.record = compact_record_class(KEYS).from_row({"VENDOR_CODE": "123", "VENDOR_NAME": None, "OTHER": 1})
+
+    def test_class(self):
+        self.assertIs(compact_record_class(KEYS), type(self.record))
+        self.assertIsNot(compact_record_class(KEYS[:2]), type(self.record))
+        self.assertIsInstance(self.record, CompactRecord)
+
+    def test_mapping(self):
+        self.assertEqual(self.record["VENDOR_CODE"], "123")
+        self.assertIsNone(self.record["VENDOR_NAME"])
+        for key in ("GRANT_REF", "OTHER"):
+            with self.assertRaises(KeyError):
+                self.record[key]
+            self.assertNotIn(key, self.record)
+            self.assertEqual(self.record.get(key, 42), 42)
+        self.assertIn("VENDOR_NAME", self.record)
+        self.assertEqual(list(self.record), ["VENDOR_CODE", "VENDOR_NAME"])
+        self.assertEqual(len(self.record), 2)
+        self.assertEqual(self.record, {"VENDOR_CODE": "123", "VENDOR_NAME": None})
+        self.assertNotEqual(self.record, {"VENDOR_CODE": "123"})
+        self.assertEqual(dict(self.record), {"VENDOR_CODE": "123", "VENDOR_NAME": None})
+
+    def test_pickle(self):
+        record = pickle.loads(pickle.dumps(self.record))
+        self.assertIs(type(record), type(self.record))
+        self.assertEqual(record, self.record)
+        self.assertNotIn("GRANT_REF", record)
+
+    def test_compact_records(self):
+        rows = [{"VENDOR_CODE": "123", "OTHER": 1}, {"GRANT_REF": "SC1"}]
+        records = compact_records(rows, set(KEYS))
+        self.assertIsInstance(records, list)
+        self.assertEqual(records, [{"VENDOR_CODE": "123"}, {"GRANT_REF": "SC1"}])
+        self.assertEqual(list(compact_records(iter(rows), KEYS)), records)
+        # already compact records are kept as they are
+        self.assertIs(compact_records(records, KEYS)[0], records[0])
+
+    def test_memory(self):
+        with open(SAMPLE_PARTNER) as sample:
+            payload = sample.read()
+
+        tracemalloc.start()
+        try:
+            rows = [json.loads(payload) for _ in range(1000)]
+            rows_size = tracemalloc.get_traced_memory()[0]
+            records = compact_records(rows, KEYS + ("AGREEMENT_AMT", "LAST_ASSESSMENT_DATE"))
+            del rows
+            records_size = tracemalloc.get_traced_memory()[0]
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(len(records), 1000)
+        self.assertLess(records_size, rows_size / 4)
@@ -0,0 +1,118 @@
+from django.test import SimpleTestCase
+
+import httpx
+import mock
+import requests
+
+from unicef_vision.exceptions import VisionCircuitOpen
+from unicef_vision.retries import CircuitBreaker, get_circuit_breaker, RetryPolicy
+
+
+def _response(status_code):
+    return mock.Mock(spec=["status_code", "close"], status_code=status_code)
+
+
+@mock.patch("unicef_vision.retries.time.sleep")
+class TestRetryPolicy(SimpleTestCase):
+    def setUp(self):
+        self.policy = RetryPolicy(retries=2, backoff=1, backoff_max=3)
+        self.breaker = CircuitBreaker("api.example.com", threshold=0)
+
+    def test_success(self, mock_sleep):
+        send = mock.Mock(return_value=_response(200))
+        self.assertEqual(self.policy.call(send, self.breaker).status_code, 200)
+        self.assertEqual(send.call_count, 1)
+        self.assertFalse(mock_sleep.called)
+
+    def test_retry_status(self, mock_sleep):
+        failed = _response(503)
+        send = mock.Mock(side_effect=[failed, _response(200)])
+        self.assertEqual(self.policy.call(send, self.breaker).status_code, 200)
+        self.assertEqual(send.call_count, 2)
+        self.assertEqual(mock_sleep.call_count, 1)
+        self.assertTrue(failed.close.called)
+
+    def test_client_error_not_retried(self, mock_sleep):
+        send = mock.Mock(return_value=_response(404))
+        self.assertEqual(self.policy.call(send, self.breaker).status_code, 404)
+        self.assertEqual(send.call_count, 1)
+
+    def test_retry_connection_error(self, mock_sleep):
+        send = mock.Mock(side_effect=[requests.ConnectionError(), requests.Timeout(), _response(200)])
+        self.assertEqual(self.policy.call(send, self.breaker).status_code, 200)
+        self.assertEqual(send.call_count, 3)
+
+    def test_give_up(self, mock_sleep):
+        send = mock.Mock(side_effect=requests.ConnectionError())
+        with self.assertRaises(requests.ConnectionError):
+            self.policy.call(send, self.breaker)
+        self.assertEqual(send.call_count, 3)
+
+        send = mock.Mock(return_value=_response(500))
+        self.assertEqual(self.policy.call(send, self.breaker).status_code, 500)
+        self.assertEqual(send.call_count, 3)
+
+    def test_delay(self, mock_sleep):
+        with mock.patch("unicef_vision.retries.random.uniform", side_effect=lambda low, high: high):
+            self.assertEqual([self.policy.get_delay(attempt) for attempt in range(4)], [1, 2, 3, 3])
+
+    async def test_acall(self, mock_sleep):
+        send = mock.AsyncMock(side_effect=[httpx.ConnectError("refused"), httpx.Response(502), httpx.Response(200)])
+        with mock.patch("unicef_vision.retries.asyncio.sleep", new=mock.AsyncMock()) as mock_async_sleep:
+            response = await self.policy.acall(send, self.breaker)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(mock_async_sleep.call_count, 2)
+
+
+class TestCircuitBreaker(SimpleTestCase):
+    def setUp(self):
+        self.breaker = CircuitBreaker("api.example.com", threshold=2, reset_timeout=60)
+        self.policy = RetryPolicy(retries=0)
+
+    def test_open(self):
+        send = mock.Mock(side_effect=requests.ConnectionError())
+        for _ in range(2):
+            with self.assertRaises(requests.ConnectionError):
+                self.policy.call(send, self.breaker)
+        self.assertTrue(self.breaker.is_open)
+        with self.assertRaises(VisionCircuitOpen):
+            self.policy.call(send, self.breaker)
+        self.assertEqual(send.call_count, 2)
+
+    def test_open_stops_retries(self):
+        send = mock.Mock(return_value=_response(503))
+        with mock.patch("unicef_vision.retries.time.sleep"):
+            with self.assertRaises(VisionCircuitOpen):
+                RetryPolicy(retries=5).call(send, self.breaker)
+        self.assertEqual(send.call_count, 2)
+
+    def test_success_resets(self):
+        self.breaker.record_failure()
+        self.breaker.record_success()
+        self.breaker.record_failure()
+        self.assertFalse(self.breaker.is_open)
+        self.assertEqual(self.breaker.failures, 1)
+
+    def test_half_open(self):
+        with mock.patch("unicef_vision.retries.time.monotonic", return_value=100):
+            self.breaker.record_failure()
+            self.breaker.record_failure()
+            self.assertTrue(self.breaker.is_open)
+        with mock.patch("unicef_vision.retries.time.monotonic", return_value=161):
+            self.assertFalse(self.breaker.is_open)
+            self.breaker.before_call()
+            # a failure of the trial call opens the circuit again
+            self.breaker.record_failure()
+            self.assertTrue(self.breaker.is_open)
+
+    def test_disabled(self):
+        breaker = CircuitBreaker("api.example.com", threshold=0)
+        for _ in range(10):
+            breaker.record_failure()
+        self.assertFalse(breaker.is_open)
+        breaker.before_call()
+
+    def test_shared_by_host(self):
+        breaker = get_circuit_breaker("https://api.example.com/foo.svc/GetPartners")
+        self.assertIs(get_circuit_breaker("https://api.example.com/foo.svc/GetGrants"), breaker)
+        self.assertIsNot(get_circuit_breaker("https://other.example.com/foo.svc/GetPartners"), breaker)
@@ -0,0 +1,67 @@
+import threading
+import time
+
+from django.test import TransactionTestCase
+
+import mock
+
+from unicef_vision.runners import sync_business_areas
+from unicef_vision.synchronizers import VisionDataSynchronizer
+from unicef_vision.vision.models import VisionLog
+
+
+class _SlowLoader:
+    def __init__(self, businessarea, **kwargs):
+        self.business_area_code = businessarea
+
+    def get(self):
+        time.sleep(0.2)
+        if self.business_area_code == "BAD":
+            raise ValueError("Wrong!")
+        return [1, 2, 3]
+
+
+class _MySynchronizer(VisionDataSynchronizer):
+    ENDPOINT = "GetSomeStuff_JSON"
+    LOADER_CLASS = _SlowLoader
+
+    lock = threading.Lock()
+    writing = 0
+    max_writing = 0
+
+    def _convert_records(self, records):
+        return records
+
+    def _save_records(self, records):
+        with self.lock:
+            _MySynchronizer.writing += 1
+            _MySynchronizer.max_writing = max(_MySynchronizer.max_writing, _MySynchronizer.writing)
+        time.sleep(0.05)
+        with self.lock:
+            _MySynchronizer.writing -= 1
+        return len(records)
+
+
+class TestSyncBusinessAreas(TransactionTestCase):
+    def test_sync(self):
+        codes = ["ABC", "DEF", "GHI", "JKL", "BAD"]
+
+        start = time.monotonic()
+        with mock.patch("unicef_vision.runners.logger.warning") as mock_warning:
+            logs = sync_business_areas(_MySynchronizer, codes, max_workers=5, db_connections=1)
+        elapsed = time.monotonic() - start
+
+        # the loads ran concurrently
+        self.assertLess(elapsed, 0.2 * len(codes))
+        self.assertEqual(_MySynchronizer.max_writing, 1)
+        self.assertEqual(mock_warning.call_count, 1)
+
+        self.assertEqual(list(logs.keys()), codes)
+        self.assertEqual(VisionLog.objects.count(), len(codes))
+        for code in codes[:-1]:
+            log = VisionLog.objects.get(business_area_code=code)
+            self.assertTrue(log.successful)
+            self.assertEqual(log.total_processed, 3)
+            self.assertEqual(logs[code].pk, log.pk)
+        self.assertFalse(logs["BAD"].successful)
+        self.assertEqual(logs["BAD"].exception_message, "Wrong!")
@@ -0,0 +1,169 @@
+import datetime
+import threading
+import time
+from collections import Counter
+
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from unicef_vision.exceptions import VisionException
+from unicef_vision.scheduler import Scheduler
+from unicef_vision.synchronizers import VisionDataSynchronizer
+from unicef_vision.vision.models import VisionLog
+
+
+class _Loader:
+    def __init__(self, businessarea=None, **kwargs):
+        self.business_area_code = businessarea
+
+    def get(self):
+        return [1, 2, 3]
+
+
+class _Tracker:
+    """Records the syncs running at once, by endpoint and by business area"""
+
+    lock = threading.Lock()
+
+    def __init__(self):
+        self.running = Counter()
+        self.max_running = Counter()
+        self.order = []
+
+    def enter(self, *keys):
+        with self.lock:
+            for key in keys:
+                self.running[key] += 1
+                self.max_running[key] = max(self.max_running[key], self.running[key])
+
+    def exit(self, *keys):
+        with self.lock:
+            for key in keys:
+                self.running[key] -= 1
+
+
+tracker = _Tracker()
+
+
+class _TrackedSynchronizer(VisionDataSynchronizer):
+    ENDPOINT = "GetPartners"
+    LOADER_CLASS = _Loader
+    duration = 0.05
+
+    def _convert_records(self, records):
+        # tracked out of the database writes, which the test serializes as SQLite allows a single writer
+        keys = ("*", self.ENDPOINT, self.business_area_code)
+        tracker.order.append((self.__class__.__name__, self.business_area_code))
+        tracker.enter(*keys)
+        time.sleep(self.duration)
+        tracker.exit(*keys)
+        return records
+
+    def _save_records(self, records):
+        return len(records)
+
+
+class _PartnerSynchronizer(_TrackedSynchronizer):
+    pass
+
+
+class _GrantSynchronizer(_TrackedSynchronizer):
+    ENDPOINT = "GetGrants"
+
+
+class _FailingSynchronizer(_TrackedSynchronizer):
+    ENDPOINT = "GetFailures"
+
+    def _save_records(self, records):
+        raise ValueError("Wrong!")
+
+
+def _log(handler_name, business_area_code, age, successful=True, total_processed=3):
+    log = VisionLog.objects.create(
+        handler_name=handler_name,
+        business_area_code=business_area_code,
+        successful=successful,
+        total_processed=total_processed,
+    )
+    VisionLog.objects.filter(pk=log.pk).update(date_processed=timezone.now() - age)
+
+
+class TestSchedulerDueJobs(TestCase):
+    def test_register(self):
+        scheduler = Scheduler()
+        entry = scheduler.register(_PartnerSynchronizer, 60, business_area_codes=["ABC"])
+        self.assertEqual(entry.interval, datetime.timedelta(minutes=1))
+        self.assertEqual(entry.idle_interval, datetime.timedelta(minutes=2))
+        self.assertEqual(entry.endpoint, "GetPartners")
+        with self.assertRaises(VisionException):
+            scheduler.register(_PartnerSynchronizer, 60)
+
+    def test_due(self):
+        scheduler = Scheduler()
+        scheduler.register(
+            _PartnerSynchronizer, datetime.timedelta(hours=1), business_area_codes=["A", "B", "C", "D", "E"]
+        )
+        # synced recently
+        _log("_PartnerSynchronizer", "A", datetime.timedelta(minutes=30))
+        # synced long ago, and recently by another synchronizer
+        _log("_PartnerSynchronizer", "B", datetime.timedelta(hours=2))
+        _log("_GrantSynchronizer", "B", datetime.timedelta(minutes=1))
+        # synced recently without changes, the next sync is due after the idle interval
+        _log("_PartnerSynchronizer", "C", datetime.timedelta(minutes=90), total_processed=0)
+        # failed recently
+        _log("_PartnerSynchronizer", "D", datetime.timedelta(minutes=10), successful=False, total_processed=0)
+
+        self.assertEqual([job.business_area_code for job in scheduler.get_due_jobs()], ["B", "E"])
+        # the logs older than the idle interval are not considered, then the oldest syncs come first
+        later = timezone.now() + datetime.timedelta(hours=1)
+        self.assertEqual([job.business_area_code for job in scheduler.get_due_jobs(later)], ["B", "C", "E", "A", "D"])
+
+    def test_priority(self):
+        scheduler = Scheduler()
+        scheduler.register(_PartnerSynchronizer, 60, business_area_codes=["ABC"])
+        scheduler.register(_GrantSynchronizer, 60, priority=10, business_area_codes=["ABC"])
+        self.assertEqual(
+            [job.key for job in scheduler.get_due_jobs()],
+            [("_GrantSynchronizer", "ABC"), ("_PartnerSynchronizer", "ABC")],
+        )
+
+
+class TestSchedulerRun(TransactionTestCase):
+    def setUp(self):
+        global tracker
+        tracker = _Tracker()
+
+    def test_run_pending(self):
+        codes = ["A", "B", "C", "D", "E", "F"]
+        scheduler = Scheduler(max_workers=4, db_connections=1, endpoint_limits={"GetPartners": 2})
+        scheduler.register(_PartnerSynchronizer, 3600, business_area_codes=codes)
+        scheduler.register(_GrantSynchronizer, 3600, priority=1, business_area_codes=codes[:2])
+        scheduler.register(_FailingSynchronizer, 3600, business_area_codes=["G"])
+
+        logs = scheduler.run_pending()
+
+        self.assertEqual(len(logs), 9)
+        self.assertEqual(VisionLog.objects.count(), 9)
+        self.assertEqual(VisionLog.objects.filter(successful=True).count(), 8)
+        self.assertFalse(logs[("_FailingSynchronizer", "G")].successful)
+        # the limits were honoured while the pool was kept busy
+        self.assertEqual(tracker.max_running["GetPartners"], 2)
+        self.assertEqual(tracker.max_running["GetGrants"], 2)
+        self.assertEqual(tracker.max_running["*"], 4)
+        for code in codes:
+            self.assertEqual(tracker.max_running[code], 1)
+        self.assertEqual(sorted(tracker.order[:2]), [("_GrantSynchronizer", "A"), ("_GrantSynchronizer", "B")])
+
+        # nothing is due anymore
+        self.assertEqual(scheduler.run_pending(), {})
+
+    def test_run_forever(self):
+        scheduler = Scheduler()
+        scheduler.register(_GrantSynchronizer, 3600, business_area_codes=["ABC"])
+        thread = threading.Thread(target=scheduler.run_forever, kwargs={"poll_interval": 0.01})
+        thread.start()
+        time.sleep(0.2)
+        scheduler.stop()
+        thread.join(1)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(VisionLog.objects.count(), 1)
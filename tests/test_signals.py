@@ -0,0 +1,59 @@
+from django.test import SimpleTestCase
+
+from unicef_vision.signals import iter_phase, phase_finished, phase_started, SyncPhase
+
+
+class _Receiver:
+    def __init__(self, test_case):
+        self.events = []
+        for signal, name in ((phase_started, "started"), (phase_finished, "finished")):
+            receiver = self._receiver(name)
+            signal.connect(receiver, weak=False)
+            test_case.addCleanup(signal.disconnect, receiver)
+
+    def _receiver(self, name):
+        def receiver(sender, synchronizer, phase, records, **kwargs):
+            self.events.append((name, phase, records, kwargs))
+
+        return receiver
+
+
+class TestSyncPhase(SimpleTestCase):
+    def test_no_receivers(self):
+        records = [1, 2]
+        self.assertIs(iter_phase(object(), "load", records), records)
+        with SyncPhase(object(), "save", records=2) as event:
+            event.records = 2
+        self.assertFalse(event.active)
+
+    def test_phase(self):
+        receiver = _Receiver(self)
+        with SyncPhase(object(), "write", records=3, model=int) as event:
+            event.records = 2
+
+        self.assertEqual([event[:3] for event in receiver.events], [("started", "write", 3), ("finished", "write", 2)])
+        self.assertEqual(receiver.events[0][3], {"model": int, "signal": phase_started})
+        finished_kwargs = receiver.events[1][3]
+        self.assertEqual(finished_kwargs["model"], int)
+        self.assertIsNone(finished_kwargs["exception"])
+        self.assertGreaterEqual(finished_kwargs["duration"], 0)
+
+    def test_phase_exception(self):
+        receiver = _Receiver(self)
+        error = ValueError("Wrong!")
+        with self.assertRaises(ValueError):
+            with SyncPhase(object(), "save", records=3):
+                raise error
+
+        self.assertEqual(receiver.events[1][:3], ("finished", "save", None))
+        self.assertIs(receiver.events[1][3]["exception"], error)
+
+    def test_iter_phase(self):
+        receiver = _Receiver(self)
+        records = iter_phase(object(), "load", iter([1, 2, 3]))
+        self.assertEqual(receiver.events, [])
+
+        self.assertEqual(next(records), 1)
+        self.assertEqual([event[:3] for event in receiver.events], [("started", "load", None)])
+        self.assertEqual(list(records), [2, 3])
+        self.assertEqual(receiver.events[1][:3], ("finished", "load", 3))
@@ -1,3 +1,6 @@
+import datetime
+import os
+import tracemalloc
 from collections import OrderedDict
 
 from django.db.models import NOT_PROVIDED
@@ -5,10 +8,23 @@ from django.test import TestCase
 from django.utils.timezone import now as django_now
 
 import mock
-
-from unicef_vision.exceptions import VisionException
-from unicef_vision.synchronizers import FileDataSynchronizer, MultiModelDataSynchronizer, VisionDataSynchronizer
-from unicef_vision.vision.models import VisionLog
+from asgiref.sync import sync_to_async
+
+from unicef_vision.exceptions import VisionException, VisionNotModified
+from unicef_vision.loaders import PaginatedVisionDataLoader, VisionDataLoader
+from unicef_vision.records import CompactRecord
+from unicef_vision.signals import phase_finished, phase_started
+from unicef_vision.synchronizers import (
+    FileDataSynchronizer,
+    MultiModelDataSynchronizer,
+    RelatedObjectCache,
+    VisionDataSynchronizer,
+)
+from unicef_vision.timing import PeakMemory, PHASES
+from unicef_vision.vision.models import VisionFingerprint, VisionLog
+
+from demo.sample.handlers import partner_name
+from demo.sample.models import Grant, Partner
 
 FAUX_INSIGHT_URL = "https://api.example.com/foo.svc/"
 
@@ -265,6 +281,375 @@ class TestVisionDataSynchronizerSync(TestCase):
             },
         )
 
+    def test_sync_streaming(self):
+        """Test that in streaming mode records are saved in batches and counted across batches"""
+        synchronizer = self.synchronizer_class(business_area_code=self.test_business_area_code)
+        synchronizer.STREAMING = True
+        synchronizer.BATCH_SIZE = 2
+
+        mock_loader = mock.Mock()
+        mock_loader.stream.return_value = iter([42, 43, 44, 45, 46])
+        synchronizer.LOADER_CLASS = mock.Mock(return_value=mock_loader)
+        synchronizer._convert_records = VisionDataSynchronizer._convert_records.__get__(synchronizer)
+
+        mock_save_records = mock.Mock(side_effect=lambda batch: len(batch))
+        synchronizer._save_records = mock_save_records
+
+        synchronizer.sync()
+
+        self.assertEqual(mock_loader.get.call_count, 0)
+        self.assertEqual(
+            [call[0][0] for call in mock_save_records.call_args_list],
+            [[42, 43], [44, 45], [46]],
+        )
+        self._assertVisionLogFundamentals(5, 5)
+
+    def _pipelined_synchronizer(self, stream):
+        synchronizer = self.synchronizer_class(business_area_code=self.test_business_area_code)
+        synchronizer.PIPELINED = True
+        synchronizer.BATCH_SIZE = 2
+        synchronizer.PIPELINE_QUEUE_SIZE = 1
+        mock_loader = mock.Mock()
+        mock_loader.stream.return_value = stream
+        synchronizer.LOADER_CLASS = mock.Mock(return_value=mock_loader)
+        synchronizer._convert_records = VisionDataSynchronizer._convert_records.__get__(synchronizer)
+        return synchronizer
+
+    def test_sync_pipelined(self):
+        """Test that in pipelined mode the batches produced by the loader thread are all saved, in order"""
+        synchronizer = self._pipelined_synchronizer(iter([42, 43, 44, 45, 46]))
+        mock_save_records = mock.Mock(side_effect=len)
+        synchronizer._save_records = mock_save_records
+
+        synchronizer.sync()
+
+        self.assertEqual(
+            [call[0][0] for call in mock_save_records.call_args_list],
+            [[42, 43], [44, 45], [46]],
+        )
+        self._assertVisionLogFundamentals(5, 5)
+        log = VisionLog.objects.get()
+        self.assertGreaterEqual(log.fetch_time, 0)
+        self.assertGreaterEqual(log.save_time, 0)
+
+    def test_sync_pipelined_backpressure(self):
+        """Test that the producer does not get ahead of the writes by more than the queue"""
+        produced = []
+
+        def stream():
+            for record in range(20):
+                produced.append(record)
+                yield record
+
+        synchronizer = self._pipelined_synchronizer(stream())
+        ahead = []
+
+        def save_records(records):
+            # batches of 2: one being saved, one in the queue, one being produced
+            ahead.append(len(produced) - records[-1] - 1)
+            return len(records)
+
+        synchronizer._save_records = save_records
+        synchronizer.sync()
+
+        self.assertEqual(len(ahead), 10)
+        self.assertLessEqual(max(ahead), 4)
+        self._assertVisionLogFundamentals(20, 20)
+
+    def test_sync_pipelined_loader_error(self):
+        """Test that an error of the producer thread fails the sync and is logged"""
+
+        def stream():
+            yield 42
+            yield 43
+            yield 44
+            raise VisionException("Load data failed! Http code: 500")
+
+        synchronizer = self._pipelined_synchronizer(stream())
+        synchronizer._save_records = mock.Mock(side_effect=len)
+
+        with self.assertRaises(VisionException):
+            synchronizer.sync()
+
+        self.assertEqual(synchronizer._save_records.call_count, 1)
+        self._assertVisionLogFundamentals(2, 0, exception_message="Load data failed! Http code: 500", successful=False)
+
+    def test_sync_pipelined_stream_error(self):
+        """Test that an error raised by the stream call itself fails the sync instead of blocking it"""
+        synchronizer = self._pipelined_synchronizer(None)
+        synchronizer.LOADER_CLASS.return_value.stream.side_effect = ValueError("No stream!")
+        synchronizer._save_records = mock.Mock(side_effect=len)
+
+        with self.assertRaises(VisionException):
+            synchronizer.sync()
+
+        synchronizer._save_records.assert_not_called()
+        self._assertVisionLogFundamentals(0, 0, exception_message="No stream!", successful=False)
+
+    def test_sync_pipelined_save_error(self):
+        """Test that an error while saving stops the producer thread"""
+        closed = []
+
+        def stream():
+            try:
+                record = 0
+                while True:
+                    record += 1
+                    yield record
+            finally:
+                closed.append(True)
+
+        synchronizer = self._pipelined_synchronizer(stream())
+        synchronizer._save_records = mock.Mock(side_effect=ValueError("Wrong!"))
+
+        with self.assertRaises(VisionException):
+            synchronizer.sync()
+
+        self.assertEqual(closed, [True])
+        self._assertVisionLogFundamentals(2, 0, exception_message="Wrong!", successful=False)
+
+    def test_sync_pipelined_not_modified(self):
+        def stream():
+            raise VisionNotModified()
+            yield  # pragma: no cover
+
+        synchronizer = self._pipelined_synchronizer(stream())
+        synchronizer.sync()
+        self._assertVisionLogFundamentals(0, 0, details="Not modified")
+
+    def test_sync_timings(self):
+        """Test that the duration of the phases and the peak memory are logged"""
+        synchronizer = self.synchronizer_class(business_area_code=self.test_business_area_code)
+        mock_loader = mock.Mock()
+        mock_loader.get.return_value = [42]
+        synchronizer.LOADER_CLASS = mock.Mock(return_value=mock_loader)
+        synchronizer._convert_records = mock.Mock(return_value=[42])
+        synchronizer._save_records = mock.Mock(side_effect=lambda records: len(synchronizer._filter_records(records)))
+
+        synchronizer.sync()
+
+        self.assertIs(mock_loader.timer, synchronizer.timer)
+        log = VisionLog.objects.get()
+        for phase in ("fetch", "convert", "filter", "save"):
+            self.assertGreaterEqual(getattr(log, "{}_time".format(phase)), 0)
+        # not measured by the mock loader
+        self.assertIsNone(log.decode_time)
+        self.assertIsNone(log.bytes_downloaded)
+        # only measured while tracemalloc is tracing
+        self.assertIsNone(log.peak_memory)
+
+    def test_sync_peak_memory(self):
+        """Test that the peak memory is measured from the start of each sync, unless syncs overlap"""
+        synchronizer = self.synchronizer_class(business_area_code=self.test_business_area_code)
+        synchronizer.LOADER_CLASS = mock.Mock()
+        synchronizer.LOADER_CLASS.return_value.get.return_value = []
+        synchronizer._convert_records = mock.Mock(return_value=[])
+        synchronizer._save_records = mock.Mock(side_effect=lambda records: len(b"x" * 10 * 1024 * 1024))
+
+        tracemalloc.start()
+        self.addCleanup(tracemalloc.stop)
+        synchronizer.sync()
+        self.assertGreater(synchronizer.log.peak_memory, 10 * 1024 * 1024)
+
+        synchronizer._save_records = mock.Mock(return_value=0)
+        synchronizer.sync()
+        self.assertLess(synchronizer.log.peak_memory, 10 * 1024 * 1024)
+
+        other = PeakMemory()
+        other.start()
+        synchronizer.sync()
+        self.assertIsNone(synchronizer.log.peak_memory)
+        self.assertIsNone(other.stop())
+
+    def test_sync_streaming_timings(self):
+        synchronizer = FileDataSynchronizer(business_area_code="ABC", filename="tests/sample_dct.json")
+        synchronizer.STREAMING = True
+        synchronizer._convert_records = lambda records: records
+        synchronizer._save_records = lambda records: len(synchronizer._filter_records(records))
+
+        synchronizer.sync()
+
+        log = VisionLog.objects.get()
+        self.assertTrue(log.successful)
+        self.assertEqual(log.bytes_downloaded, os.path.getsize("tests/sample_dct.json"))
+        for phase in PHASES:
+            self.assertGreaterEqual(getattr(log, "{}_time".format(phase)), 0)
+        self.assertGreater(log.decode_time, 0)
+
+    def test_sync_streaming_save_records_returns_dict(self):
+        """Test that dicts returned by _save_records for each batch are merged"""
+        synchronizer = self.synchronizer_class(business_area_code=self.test_business_area_code)
+        synchronizer.STREAMING = True
+        synchronizer.BATCH_SIZE = 2
+
+        mock_loader = mock.Mock()
+        mock_loader.stream.return_value = iter([42, 43, 44])
+        synchronizer.LOADER_CLASS = mock.Mock(return_value=mock_loader)
+        synchronizer._convert_records = lambda records: records
+        synchronizer._save_records = mock.Mock(side_effect=[{"processed": 2, "details": "ok"}, 1])
+
+        synchronizer.sync()
+
+        self._assertVisionLogFundamentals(3, 3, details="ok")
+
+    def test_sync_streaming_no_records(self):
+        synchronizer = self.synchronizer_class(business_area_code=self.test_business_area_code)
+        synchronizer.STREAMING = True
+
+        mock_loader = mock.Mock()
+        mock_loader.stream.return_value = iter([])
+        synchronizer.LOADER_CLASS = mock.Mock(return_value=mock_loader)
+        synchronizer._convert_records = lambda records: records
+        mock_save_records = mock.Mock()
+        synchronizer._save_records = mock_save_records
+
+        synchronizer.sync()
+
+        self.assertEqual(mock_save_records.call_count, 0)
+        self._assertVisionLogFundamentals(0, 0)
+
+    def test_sync_not_modified(self):
+        """Test that a 304 from a conditional loader ends the sync as successful with no changes"""
+
+        class _MyConditionalSynchronizer(self.synchronizer_class):
+            CONDITIONAL_FETCH = True
+
+        synchronizer = _MyConditionalSynchronizer(business_area_code=self.test_business_area_code)
+        self.assertTrue(synchronizer.kwargs["conditional"])
+
+        mock_loader = mock.Mock()
+        mock_loader.get.side_effect = VisionNotModified("Data not modified since the last sync")
+        synchronizer.LOADER_CLASS = mock.Mock(return_value=mock_loader)
+        mock_save_records = mock.Mock()
+        synchronizer._save_records = mock_save_records
+
+        synchronizer.sync()
+
+        self.assertEqual(mock_save_records.call_count, 0)
+        self.assertEqual(mock_loader.save_validators.call_count, 0)
+        log = VisionLog.objects.get()
+        self.assertTrue(log.successful)
+        self.assertEqual((log.total_records, log.total_processed, log.details), (0, 0, "Not modified"))
+
+    def test_sync_saves_validators(self):
+        synchronizer = self.synchronizer_class(business_area_code=self.test_business_area_code)
+        mock_loader = mock.Mock()
+        mock_loader.get.return_value = []
+        synchronizer.LOADER_CLASS = mock.Mock(return_value=mock_loader)
+        synchronizer._convert_records = mock.Mock(return_value=[])
+        synchronizer._save_records = mock.Mock(return_value=0)
+
+        synchronizer.sync()
+        self.assertEqual(mock_loader.save_validators.call_count, 1)
+
+        synchronizer._save_records.side_effect = ValueError("Wrong!")
+        with self.assertRaises(VisionException):
+            synchronizer.sync()
+        self.assertEqual(mock_loader.save_validators.call_count, 1)
+
+    def test_sync_failed_records_not_saving_validators(self):
+        """Test that the data is fetched again, not answered with a 304, after a sync in which records failed"""
+        synchronizer = self.synchronizer_class(business_area_code=self.test_business_area_code)
+        mock_loader = mock.Mock()
+        mock_loader.get.return_value = [42]
+        synchronizer.LOADER_CLASS = mock.Mock(return_value=mock_loader)
+        synchronizer._convert_records = mock.Mock(return_value=[42])
+
+        def save_records(records):
+            synchronizer.failed_records += 1
+            return 1
+
+        synchronizer._save_records = mock.Mock(side_effect=save_records)
+
+        synchronizer.sync()
+        self.assertTrue(synchronizer.log.successful)
+        self.assertEqual(synchronizer.log.total_failed, 1)
+        self.assertEqual(mock_loader.save_validators.call_count, 0)
+
+    def test_sync_changed_since(self):
+        class _MyIncrementalSynchronizer(self.synchronizer_class):
+            CHANGED_SINCE_PARAM = "changedsince"
+
+        synchronizer = _MyIncrementalSynchronizer(business_area_code=self.test_business_area_code)
+        self.assertNotIn("changedsince", synchronizer.get_loader_kwargs())
+
+        started = datetime.datetime(2026, 10, 16, 12, 0, tzinfo=datetime.timezone.utc)
+        VisionLog.objects.create(
+            handler_name="_MyIncrementalSynchronizer", business_area_code="ABC", successful=True, date_started=started
+        )
+        VisionLog.objects.create(handler_name="_MyIncrementalSynchronizer", business_area_code="ABC")
+        VisionLog.objects.create(handler_name="_MyIncrementalSynchronizer", business_area_code="DEF", successful=True)
+
+        # the start of the sync is used, not the time the log was saved
+        self.assertEqual(synchronizer.get_loader_kwargs()["changedsince"], "2026-10-16T11:00:00")
+        self.assertNotIn("changedsince", synchronizer.kwargs)
+
+        # the records which failed in a later sync are fetched again
+        VisionLog.objects.create(
+            handler_name="_MyIncrementalSynchronizer",
+            business_area_code="ABC",
+            successful=True,
+            total_failed=2,
+            date_started=started + datetime.timedelta(hours=5),
+        )
+        self.assertEqual(synchronizer.get_loader_kwargs()["changedsince"], "2026-10-16T11:00:00")
+
+    def test_sync_changed_since_db_guard(self):
+        class _MyIncrementalSynchronizer(self.synchronizer_class):
+            CHANGED_SINCE_PARAM = "changedsince"
+
+        synchronizer = _MyIncrementalSynchronizer(business_area_code=self.test_business_area_code)
+        synchronizer.db_guard = mock.MagicMock()
+        synchronizer.get_loader_kwargs()
+        self.assertEqual(synchronizer.db_guard.call_count, 1)
+
+    def test_sync_date_started(self):
+        synchronizer = self.synchronizer_class(business_area_code=self.test_business_area_code)
+        synchronizer.LOADER_CLASS = mock.Mock()
+        synchronizer.LOADER_CLASS.return_value.get.return_value = []
+        synchronizer._convert_records = mock.Mock(return_value=[])
+        synchronizer._save_records = mock.Mock(return_value=0)
+        before = django_now()
+        synchronizer.sync()
+        log = VisionLog.objects.get()
+        self.assertTrue(before <= log.date_started <= log.date_processed)
+        self.assertEqual(log.total_failed, 0)
+
+    def test_sync_paginated(self):
+        class _MyPaginatedSynchronizer(self.synchronizer_class):
+            PAGE_SIZE = 100
+            PAGE_CURSOR_PARAM = "cursor"
+
+        synchronizer = _MyPaginatedSynchronizer(business_area_code=self.test_business_area_code)
+        self.assertIs(synchronizer.get_loader_class(), PaginatedVisionDataLoader)
+        kwargs = synchronizer.get_loader_kwargs()
+        self.assertEqual(kwargs["page_size"], 100)
+        self.assertEqual(kwargs["cursor_param"], "cursor")
+        self.assertNotIn("prefetch", kwargs)
+
+        loader = synchronizer.get_loader_class()(**kwargs)
+        self.assertEqual(loader.url, "{}/GetSomeStuff_JSON/?businessarea=ABC".format(loader.URL))
+        self.assertEqual(loader.cursor_key, "cursor")
+
+        synchronizer.PAGE_SIZE = None
+        self.assertIs(synchronizer.get_loader_class(), VisionDataLoader)
+        self.assertNotIn("page_size", synchronizer.get_loader_kwargs())
+
+    def test_sync_paginated_streaming(self):
+        synchronizer = self.synchronizer_class(business_area_code=self.test_business_area_code)
+        synchronizer.STREAMING = True
+        synchronizer.BATCH_SIZE = 3
+        synchronizer.PAGE_SIZE = 2
+        synchronizer._convert_records = VisionDataSynchronizer._convert_records.__get__(synchronizer)
+        synchronizer._save_records = mock.Mock(side_effect=len)
+
+        pages = [[{"ID": 1}, {"ID": 2}], [{"ID": 3}, {"ID": 4}], [{"ID": 5}]]
+        with mock.patch.object(PaginatedVisionDataLoader, "pages", return_value=iter(pages)):
+            synchronizer.sync()
+
+        self.assertEqual([len(call[0][0]) for call in synchronizer._save_records.call_args_list], [3, 2])
+        self._assertVisionLogFundamentals(5, 5)
+
     @mock.patch("unicef_vision.synchronizers.logger.info")
     def test_sync_exception_handling(self, mock_logger_info):
         """Test sync() exception handling behavior."""
@@ -303,6 +688,51 @@ class TestVisionDataSynchronizerSync(TestCase):
         self._assertVisionLogFundamentals(0, 0, exception_message="Wrong!", successful=False)
 
 
+class TestDataSynchronizerAsyncSync(TestCase):
+    """Exercise the async_sync() method"""
+
+    def _synchronizer(self, get):
+        synchronizer = _MySynchronizer(business_area_code="ABC")
+        synchronizer.BATCH_SIZE = 2
+        mock_loader = mock.Mock()
+        mock_loader.get = mock.AsyncMock(side_effect=get)
+        synchronizer.ASYNC_LOADER_CLASS = mock.Mock(return_value=mock_loader)
+        synchronizer._convert_records = mock.Mock(side_effect=lambda records: records)
+        synchronizer._save_records = mock.Mock(side_effect=lambda batch: len(batch))
+        return synchronizer
+
+    async def test_async_sync(self):
+        synchronizer = self._synchronizer(lambda: [42, 43, 44])
+        await synchronizer.async_sync()
+
+        self.assertEqual(
+            synchronizer.ASYNC_LOADER_CLASS.call_args[1],
+            {"businessarea": "ABC", "endpoint": "GetSomeStuff_JSON"},
+        )
+        self.assertEqual([call[0][0] for call in synchronizer._save_records.call_args_list], [[42, 43], [44]])
+        log = await sync_to_async(VisionLog.objects.get)()
+        self.assertTrue(log.successful)
+        self.assertEqual((log.total_records, log.total_processed), (3, 3))
+
+    async def test_async_sync_exception_handling(self):
+        def get():
+            raise VisionException("Load data failed! Http code: 500")
+
+        synchronizer = self._synchronizer(get)
+        with self.assertRaises(VisionException):
+            await synchronizer.async_sync()
+
+        self.assertEqual(synchronizer._save_records.call_count, 0)
+        log = await sync_to_async(VisionLog.objects.get)()
+        self.assertFalse(log.successful)
+        self.assertEqual(log.exception_message, "Load data failed! Http code: 500")
+
+    async def test_async_sync_not_supported(self):
+        synchronizer = FileDataSynchronizer(business_area_code="ABC", filename="tests/sample_dct.json")
+        with self.assertRaises(VisionException):
+            await synchronizer.async_sync()
+
+
 class TestFileDataSynchronizer(TestCase):
     """
     Exercise initialization of FileDataSynchronizer class
@@ -361,6 +791,41 @@ class TestMultiModelDataSynchronizer(TestCase):
             VisionDataSynchronizer._convert_records(self, list_records_str),
         )
         self.assertListEqual([], VisionDataSynchronizer._convert_records(self, "abcde"))
+        stream_records = iter(list_records)
+        self.assertIs(stream_records, VisionDataSynchronizer._convert_records(self, stream_records))
+
+    def test_filter_records_generator(self):
+        self.synchronizer.REQUIRED_KEYS = ("VENDOR_CODE",)
+        records = iter([{"VENDOR_CODE": "t1"}, {"VENDOR_NAME": "n2"}])
+        filtered = self.synchronizer._filter_records(records)
+        self.assertNotIsInstance(filtered, list)
+        self.assertEqual(list(filtered), [{"VENDOR_CODE": "t1"}])
+
+    def test_filter_records_rejections(self):
+        self.synchronizer.REQUIRED_KEYS = ("VENDOR_CODE", "VENDOR_NAME")
+        records = [{"VENDOR_CODE": "t1", "VENDOR_NAME": "n1"}, {"VENDOR_NAME": "n2"}, {}, {"VENDOR_NAME": "n4"}]
+        self.assertEqual(self.synchronizer._filter_records(records), records[:1])
+        self.assertEqual(self.synchronizer.rejected_records, 3)
+        self.assertEqual(self.synchronizer.missing_keys, {"VENDOR_CODE": 3, "VENDOR_NAME": 1})
+        self.assertEqual(
+            self.synchronizer.get_sync_stats(), {"rejected": 3, "missing_VENDOR_CODE": 3, "missing_VENDOR_NAME": 1}
+        )
+
+        # counted while the generator is consumed
+        filtered = self.synchronizer._filter_records(iter(records))
+        self.assertEqual(self.synchronizer.rejected_records, 3)
+        self.assertEqual(next(filtered), records[0])
+        self.assertEqual(list(filtered), [])
+        self.assertEqual(self.synchronizer.rejected_records, 6)
+
+    def test_filter_records_no_required_keys(self):
+        self.synchronizer.REQUIRED_KEYS = ()
+        records = [{"VENDOR_CODE": "t1"}, 42]
+        filtered = self.synchronizer._filter_records(records)
+        self.assertEqual(filtered, records)
+        self.assertIsNot(filtered, records)
+        self.assertEqual(list(self.synchronizer._filter_records(iter(records))), records)
+        self.assertEqual(self.synchronizer.get_sync_stats(), {})
 
     def _setup_sync(self):
         """set up syncronyzer class defaults and mappings"""
@@ -590,3 +1055,671 @@ class TestMultiModelDataSynchronizer(TestCase):
 
         no_records_processed = syncronizer._save_records([])
         self.assertEqual(no_records_processed, 0)
+
+
+class _PartnerSynchronizer(MultiModelDataSynchronizer):
+    ENDPOINT = "GetPartnerDetailsInfo_json"
+    REQUIRED_KEYS = ("VENDOR_CODE", "VENDOR_NAME", "GRANT_REF")
+    MAPPING = {
+        "partner": {
+            "vendor_code": "VENDOR_CODE",
+            "name": "VENDOR_NAME",
+            "blocked": "POSTING_BLOCK",
+        },
+        "grant": {
+            "partner": "VENDOR_CODE",
+            "grant_ref": "GRANT_REF",
+            "amount": "AGREEMENT_AMT",
+        },
+    }
+    MODEL_MAPPING = OrderedDict((("partner", Partner), ("grant", Grant)))
+    FIELD_HANDLERS = {"partner": {"blocked": bool}}
+    DEFAULTS = {Grant: {"amount": 0}}
+
+
+class TestMultiModelDataSynchronizerBulk(TestCase):
+    def _records(self, count, name="Partner"):
+        return [
+            {
+                "VENDOR_CODE": "{:010d}".format(i // 2),
+                "VENDOR_NAME": "{} {}".format(name, i // 2),
+                "GRANT_REF": "SC{:06d}".format(i),
+                "AGREEMENT_AMT": 51280,
+            }
+            for i in range(count)
+        ]
+
+    def _snapshot(self):
+        return (
+            list(Partner.objects.order_by("vendor_code").values_list("vendor_code", "name", "blocked")),
+            list(Grant.objects.order_by("grant_ref").values_list("partner__vendor_code", "grant_ref", "amount")),
+        )
+
+    def _assertSameAsSingleRecordSave(self, on_conflict):
+        records = self._records(10)
+        records.append({"VENDOR_CODE": "0000000001", "VENDOR_NAME": "Renamed", "GRANT_REF": "SC000002"})
+        records.append({"VENDOR_CODE": "missing", "VENDOR_NAME": "No grant"})
+
+        synchronizer = _PartnerSynchronizer(business_area_code="ABC")
+        self.assertEqual(synchronizer._save_records(records[:4]), 4)
+        self.assertEqual(synchronizer._save_records(records), 11)
+        expected = self._snapshot()
+
+        Grant.objects.all().delete()
+        Partner.objects.all().delete()
+        synchronizer = _PartnerSynchronizer(business_area_code="ABC")
+        synchronizer.BULK = True
+        synchronizer.BULK_BATCH_SIZE = 5
+        synchronizer.BULK_ON_CONFLICT = on_conflict
+        self.assertEqual(synchronizer._save_records(records[:4]), 4)
+        self.assertEqual(synchronizer._save_records(records), 11)
+
+        self.assertEqual(self._snapshot(), expected)
+        self.assertEqual(Partner.objects.get(vendor_code="0000000001").name, "Renamed")
+        self.assertEqual(Grant.objects.get(grant_ref="SC000002").amount, 0)
+
+    def test_bulk_save_records(self):
+        self._assertSameAsSingleRecordSave(on_conflict=False)
+
+    def test_bulk_save_records_on_conflict(self):
+        self._assertSameAsSingleRecordSave(on_conflict=True)
+
+    def test_bulk_save_records_queries(self):
+        """Partner queries do not depend on the number of records"""
+
+        class _PartnerOnlySynchronizer(_PartnerSynchronizer):
+            MODEL_MAPPING = OrderedDict((("partner", Partner),))
+            BULK = True
+            BULK_ON_CONFLICT = False
+
+        synchronizer = _PartnerOnlySynchronizer(business_area_code="ABC")
+        # the lookup and the write, in a savepoint
+        with self.assertNumQueries(4):
+            synchronizer._save_records(self._records(100))
+        with self.assertNumQueries(4):
+            synchronizer._save_records(self._records(100, name="Renamed"))
+        self.assertEqual(Partner.objects.count(), 50)
+        self.assertFalse(Partner.objects.exclude(name__startswith="Renamed").exists())
+
+    def test_failed_records(self):
+        for bulk in (False, True):
+            synchronizer = _PartnerSynchronizer(business_area_code="ABC")
+            synchronizer.BULK = bulk
+            synchronizer._start_sync()
+            with mock.patch.object(Grant.objects, "update_or_create", side_effect=ValueError("Wrong!")):
+                with mock.patch.object(Grant.objects, "bulk_create", side_effect=ValueError("Wrong!")):
+                    self.assertEqual(synchronizer._save_records(self._records(4)), 4)
+            self.assertEqual(synchronizer.failed_records, 4)
+            self.assertEqual(synchronizer.get_sync_stats()["failed"], 4)
+            synchronizer._log_totals(4)
+            self.assertEqual(synchronizer.log.total_failed, 4)
+
+    def test_failed_write_skips_following_models(self):
+        """A record whose partner fails to be written does not update its grant, and counts as one failure"""
+        for attributes in (
+            {"BULK": True, "BULK_ON_CONFLICT": False},
+            {"BULK": True, "BULK_ON_CONFLICT": True},
+            {"SKIP_UNCHANGED": True},
+            {"SKIP_UNCHANGED": True, "BULK": True},
+        ):
+            VisionFingerprint.objects.all().delete()
+            Grant.objects.all().delete()
+            Partner.objects.all().delete()
+            synchronizer = _PartnerSynchronizer(business_area_code="ABC")
+            synchronizer.DEFAULTS = {}
+            synchronizer.BULK_BATCH_SIZE = 2
+            for name, value in attributes.items():
+                setattr(synchronizer, name, value)
+            synchronizer._save_records(self._records(4))
+
+            records = self._records(4)
+            for record in records:
+                record["AGREEMENT_AMT"] = 1
+            records[2]["VENDOR_NAME"] = records[3]["VENDOR_NAME"] = None
+            synchronizer._start_sync()
+            with mock.patch("unicef_vision.synchronizers.logger.warning"):
+                self.assertEqual(synchronizer._save_records(records), 4)
+
+            self.assertEqual(synchronizer.failed_records, 2)
+            self.assertEqual(
+                list(Grant.objects.order_by("grant_ref").values_list("grant_ref", "amount")),
+                [("SC000000", 1), ("SC000001", 1), ("SC000002", 51280), ("SC000003", 51280)],
+            )
+
+    def test_bulk_failed_chunk_in_transaction(self):
+        """A failing chunk is rolled back alone, the transaction of the caller can still be used"""
+        records = self._records(4)
+        records[1]["VENDOR_NAME"] = None
+        for on_conflict in (False, True):
+            synchronizer = _PartnerSynchronizer(business_area_code="ABC")
+            synchronizer.MODEL_MAPPING = OrderedDict((("partner", Partner),))
+            synchronizer.BULK = True
+            synchronizer.BULK_ON_CONFLICT = on_conflict
+            synchronizer._start_sync()
+            with mock.patch("unicef_vision.synchronizers.logger.warning"):
+                self.assertEqual(synchronizer._save_records(records), 4)
+            self.assertEqual(synchronizer.failed_records, 4)
+            self.assertEqual(Partner.objects.count(), 0)
+            synchronizer._log_totals(4)
+            synchronizer.log.save()
+
+    def test_bulk_save_records_queries_unique_together(self):
+        """Grant queries do not depend on the number of records, the partners of the grants are not fetched"""
+
+        class _PreloadSynchronizer(_PartnerSynchronizer):
+            BULK = True
+            BULK_ON_CONFLICT = False
+            PRELOAD_RELATED = True
+
+        synchronizer = _PreloadSynchronizer(business_area_code="ABC")
+        synchronizer._save_records(self._records(200))
+        with self.assertNumQueries(8):
+            synchronizer._save_records(self._records(100, name="Renamed"))
+        with self.assertNumQueries(8):
+            synchronizer._save_records(self._records(200, name="Renamed"))
+        self.assertEqual(Grant.objects.count(), 200)
+        self.assertFalse(Partner.objects.exclude(name__startswith="Renamed").exists())
+
+    def test_bulk_save_records_large_batch(self):
+        synchronizer = _PartnerSynchronizer(business_area_code="ABC")
+        synchronizer.BULK = True
+        synchronizer.BULK_ON_CONFLICT = False
+        self.assertEqual(synchronizer._save_records(self._records(1000)), 1000)
+        self.assertEqual(synchronizer._save_records(self._records(1000, name="Renamed")), 1000)
+        self.assertEqual(Partner.objects.count(), 500)
+        self.assertEqual(Grant.objects.count(), 1000)
+        self.assertFalse(Partner.objects.exclude(name__startswith="Renamed").exists())
+
+
+class TestMultiModelDataSynchronizerPlan(TestCase):
+    def test_plan_compiled_once(self):
+        synchronizer = _PartnerSynchronizer(business_area_code="ABC")
+        records = [{"VENDOR_CODE": str(i), "VENDOR_NAME": "Partner", "GRANT_REF": "SC{}".format(i)} for i in range(10)]
+
+        with mock.patch.object(
+            synchronizer, "_compile_model_plan", wraps=synchronizer._compile_model_plan
+        ) as mock_compile_model_plan:
+            synchronizer._save_records(records)
+
+        self.assertEqual(
+            [call[0] for call in mock_compile_model_plan.call_args_list],
+            [("partner", Partner), ("grant", Grant)],
+        )
+        plan = synchronizer.get_model_plan("partner", Partner)
+        self.assertEqual(plan.unique_fields, ["vendor_code"])
+        self.assertEqual(synchronizer.get_model_plan("grant", Grant).unique_fields, ["partner", "grant_ref"])
+        self.assertEqual(
+            plan.map({"VENDOR_CODE": "1", "VENDOR_NAME": "Partner", "POSTING_BLOCK": "X"}),
+            ({"vendor_code": "1"}, {"name": "Partner", "blocked": True}),
+        )
+        self.assertEqual(Grant.objects.count(), 10)
+
+    def test_plan_compiled_once_per_sync(self):
+        """Test that the plans are compiled once per sync, not for every batch of a streaming sync"""
+        synchronizer = _PartnerSynchronizer(business_area_code="ABC")
+        synchronizer.STREAMING = True
+        synchronizer.BATCH_SIZE = 3
+        mock_loader = mock.Mock()
+        mock_loader.stream.side_effect = lambda: iter(
+            [{"VENDOR_CODE": str(i), "VENDOR_NAME": "Partner", "GRANT_REF": "SC{}".format(i)} for i in range(10)]
+        )
+        synchronizer.LOADER_CLASS = mock.Mock(return_value=mock_loader)
+        synchronizer._convert_records = VisionDataSynchronizer._convert_records.__get__(synchronizer)
+
+        with mock.patch.object(
+            synchronizer, "_compile_model_plan", wraps=synchronizer._compile_model_plan
+        ) as mock_compile_model_plan:
+            synchronizer.sync()
+            self.assertEqual(mock_compile_model_plan.call_count, 2)
+            synchronizer.sync()
+            self.assertEqual(mock_compile_model_plan.call_count, 4)
+        self.assertEqual(Grant.objects.count(), 10)
+
+    def test_plan_no_unique_fields(self):
+        class _NoUniqueSynchronizer(_PartnerSynchronizer):
+            MAPPING = {"partner": {"name": "VENDOR_NAME"}}
+            MODEL_MAPPING = OrderedDict((("partner", Partner),))
+
+        synchronizer = _NoUniqueSynchronizer(business_area_code="ABC")
+        with self.assertRaises(VisionException):
+            synchronizer.get_model_plan("partner", Partner)
+
+    def test_plan_custom_get_field_value(self):
+        class _CustomSynchronizer(_PartnerSynchronizer):
+            MODEL_MAPPING = OrderedDict((("partner", Partner),))
+
+            def _get_field_value(self, field_name, field_json_code, json_item, model):
+                value = super()._get_field_value(field_name, field_json_code, json_item, model)
+                return value.upper() if field_name == "name" else value
+
+        synchronizer = _CustomSynchronizer(business_area_code="ABC")
+        synchronizer._save_records([{"VENDOR_CODE": "1", "VENDOR_NAME": "Partner", "GRANT_REF": "SC1"}])
+        self.assertEqual(Partner.objects.get(vendor_code="1").name, "PARTNER")
+
+    def test_plan_date_fields(self):
+        class _DateSynchronizer(_PartnerSynchronizer):
+            MAPPING = {
+                "partner": dict(_PartnerSynchronizer.MAPPING["partner"], last_assessment_date="LAST_ASSESSMENT_DATE"),
+            }
+            MODEL_MAPPING = OrderedDict((("partner", Partner),))
+            DATE_FIELDS = ["LAST_ASSESSMENT_DATE"]
+
+        records = [
+            {"VENDOR_CODE": code, "VENDOR_NAME": "Partner", "GRANT_REF": "SC1", "LAST_ASSESSMENT_DATE": date}
+            for code, date in (("1", "/Date(1334030400000)/"), ("2", "11-Apr-12"), ("3", None))
+        ]
+        for bulk in (False, True):
+            synchronizer = _DateSynchronizer(business_area_code="ABC")
+            synchronizer.BULK = bulk
+            synchronizer._save_records(records)
+            self.assertEqual(
+                list(Partner.objects.order_by("vendor_code").values_list("vendor_code", "last_assessment_date")),
+                [("1", datetime.date(2012, 4, 10)), ("2", datetime.date(2012, 4, 11))],
+            )
+
+
+class TestRelatedObjectCache(TestCase):
+    def setUp(self):
+        self.records = [
+            {"VENDOR_CODE": "{:010d}".format(i % 3), "VENDOR_NAME": "Partner", "GRANT_REF": "SC{}".format(i)}
+            for i in range(12)
+        ]
+        for i in range(3):
+            Partner.objects.create(vendor_code="{:010d}".format(i), name="Partner")
+
+    def _sync(self, synchronizer):
+        mock_loader = mock.Mock()
+        mock_loader.get.return_value = self.records
+        synchronizer.LOADER_CLASS = mock.Mock(return_value=mock_loader)
+        synchronizer.sync()
+        return VisionLog.objects.get()
+
+    def test_cache(self):
+        synchronizer = _PartnerSynchronizer(business_area_code="ABC")
+        log = self._sync(synchronizer)
+
+        self.assertEqual(log.total_processed, 12)
+        self.assertEqual(log.details, "related_cache_hits=9, related_cache_misses=3")
+        self.assertEqual(Grant.objects.count(), 12)
+
+    def test_preload(self):
+        synchronizer = _PartnerSynchronizer(business_area_code="ABC")
+        synchronizer.PRELOAD_RELATED = True
+
+        with mock.patch.object(Partner.objects, "get") as mock_get:
+            log = self._sync(synchronizer)
+
+        self.assertEqual(mock_get.call_count, 0)
+        self.assertEqual(log.details, "related_cache_hits=12, related_cache_misses=0")
+        self.assertEqual(Grant.objects.count(), 12)
+
+    def test_preload_missing_and_ambiguous(self):
+        cache = RelatedObjectCache()
+        cache.preload(Partner, "name", ["Partner", "Missing", None])
+        self.assertEqual(cache.objects, {})
+        with self.assertRaises(Partner.MultipleObjectsReturned):
+            cache.get(Partner, "name", "Partner")
+        with self.assertRaises(Partner.DoesNotExist):
+            cache.get(Partner, "vendor_code", "Missing")
+        self.assertEqual(cache.misses, 2)
+
+
+class TestMultiModelDataSynchronizerSkipUnchanged(TestCase):
+    def setUp(self):
+        self.records = [
+            {"VENDOR_CODE": "{:010d}".format(i), "VENDOR_NAME": "Partner", "GRANT_REF": "SC{}".format(i)}
+            for i in range(5)
+        ]
+
+    def _sync(self, bulk):
+        synchronizer = _PartnerSynchronizer(business_area_code="ABC")
+        synchronizer.SKIP_UNCHANGED = True
+        synchronizer.BULK = bulk
+        mock_loader = mock.Mock()
+        mock_loader.get.return_value = self.records
+        synchronizer.LOADER_CLASS = mock.Mock(return_value=mock_loader)
+        synchronizer.sync()
+        return VisionLog.objects.latest("pk")
+
+    def _assertSkipUnchanged(self, bulk):
+        log = self._sync(bulk)
+        self.assertTrue(log.details.endswith("skipped_unchanged=0, written=10"))
+        self.assertEqual(VisionFingerprint.objects.count(), 10)
+
+        with mock.patch.object(Partner.objects, "update_or_create") as mock_update_or_create:
+            log = self._sync(bulk)
+        self.assertEqual(mock_update_or_create.call_count, 0)
+        self.assertEqual(log.total_processed, 5)
+        self.assertTrue(log.details.endswith("skipped_unchanged=10, written=0"))
+
+        self.records[0]["VENDOR_NAME"] = "Renamed"
+        log = self._sync(bulk)
+        self.assertTrue(log.details.endswith("skipped_unchanged=9, written=1"))
+        self.assertEqual(Partner.objects.get(vendor_code="0000000000").name, "Renamed")
+        self.assertEqual(VisionFingerprint.objects.count(), 10)
+
+    def test_skip_unchanged(self):
+        self._assertSkipUnchanged(bulk=False)
+
+    def test_skip_unchanged_bulk(self):
+        self._assertSkipUnchanged(bulk=True)
+
+    def test_failed_write_not_fingerprinted(self):
+        with mock.patch.object(Grant.objects, "update_or_create", side_effect=ValueError("Wrong!")):
+            log = self._sync(bulk=False)
+        self.assertTrue(log.details.endswith("skipped_unchanged=0, written=5"))
+        self.assertFalse(VisionFingerprint.objects.filter(model_label="sample.Grant").exists())
+
+        log = self._sync(bulk=False)
+        self.assertTrue(log.details.endswith("skipped_unchanged=5, written=5"))
+        self.assertEqual(Grant.objects.count(), 5)
+
+
+class TestMultiModelDataSynchronizerTransactions(TestCase):
+    def setUp(self):
+        self.records = [
+            {"VENDOR_CODE": "{:010d}".format(i), "VENDOR_NAME": "Partner", "GRANT_REF": "SC{}".format(i)}
+            for i in range(5)
+        ]
+        self.records[2]["AGREEMENT_AMT"] = "Wrong!"
+
+    def _save_records(self, transaction_batch_size, bulk=False):
+        synchronizer = _PartnerSynchronizer(business_area_code="ABC")
+        synchronizer.DEFAULTS = {}
+        synchronizer.TRANSACTION_BATCH_SIZE = transaction_batch_size
+        synchronizer.BULK = bulk
+        synchronizer.BULK_BATCH_SIZE = 2
+        with mock.patch.object(synchronizer, "_atomic", wraps=synchronizer._atomic) as mock_atomic:
+            processed = synchronizer._save_records(self.records)
+        self.assertEqual(processed, 5)
+        return mock_atomic.call_count
+
+    def test_save_records_autocommit(self):
+        self.assertEqual(self._save_records(None), 0)
+        self.assertEqual(Partner.objects.count(), 5)
+        self.assertEqual(Grant.objects.count(), 4)
+
+    @mock.patch("unicef_vision.synchronizers.logger.warning")
+    def test_save_records_transaction_batches(self, mock_logger_warning):
+        # one transaction per chunk of 2 records and one savepoint per record
+        self.assertEqual(self._save_records(2), 3 + 5)
+        self.assertEqual(mock_logger_warning.call_count, 1)
+        # the failing record is rolled back as a whole, the other records of its chunk are saved
+        self.assertEqual(
+            list(Partner.objects.order_by("vendor_code").values_list("vendor_code", flat=True)),
+            ["0000000000", "0000000001", "0000000003", "0000000004"],
+        )
+        self.assertEqual(Grant.objects.count(), 4)
+
+    @mock.patch("unicef_vision.synchronizers.logger.warning")
+    def test_save_records_transaction_batches_bulk(self, mock_logger_warning):
+        # one transaction per chunk of BULK_BATCH_SIZE records and one savepoint per bulk write
+        self.assertEqual(self._save_records(1000, bulk=True), 3 + 6)
+        self.assertEqual(mock_logger_warning.call_count, 1)
+        self.assertEqual(Partner.objects.count(), 5)
+        self.assertEqual(
+            list(Grant.objects.order_by("grant_ref").values_list("grant_ref", flat=True)), ["SC0", "SC1", "SC4"]
+        )
+
+
+class TestSynchronizerSignals(TestCase):
+    def setUp(self):
+        self.events = []
+
+        def receiver(sender, synchronizer, phase, records, signal, **kwargs):
+            name = "started" if signal is phase_started else "finished"
+            self.events.append((name, phase, records, kwargs.get("model")))
+
+        for signal in (phase_started, phase_finished):
+            signal.connect(receiver, sender=_PartnerSynchronizer, weak=False)
+            self.addCleanup(signal.disconnect, receiver, sender=_PartnerSynchronizer)
+
+        self.records = [
+            {"VENDOR_CODE": "{:010d}".format(i), "VENDOR_NAME": "Partner", "GRANT_REF": "SC{}".format(i)}
+            for i in range(3)
+        ]
+        del self.records[1]["GRANT_REF"]
+
+    def _sync(self, **attributes):
+        synchronizer = _PartnerSynchronizer(business_area_code="ABC")
+        for name, value in attributes.items():
+            setattr(synchronizer, name, value)
+        mock_loader = mock.Mock()
+        mock_loader.get.return_value = self.records
+        mock_loader.stream.return_value = iter(self.records)
+        synchronizer.LOADER_CLASS = mock.Mock(return_value=mock_loader)
+        synchronizer.sync()
+
+    def test_sync(self):
+        self._sync(BULK=True)
+        self.assertEqual(
+            self.events,
+            [
+                ("started", "load", None, None),
+                ("finished", "load", 3, None),
+                ("started", "convert", 3, None),
+                ("finished", "convert", 3, None),
+                ("started", "save", 3, None),
+                ("started", "filter", 3, None),
+                ("finished", "filter", 2, None),
+                ("started", "write", 2, Partner),
+                ("finished", "write", 2, Partner),
+                ("started", "write", 2, Grant),
+                ("finished", "write", 2, Grant),
+                ("finished", "save", 2, None),
+            ],
+        )
+
+    def test_sync_streaming(self):
+        self._sync(STREAMING=True, BATCH_SIZE=2)
+        self.assertEqual(
+            [event[:3] for event in self.events if event[1] != "write"],
+            [
+                ("started", "convert", None),
+                ("started", "load", None),
+                ("started", "save", 2),
+                ("started", "filter", 2),
+                ("finished", "filter", 1),
+                ("finished", "save", 1),
+                # the stream is exhausted while reading the last batch
+                ("finished", "load", 3),
+                ("finished", "convert", 3),
+                ("started", "save", 1),
+                ("started", "filter", 1),
+                ("finished", "filter", 1),
+                ("finished", "save", 1),
+            ],
+        )
+        self.assertEqual(len([event for event in self.events if event[1] == "write"]), 2 * 2 * 2)
+
+
+class TestMultiModelDataSynchronizerMappingProcesses(TestCase):
+    def setUp(self):
+        self.records = [
+            {
+                "VENDOR_CODE": "{:010d}".format(i),
+                "VENDOR_NAME": "Partner {}".format(i),
+                "POSTING_BLOCK": i % 2,
+                "GRANT_REF": "SC{}".format(i),
+                "AGREEMENT_AMT": i * 10,
+                "ASSESSMENT_DATE": "0{}-Mar-24".format(i + 1),
+            }
+            for i in range(5)
+        ]
+        self.records[2]["ASSESSMENT_DATE"] = "Wrong!"
+
+    def _synchronizer(self, **attributes):
+        synchronizer = _PartnerSynchronizer(business_area_code="ABC")
+        synchronizer.MAPPING = dict(
+            _PartnerSynchronizer.MAPPING,
+            partner=dict(_PartnerSynchronizer.MAPPING["partner"], last_assessment_date="ASSESSMENT_DATE"),
+        )
+        synchronizer.DATE_FIELDS = ["ASSESSMENT_DATE"]
+        synchronizer.DEFAULTS = {}
+        synchronizer.MAPPING_PROCESSES = 2
+        synchronizer.MAPPING_CHUNK_SIZE = 2
+        for name, value in attributes.items():
+            setattr(synchronizer, name, value)
+        self.addCleanup(synchronizer._end_sync)
+        return synchronizer
+
+    def _saved(self):
+        return (
+            list(Partner.objects.order_by("vendor_code").values_list("vendor_code", "blocked", "last_assessment_date")),
+            list(Grant.objects.order_by("grant_ref").values_list("partner__vendor_code", "grant_ref", "amount")),
+        )
+
+    def _assertSameAsInProcess(self, **attributes):
+        with mock.patch("unicef_vision.synchronizers.logger.warning") as mock_logger_warning:
+            self.assertEqual(self._synchronizer(**attributes)._save_records(self.records), 5)
+        self.assertEqual(mock_logger_warning.call_count, 1)
+        saved = self._saved()
+        Grant.objects.all().delete()
+        Partner.objects.all().delete()
+
+        with mock.patch("unicef_vision.synchronizers.logger.warning"):
+            self._synchronizer(MAPPING_PROCESSES=0, **attributes)._save_records(self.records)
+        self.assertEqual(self._saved(), saved)
+        return saved
+
+    def test_pool_not_forked(self):
+        pool = self._synchronizer()._get_mapping_pool()
+        self.assertIn(pool._mp_context.get_start_method(), ("forkserver", "spawn"))
+
+    def test_save_records(self):
+        partners, grants = self._assertSameAsInProcess()
+        self.assertEqual(len(partners), 4)
+        self.assertEqual(partners[1], ("0000000001", True, datetime.date(2024, 3, 2)))
+        self.assertEqual(grants[1], ("0000000001", "SC1", 10))
+
+    def test_save_records_bulk(self):
+        self._assertSameAsInProcess(BULK=True, BULK_BATCH_SIZE=3)
+
+    def test_save_records_transactions(self):
+        self._assertSameAsInProcess(TRANSACTION_BATCH_SIZE=2)
+
+    def test_process_record_override(self):
+        """Subclasses overriding _process_record with the original signature work without the process pool"""
+
+        class _OverrideSynchronizer(_PartnerSynchronizer):
+            def _process_record(self, json_item):
+                self.processed.append(json_item["VENDOR_CODE"])
+
+        for attributes in ({}, {"TRANSACTION_BATCH_SIZE": 2}):
+            synchronizer = _OverrideSynchronizer(business_area_code="ABC")
+            synchronizer.processed = []
+            for name, value in attributes.items():
+                setattr(synchronizer, name, value)
+            self.assertEqual(synchronizer._save_records(self.records), 5)
+            self.assertEqual(synchronizer.processed, [record["VENDOR_CODE"] for record in self.records])
+
+    def test_handler_importing_models(self):
+        """The handlers defined next to the models they use are unpickled in the processes once Django is set up"""
+        handlers = {"partner": {"blocked": bool, "name": partner_name}}
+        partners, grants = self._assertSameAsInProcess(FIELD_HANDLERS=handlers)
+        self.assertEqual(len(partners), 4)
+
+    def test_not_picklable(self):
+        synchronizer = self._synchronizer(FIELD_HANDLERS={"partner": {"blocked": lambda value: bool(value)}})
+        with self.assertRaises(VisionException):
+            synchronizer._save_records(self.records)
+        self.assertEqual(Partner.objects.count(), 0)
+
+    def test_pool_shutdown(self):
+        synchronizer = self._synchronizer()
+        synchronizer._save_records(self.records[:1])
+        pool = synchronizer._mapping_pool
+        synchronizer._save_records(self.records[1:2])
+        self.assertIs(synchronizer._mapping_pool, pool)
+        synchronizer._end_sync()
+        self.assertIsNone(synchronizer._mapping_pool)
+
+
+class TestSyncRejections(TestCase):
+    def test_sync_details(self):
+        synchronizer = _PartnerSynchronizer(business_area_code="ABC")
+        synchronizer.STREAMING = True
+        records = [
+            {"VENDOR_CODE": "001", "VENDOR_NAME": "Partner", "GRANT_REF": "SC1"},
+            {"VENDOR_CODE": "002", "VENDOR_NAME": "Partner"},
+            {"VENDOR_NAME": "Partner"},
+        ]
+        mock_loader = mock.Mock()
+        mock_loader.stream.side_effect = lambda: iter(records)
+        synchronizer.LOADER_CLASS = mock.Mock(return_value=mock_loader)
+
+        synchronizer.sync()
+        log = VisionLog.objects.get()
+        self.assertEqual(log.total_records, 3)
+        self.assertEqual(log.total_processed, 1)
+        self.assertTrue(log.details.startswith("rejected=2, missing_GRANT_REF=2, missing_VENDOR_CODE=1, "))
+
+        # the counters are reset by each sync
+        records = records[:1]
+        synchronizer.sync()
+        self.assertNotIn("rejected", VisionLog.objects.order_by("-pk").first().details)
+
+
+class TestCompactRecords(TestCase):
+    def setUp(self):
+        self.records = [
+            {
+                "VENDOR_CODE": "{:010d}".format(i),
+                "VENDOR_NAME": "Partner {}".format(i),
+                "POSTING_BLOCK": i % 2,
+                "GRANT_REF": "SC{}".format(i),
+                "AGREEMENT_AMT": i * 10,
+                "DONOR_NAME": "Donor",
+            }
+            for i in range(5)
+        ]
+        del self.records[3]["GRANT_REF"]
+
+    def _sync(self, **attributes):
+        synchronizer = _PartnerSynchronizer(business_area_code="ABC")
+        synchronizer.DEFAULTS = {}
+        synchronizer.COMPACT_RECORDS = True
+        for name, value in attributes.items():
+            setattr(synchronizer, name, value)
+        mock_loader = mock.Mock()
+        mock_loader.get.return_value = {"ROWSET": {"ROW": self.records}}
+        mock_loader.stream.return_value = iter(self.records)
+        synchronizer.LOADER_CLASS = mock.Mock(return_value=mock_loader)
+        with mock.patch.object(synchronizer, "_save_records", wraps=synchronizer._save_records) as mock_save_records:
+            synchronizer.sync()
+            self.addCleanup(synchronizer._end_sync)
+        saved = mock_save_records.call_args[0][0]
+        self.assertIsInstance(saved[0], CompactRecord)
+        self.assertNotIn("DONOR_NAME", saved[0])
+        self.assertEqual(VisionLog.objects.get().total_processed, 4)
+        self.assertEqual(
+            list(Grant.objects.order_by("grant_ref").values_list("partner__vendor_code", "grant_ref", "amount")),
+            [("0000000000", "SC0", 0), ("0000000001", "SC1", 10), ("0000000002", "SC2", 20), ("0000000004", "SC4", 40)],
+        )
+        self.assertEqual(Partner.objects.filter(blocked=True).count(), 1)
+
+    def test_record_keys(self):
+        synchronizer = _PartnerSynchronizer(business_area_code="ABC")
+        synchronizer.RECORD_KEYS = ("DONOR_NAME",)
+        synchronizer.DATE_FIELDS = ["LAST_ASSESSMENT_DATE"]
+        self.assertEqual(
+            synchronizer.get_record_keys(),
+            {
+                "VENDOR_CODE",
+                "VENDOR_NAME",
+                "POSTING_BLOCK",
+                "GRANT_REF",
+                "AGREEMENT_AMT",
+                "DONOR_NAME",
+                "LAST_ASSESSMENT_DATE",
+            },
+        )
+
+    def test_sync(self):
+        self._sync()
+
+    def test_sync_streaming(self):
+        self._sync(STREAMING=True, BATCH_SIZE=10)
+
+    def test_sync_mapping_processes(self):
+        self._sync(MAPPING_PROCESSES=1, BULK=True)
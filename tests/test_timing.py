@@ -0,0 +1,98 @@
+import tracemalloc
+
+from django.test import SimpleTestCase
+
+import mock
+
+from unicef_vision.timing import PeakMemory, PhaseTimer
+
+
+class TestPhaseTimer(SimpleTestCase):
+    @mock.patch("unicef_vision.timing.perf_counter")
+    def test_nested_phases(self, mock_perf_counter):
+        mock_perf_counter.side_effect = [0, 1, 3, 6]
+        timer = PhaseTimer()
+        with timer.phase("save"):
+            with timer.phase("filter"):
+                pass
+        # the time spent filtering is not accounted to the save
+        self.assertEqual(dict(timer.durations), {"save": 1 + 3, "filter": 2})
+
+    @mock.patch("unicef_vision.timing.perf_counter")
+    def test_phase_exception(self, mock_perf_counter):
+        mock_perf_counter.side_effect = [0, 2]
+        timer = PhaseTimer()
+        with self.assertRaises(ValueError):
+            with timer.phase("fetch"):
+                raise ValueError("Wrong!")
+        self.assertEqual(dict(timer.durations), {"fetch": 2})
+
+    @mock.patch("unicef_vision.timing.perf_counter")
+    def test_iter(self, mock_perf_counter):
+        mock_perf_counter.side_effect = range(0, 100, 2)
+        timer = PhaseTimer()
+        records = timer.iter("decode", timer.iter("fetch", [1, 2]))
+        self.assertEqual(list(records), [1, 2])
+        # 3 next() calls (the last one ends the iteration), each one entering both phases
+        self.assertEqual(dict(timer.durations), {"decode": 3 * 4, "fetch": 3 * 2})
+
+    def test_count_bytes(self):
+        timer = PhaseTimer()
+        self.assertIsNone(timer.bytes_downloaded)
+        self.assertEqual(list(timer.count_bytes([b"abc", b"de"])), [b"abc", b"de"])
+        self.assertEqual(timer.bytes_downloaded, 5)
+
+    def test_merge(self):
+        timer, other = PhaseTimer(), PhaseTimer()
+        timer.durations["save"] = 2
+        other.durations.update(fetch=3, decode=1)
+        timer.merge(other)
+        self.assertEqual(dict(timer.durations), {"save": 2, "fetch": 3, "decode": 1})
+        self.assertIsNone(timer.bytes_downloaded)
+        other.bytes_downloaded = 5
+        timer.merge(other)
+        self.assertEqual(timer.bytes_downloaded, 5)
+
+
+class TestPeakMemory(SimpleTestCase):
+    def setUp(self):
+        tracemalloc.start()
+        self.addCleanup(tracemalloc.stop)
+
+    def test_peak_memory(self):
+        memory = PeakMemory()
+        memory.start()
+        data = b"x" * 10 * 1024 * 1024
+        del data
+        self.assertGreater(memory.stop(), 10 * 1024 * 1024)
+
+        # the peak of a previous measure is not reported
+        memory = PeakMemory()
+        memory.start()
+        self.assertLess(memory.stop(), 10 * 1024 * 1024)
+        self.assertIsNone(memory.stop())
+
+    def test_not_tracing(self):
+        tracemalloc.stop()
+        memory = PeakMemory()
+        memory.start()
+        self.assertIsNone(memory.stop())
+
+    def test_overlapped(self):
+        first, second, third = PeakMemory(), PeakMemory(), PeakMemory()
+        first.start()
+        second.start()
+        self.assertIsNone(second.stop())
+        self.assertIsNone(first.stop())
+
+        # the measures are not affected once the others are stopped
+        third.start()
+        self.assertGreater(third.stop(), 0)
+
+    def test_not_stopped(self):
+        memory = PeakMemory()
+        memory.start()
+        del memory
+        memory = PeakMemory()
+        memory.start()
+        self.assertGreater(memory.stop(), 0)
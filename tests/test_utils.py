@@ -1,21 +1,26 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.cache import cache
 from django.test import override_settings, SimpleTestCase
 
 import mock
 
 from unicef_vision import utils
 from unicef_vision.loaders import INSIGHT_NO_DATA_MESSAGE
+from unicef_vision.settings import MAX_RETRIES, POOL_CONNECTIONS, POOL_MAXSIZE
 
 FAUX_INSIGHT_URL = "https://api.example.com/foo.svc/"
 
 
 @override_settings(INSIGHT_URL=FAUX_INSIGHT_URL)
 class TestGetDataFromInsight(SimpleTestCase):
-    @mock.patch("unicef_vision.utils.requests.get")
+    @mock.patch("unicef_vision.utils.get_session")
     def test_status_http_error(self, mock_requests):
         mock_response = mock.Mock()
         mock_response.status_code = 404
 
-        mock_requests.return_value = mock_response
+        mock_requests.return_value.get.return_value = mock_response
         status, reason = utils.get_data_from_insight("GetSomeStuff_JSON")
 
         self.assertFalse(status)
@@ -24,14 +29,14 @@ class TestGetDataFromInsight(SimpleTestCase):
             "Loading data from Vision Failed, status {}".format(mock_response.status_code),
         )
 
-    @mock.patch("unicef_vision.utils.requests.get")
+    @mock.patch("unicef_vision.utils.get_session")
     def test_invalid_request(self, mock_requests):
         mock_response = mock.Mock()
         mock_response.status_code = 200
         mock_response.json = mock.Mock(return_value=INSIGHT_NO_DATA_MESSAGE)
 
         data = {}
-        mock_requests.return_value = mock_response
+        mock_requests.return_value.get.return_value = mock_response
         status, reason = utils.get_data_from_insight("GetSomeStuff_JSON", data)
         self.assertTrue(status)
         self.assertEqual(
@@ -40,19 +45,88 @@ class TestGetDataFromInsight(SimpleTestCase):
             # 'Loading data from Vision Failed, no valid response returned for data: {}'.format(data)
         )
 
-    @mock.patch("unicef_vision.utils.requests.get")
+    @mock.patch("unicef_vision.utils.get_session")
     def test_status_http_ok(self, mock_requests):
         mock_response = mock.Mock()
         mock_response.status_code = 200
         res = {"v": 1}
         mock_response.json = mock.Mock(return_value=res)
 
-        mock_requests.return_value = mock_response
+        mock_requests.return_value.get.return_value = mock_response
         status, response = utils.get_data_from_insight("GetSomeStuff_JSON")
 
         self.assertTrue(status)
         self.assertEqual(response, res)
 
+    @mock.patch("unicef_vision.utils.get_session")
+    def test_cached(self, mock_requests):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        mock_requests.return_value.get.return_value = mock.Mock(status_code=200, json=mock.Mock(return_value=[42]))
+
+        with mock.patch.dict(utils.response_cache.ttls, {"GetPartner/{vendor}": 60}):
+            for vendor in ("1", "1", "2"):
+                self.assertEqual(utils.get_data_from_insight("GetPartner/{vendor}", {"vendor": vendor}), (True, [42]))
+            self.assertEqual(mock_requests.return_value.get.call_count, 2)
+
+            utils.invalidate_data_from_insight("GetPartner/{vendor}", {"vendor": "1"})
+            utils.get_data_from_insight("GetPartner/{vendor}", {"vendor": "1"})
+            utils.get_data_from_insight("GetPartner/{vendor}", {"vendor": "2"})
+            self.assertEqual(mock_requests.return_value.get.call_count, 3)
+
+            # failures are not cached
+            mock_requests.return_value.get.return_value = mock.Mock(status_code=500)
+            utils.invalidate_data_from_insight("GetPartner/{vendor}")
+            for _ in range(2):
+                self.assertFalse(utils.get_data_from_insight("GetPartner/{vendor}", {"vendor": "1"})[0])
+            self.assertEqual(mock_requests.return_value.get.call_count, 5)
+
+
+class TestGetSession(SimpleTestCase):
+    def test_shared_session(self):
+        sessions = []
+        threads = [threading.Thread(target=lambda: sessions.append(utils.get_session())) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(sessions), 5)
+        self.assertTrue(all(session is utils.get_session() for session in sessions))
+
+    def test_pool(self):
+        adapter = utils.get_session().get_adapter("https://api.example.com")
+        self.assertEqual(adapter._pool_connections, POOL_CONNECTIONS)
+        self.assertEqual(adapter._pool_maxsize, POOL_MAXSIZE)
+        self.assertEqual(adapter.max_retries.total, MAX_RETRIES)
+
+    def test_cookies_not_kept(self):
+        cookies = []
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                cookies.append(self.headers.get("Cookie"))
+                self.send_response(200)
+                self.send_header("Set-Cookie", "ARRAffinity=abc; Path=/")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        url = "http://127.0.0.1:{}/".format(server.server_port)
+
+        response = utils.get_session().get(url)
+        self.assertEqual(response.cookies.get("ARRAffinity"), "abc")
+        utils.get_session().get(url)
+        self.assertEqual(cookies, [None, None])
+        self.assertEqual(len(utils.get_session().cookies), 0)
+
 
 class TestCompDecimals(SimpleTestCase):
     def test_not_equal(self):